@@ -10,9 +10,13 @@ import asyncio
 from datetime import datetime, timedelta
 
 from database import (
-    UserProfileRepository,
-    CreatorNetworkRepository
+    AsyncUserProfileRepository,
+    AsyncUserSnapshotRepository,
+    AsyncCreatorNetworkRepository,
+    AsyncNoteRepository,
+    get_async_database
 )
+from api.services.creator_network_service import get_creator_network_builder
 from tasks.collector_task import (
     CollectorTask,
     create_collector_task,
@@ -61,6 +65,45 @@ def invalidate_network_cache():
     print("[Cache] Invalidated")
 
 
+def apply_network_update(update: Dict[str, Any]):
+    """
+    把 CreatorNetworkBuilder 的结果同步到缓存
+
+    增量更新时直接修补缓存中的节点和连边（不丢弃整个缓存），
+    全量重建时直接用新网络覆盖缓存；同时清除风格生成页的创作者列表缓存。
+    """
+    from api.routers.style_router import clear_creators_cache
+
+    if update.get('rebuilt') or 'node' not in update:
+        set_network_cache({
+            "creators": update.get("creators", []),
+            "creatorEdges": update.get("edges", []),
+            "trackClusters": {},
+            "trendingKeywordGroups": []
+        })
+    elif _network_cache['data'] is not None:
+        node = update['node']
+        user_id = node['id']
+        data = _network_cache['data']
+        data['creators'] = [c for c in data['creators'] if c.get('id') != user_id] + [node]
+        data['creatorEdges'] = [
+            e for e in data['creatorEdges']
+            if e.get('source') != user_id and e.get('target') != user_id
+        ] + update['edges']
+        print(f"[Cache] Patched (+1 creator, +{len(update['edges'])} edges)")
+
+    clear_creators_cache()
+
+
+async def update_network_for_creator(user_id: str):
+    """在线程池中增量更新网络（新增/刷新单个创作者），并同步缓存"""
+    loop = asyncio.get_running_loop()
+    builder = get_creator_network_builder("xiaohongshu")
+    update = await loop.run_in_executor(None, builder.add_creator, user_id)
+    apply_network_update(update)
+    return update
+
+
 # ============================================
 # 请求/响应模型
 # ============================================
@@ -113,8 +156,8 @@ async def get_creator_network(platform: str = "xiaohongshu") -> Dict[str, Any]:
     start = time.time()
     
     try:
-        network_repo = CreatorNetworkRepository()
-        network = network_repo.get_latest_network(platform)
+        network_repo = AsyncCreatorNetworkRepository()
+        network = await network_repo.get_full_network(platform)
         
         elapsed = time.time() - start
         print(f"[API] MongoDB query took {elapsed:.2f}s")
@@ -123,14 +166,12 @@ async def get_creator_network(platform: str = "xiaohongshu") -> Dict[str, Any]:
             print(f"[API] No network data found for platform: {platform}")
             raise HTTPException(status_code=404, detail=f"未找到平台 {platform} 的网络数据")
         
-        # 获取network_data，确保字段名称匹配前端期望
-        network_data = network.get("network_data", {})
-        
+        # 确保字段名称匹配前端期望
         result = {
-            "creators": network_data.get("creators", []),
-            "creatorEdges": network_data.get("creatorEdges", network_data.get("edges", [])),
-            "trackClusters": network_data.get("trackClusters", {}),
-            "trendingKeywordGroups": network_data.get("trendingKeywordGroups", [])
+            "creators": network.get("creators", []),
+            "creatorEdges": network.get("edges", []),
+            "trackClusters": {},
+            "trendingKeywordGroups": []
         }
         
         # 3. 保存到缓存
@@ -176,35 +217,22 @@ async def refresh_creator_network(
         if not 0 <= similarity_threshold <= 1:
             raise HTTPException(status_code=400, detail=f"相似度阈值必须在0-1之间，当前值: {similarity_threshold}")
         
-        import subprocess
-        import os
-        
         def regenerate_network():
-            """后台重新生成网络"""
+            """后台重新生成网络（FastAPI 会在线程池中执行同步任务）"""
             try:
-                backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-                script_path = os.path.join(backend_dir, "scripts", "regenerate_creator_networks.py")
-                
                 print(f"🔄 开始重新生成创作者网络 (相似度阈值: {similarity_threshold})...")
-                result = subprocess.run(
-                    ["python3", script_path, "--similarity-threshold", str(similarity_threshold)],
-                    cwd=backend_dir,
-                    check=True,
-                    capture_output=True,
-                    text=True
-                )
+                builder = get_creator_network_builder(platform)
+                result = builder.build_full(similarity_threshold=similarity_threshold)
                 print(f"✅ 网络数据已更新")
-                print(result.stdout)
                 
-                # 清除缓存，下次请求会重新读取
-                invalidate_network_cache()
+                # 直接用新网络覆盖缓存
+                if platform == "xiaohongshu":
+                    apply_network_update({"rebuilt": True, **result})
+                else:
+                    invalidate_network_cache()
                 
-            except subprocess.CalledProcessError as e:
-                print(f"❌ 重新生成网络失败: {e}")
-                print(e.stdout)
-                print(e.stderr)
             except Exception as e:
-                print(f"❌ 错误: {e}")
+                print(f"❌ 重新生成网络失败: {e}")
         
         # 添加到后台任务
         background_tasks.add_task(regenerate_network)
@@ -220,6 +248,61 @@ async def refresh_creator_network(
         raise HTTPException(status_code=500, detail=f"重新生成网络失败: {str(e)}")
 
 
+@router.get("/network/nodes")
+async def list_network_nodes(
+    platform: str = "xiaohongshu",
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """
+    分页获取网络节点（不含 indexSeries，不加载连边）
+    
+    Args:
+        platform: 平台类型
+        limit: 每页数量（最多500）
+        cursor: 上一页返回的 next_cursor
+        
+    Returns:
+        {nodes, next_cursor, network_version}
+    """
+    try:
+        network_repo = AsyncCreatorNetworkRepository()
+        page = await network_repo.get_nodes_page(
+            platform,
+            limit=max(1, min(limit, 500)),
+            after=cursor,
+            fields=["name", "followers", "totalEngagement", "noteCount", "primaryTrack", "topics", "avatar"]
+        )
+        return {"success": True, **page}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取网络节点失败: {str(e)}")
+
+
+@router.get("/network/ego/{user_id}")
+async def get_ego_network(user_id: str, platform: str = "xiaohongshu", limit: int = 50):
+    """
+    获取单个创作者的自我中心网络（该节点 + 相邻节点 + 相连的边）
+    
+    Args:
+        user_id: 创作者用户ID
+        platform: 平台类型
+        limit: 最多返回的连边数（按相似度降序）
+        
+    Returns:
+        {node, neighbors, edges}
+    """
+    try:
+        network_repo = AsyncCreatorNetworkRepository()
+        ego = await network_repo.get_ego_network(user_id, platform, limit=limit)
+        if not ego:
+            raise HTTPException(status_code=404, detail=f"网络中未找到创作者: {user_id}")
+        return {"success": True, **ego}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取创作者网络失败: {str(e)}")
+
+
 @router.get("/similarities/{user_id}")
 async def get_creator_similarities(user_id: str, platform: str = "xiaohongshu"):
     """
@@ -231,12 +314,12 @@ async def get_creator_similarities(user_id: str, platform: str = "xiaohongshu"):
     """
     try:
         import numpy as np
-        from database.connection import get_database
+        from database.vector_codec import decode_vector
 
-        db = get_database()
+        db = get_async_database()
 
         # 1. 取出自己的 embedding
-        my_doc = db.user_embeddings.find_one(
+        my_doc = await db.user_embeddings.find_one(
             {"user_id": user_id, "platform": platform, "dimension": 512},
             {"embedding": 1}
         )
@@ -246,7 +329,7 @@ async def get_creator_similarities(user_id: str, platform: str = "xiaohongshu"):
                 detail=f"用户 {user_id} 没有 embedding 向量，请先生成"
             )
 
-        my_vec = np.array(my_doc["embedding"], dtype=np.float32)
+        my_vec = decode_vector(my_doc["embedding"])
         my_norm = np.linalg.norm(my_vec)
         if my_norm == 0:
             raise HTTPException(status_code=400, detail="用户 embedding 全为零")
@@ -259,9 +342,9 @@ async def get_creator_similarities(user_id: str, platform: str = "xiaohongshu"):
         )
 
         similarities: dict = {}
-        for doc in cursor:
+        async for doc in cursor:
             other_id = doc["user_id"]
-            vec = np.array(doc["embedding"], dtype=np.float32)
+            vec = decode_vector(doc["embedding"])
             norm = np.linalg.norm(vec)
             if norm == 0:
                 continue
@@ -289,8 +372,8 @@ async def list_all_creators(platform: Optional[str] = None):
         创作者列表
     """
     try:
-        profile_repo = UserProfileRepository()
-        profiles = profile_repo.get_all_profiles(platform)
+        profile_repo = AsyncUserProfileRepository()
+        profiles = await profile_repo.get_all_profiles(platform)
         
         creators = []
         for profile in profiles:
@@ -314,82 +397,81 @@ async def get_creator_notes(
     platform: str = "xiaohongshu",
     limit: int = 20,
     days: Optional[int] = None,
-    sort: str = "engagement"
+    sort: str = "engagement",
+    cursor: Optional[str] = None
 ):
     """
-    获取创作者的笔记列表（从 user_snapshots 直接读取，无需调用 AI）
+    获取创作者的笔记列表（从 notes 集合分页读取，排序和时间过滤在数据库完成，无需调用 AI）
 
     Args:
         user_id: 创作者用户 ID
         platform: 平台类型
-        limit: 返回条数（默认 20）
+        limit: 每页条数（默认 20）
         days: 时间范围（天），None 表示全部
         sort: 排序方式 engagement / latest
+        cursor: 上一页返回的 next_cursor（keyset 分页，翻页深度不影响查询代价）
 
     Returns:
         {success, notes: [{id, title, desc, likes, collected_count, comments_count,
-         share_count, engagement_score, create_time, images_list}], total}
+         share_count, engagement_score, create_time, images_list}], total, next_cursor}
+        total 只在第一页（不带 cursor）返回，之后的页为 None
     """
     try:
-        from database.connection import get_database
         import time as _time
 
-        db = get_database()
-
-        # 从 user_snapshots 读取
-        snapshot = db.user_snapshots.find_one(
-            {"user_id": user_id, "platform": platform},
-            {"notes": 1, "nickname": 1, "_id": 0}
-        )
-        if not snapshot or "notes" not in snapshot:
-            raise HTTPException(status_code=404, detail=f"未找到用户 {user_id} 的笔记数据")
-
-        raw_notes = snapshot["notes"]
-        nickname = snapshot.get("nickname", "")
+        note_repo = AsyncNoteRepository()
 
         # 可选：按时间过滤
-        if days is not None:
-            cutoff = _time.time() - days * 86400
-            raw_notes = [n for n in raw_notes if (n.get("create_time") or 0) >= cutoff]
+        since = int(_time.time() - days * 86400) if days is not None else None
+
+        total = None
+        if cursor is None:
+            total = await note_repo.count_notes(user_id, platform, since)
+            if total == 0 and (since is None or await note_repo.count_notes(user_id, platform) == 0):
+                raise HTTPException(status_code=404, detail=f"未找到用户 {user_id} 的笔记数据")
+
+        try:
+            # 笔记分页和昵称互不依赖，并发查询
+            page, snapshot = await asyncio.gather(
+                note_repo.get_notes_page(
+                    user_id, platform,
+                    fields=["id", "title", "display_title", "desc", "likes", "collected_count", "comments_count",
+                            "share_count", "engagement", "create_time", "type", "images_list"],
+                    sort="latest" if sort == "latest" else "engagement",
+                    limit=max(1, limit),
+                    after=cursor,
+                    since=since
+                ),
+                AsyncUserSnapshotRepository().get_by_user_id(user_id, platform, fields=["nickname"])
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        nickname = (snapshot or {}).get("nickname", "")
 
-        # 计算互动分并构造返回结构
+        # 构造返回结构
         results = []
-        for n in raw_notes:
-            likes = n.get("likes", 0) or 0
-            collected = n.get("collected_count", 0) or 0
-            comments = n.get("comments_count", 0) or 0
-            shares = n.get("share_count", 0) or 0
-            engagement = likes + collected * 2 + comments * 3 + shares * 4
-
+        for n in page["notes"]:
             results.append({
                 "id": n.get("id", ""),
                 "title": n.get("display_title") or n.get("title") or "",
                 "desc": n.get("desc", ""),
-                "likes": likes,
-                "collected_count": collected,
-                "comments_count": comments,
-                "share_count": shares,
-                "engagement_score": engagement,
+                "likes": n.get("likes", 0) or 0,
+                "collected_count": n.get("collected_count", 0) or 0,
+                "comments_count": n.get("comments_count", 0) or 0,
+                "share_count": n.get("share_count", 0) or 0,
+                "engagement_score": n.get("engagement", 0),
                 "create_time": n.get("create_time"),
                 "type": n.get("type", "normal"),
                 "images_list": (n.get("images_list") or [])[:1],  # 只返回第一张图
             })
 
-        # 排序
-        if sort == "latest":
-            results.sort(key=lambda x: x["create_time"] or 0, reverse=True)
-        else:
-            results.sort(key=lambda x: x["engagement_score"], reverse=True)
-
-        total = len(results)
-        results = results[:limit]
-
         return {
             "success": True,
             "user_id": user_id,
             "nickname": nickname,
             "notes": results,
             "total": total,
+            "next_cursor": page["next_cursor"],
         }
 
     except HTTPException:
@@ -411,8 +493,8 @@ async def get_creator_detail(creator_name: str, platform: str = "xiaohongshu"):
         创作者详细信息
     """
     try:
-        profile_repo = UserProfileRepository()
-        profile = profile_repo.get_profile_by_nickname(creator_name, platform)
+        profile_repo = AsyncUserProfileRepository()
+        profile = await profile_repo.get_profile_by_nickname(creator_name, platform)
         
         if not profile:
             raise HTTPException(status_code=404, detail=f"未找到创作者: {creator_name}")
@@ -459,8 +541,8 @@ async def add_creator(request: AddCreatorRequest, background_tasks: BackgroundTa
             raise HTTPException(status_code=400, detail="无效的用户ID格式")
         
         # 检查创作者是否已存在
-        profile_repo = UserProfileRepository()
-        existing = profile_repo.get_by_user_id(request.user_id, "xiaohongshu")
+        profile_repo = AsyncUserProfileRepository()
+        existing = await profile_repo.get_by_user_id(request.user_id, "xiaohongshu")
         
         if existing:
             nickname = existing.get('basic_info', {}).get('nickname') or existing.get('nickname', request.user_id)
@@ -476,34 +558,19 @@ async def add_creator(request: AddCreatorRequest, background_tasks: BackgroundTa
             result = await task.run()
             
             # 更新最终结果
-            from database.connection import get_database
-            db = get_database()
-            db.task_logs.update_one(
+            await get_async_database().task_logs.update_one(
                 {"task_id": task_id},
                 {"$set": {"result": result}}
             )
             
-            # 如果任务成功，重新生成网络数据
+            # 如果任务成功，只把新创作者增量加入网络
             if result.get("success"):
                 try:
-                    import subprocess
-                    import os
-                    
-                    # 获取backend目录路径
-                    backend_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-                    script_path = os.path.join(backend_dir, "scripts", "regenerate_creator_networks.py")
-                    
-                    # 执行脚本重新生成网络
-                    print(f"🔄 重新生成创作者网络...")
-                    subprocess.run(
-                        ["python3", script_path],
-                        cwd=backend_dir,
-                        check=True,
-                        capture_output=True
-                    )
-                    print(f"✅ 网络数据已更新")
+                    print(f"🔄 增量更新创作者网络...")
+                    update = await update_network_for_creator(request.user_id)
+                    print(f"✅ 网络数据已更新（新增 {len(update.get('edges', []))} 条连接）")
                 except Exception as e:
-                    print(f"⚠️  重新生成网络失败（不影响添加结果）: {e}")
+                    print(f"⚠️  更新网络失败（不影响添加结果）: {e}")
         
         # 添加到后台任务队列
         background_tasks.add_task(run_task)
@@ -570,8 +637,8 @@ async def refresh_creator_data(user_id: str, background_tasks: BackgroundTasks):
     """
     try:
         # 检查创作者是否存在
-        profile_repo = UserProfileRepository()
-        existing = profile_repo.get_profile_by_user_id(user_id, "xiaohongshu")
+        profile_repo = AsyncUserProfileRepository()
+        existing = await profile_repo.get_by_user_id(user_id, "xiaohongshu")
         
         if not existing:
             raise HTTPException(status_code=404, detail="创作者不存在")
@@ -581,9 +648,8 @@ async def refresh_creator_data(user_id: str, background_tasks: BackgroundTasks):
         task_id = task_info["task_id"]
         
         # 更新任务类型
-        from database.connection import get_database
-        db = get_database()
-        db.task_logs.update_one(
+        db = get_async_database()
+        await db.task_logs.update_one(
             {"task_id": task_id},
             {"$set": {"task_type": "refresh_creator"}}
         )
@@ -592,10 +658,17 @@ async def refresh_creator_data(user_id: str, background_tasks: BackgroundTasks):
         async def run_task():
             task = CollectorTask(user_id, task_id)
             result = await task.run()
-            db.task_logs.update_one(
+            await db.task_logs.update_one(
                 {"task_id": task_id},
                 {"$set": {"result": result}}
             )
+            
+            # 刷新成功后替换网络中的旧节点和连边
+            if result.get("success"):
+                try:
+                    await update_network_for_creator(user_id)
+                except Exception as e:
+                    print(f"⚠️  更新网络失败（不影响刷新结果）: {e}")
         
         background_tasks.add_task(run_task)
         
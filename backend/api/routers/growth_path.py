@@ -18,7 +18,8 @@ async def analyze_growth_path(
     competitor_user_id: str,
     top_n: int = Query(default=5, ge=1, le=20, description="返回前N个建议"),
     min_engagement: float = Query(default=1.0, ge=0.1, description="最小互动指数（1.0 = 1000互动数）"),
-    days: Optional[int] = Query(default=None, ge=1, le=365, description="只看最近N天的笔记，不传则不限")
+    days: Optional[int] = Query(default=None, ge=1, le=365, description="只看最近N天的笔记，不传则不限"),
+    refresh: bool = Query(default=False, description="忽略已保存的结果，重新分析")
 ):
     """
     分析成长路径：基于竞品爆款内容生成创作建议
@@ -33,6 +34,7 @@ async def analyze_growth_path(
     - competitor_user_id: 竞品/参考创作者的用户ID
     - top_n: 返回几个创作建议（默认5个）
     - min_engagement: 爆款阈值，互动指数≥此值才算爆款（默认1.0，即1000互动数）
+    - refresh: 强制重新分析（默认读取 growth_opportunities 中的预计算结果）
     
     **返回：**
     - my_profile: 我的基础信息（昵称、内容方向）
@@ -45,6 +47,8 @@ async def analyze_growth_path(
       - direction: 内容方向建议
       - angles: 可以切入的角度
     - summary: 总体策略建议
+    - computed_at: 结果的计算时间
+    - stale: 结果是否已过期（过期时返回旧结果，同时在后台重新计算）
     
     **示例：**
     ```
@@ -54,12 +58,13 @@ async def analyze_growth_path(
     try:
         service = GrowthPathService()
         
-        result = await service.analyze_growth_opportunities(
+        result = await service.get_growth_opportunities(
             my_user_id=my_user_id,
             competitor_user_id=competitor_user_id,
             top_n=top_n,
             min_engagement_index=min_engagement,
-            days=days
+            days=days,
+            refresh=refresh
         )
         
         return {
@@ -86,48 +91,37 @@ async def get_potential_competitors(
     返回与我相似的其他创作者，可以作为参考对象
     """
     try:
-        from database.connection import get_database
-        db = get_database()
+        from database import AsyncCreatorNetworkRepository
+        network_repo = AsyncCreatorNetworkRepository()
         
-        # 从网络数据中找到与该用户连接的其他创作者
-        network = db.creator_networks.find_one({'platform': 'xiaohongshu'})
-        if not network:
-            return {
-                'success': True,
-                'data': {
-                    'competitors': [],
-                    'message': '网络数据不存在，请先生成创作者网络'
+        # 只读取该用户的自我中心网络（相邻节点 + 连边），不加载整张图
+        ego = await network_repo.get_ego_network(
+            user_id, 'xiaohongshu',
+            fields=['name', 'nickname', 'followers', 'totalEngagement', 'noteCount', 'topics', 'avatar']
+        )
+        if not ego:
+            if not await network_repo.count({'platform': 'xiaohongshu'}):
+                return {
+                    'success': True,
+                    'data': {
+                        'competitors': [],
+                        'message': '网络数据不存在，请先生成创作者网络'
+                    }
                 }
-            }
-        
-        network_data = network.get('network_data', {})
-        edges = network_data.get('edges', [])
-        creators = network_data.get('creators', [])
-        
-        # 找到所有与该用户连接的边
-        connected_user_ids = set()
-        for edge in edges:
-            if edge['source'] == user_id:
-                connected_user_ids.add(edge['target'])
-            elif edge['target'] == user_id:
-                connected_user_ids.add(edge['source'])
+            ego = {'neighbors': []}
         
         # 获取连接的创作者信息
         competitors = []
-        creator_map = {c['id']: c for c in creators}
-        
-        for uid in connected_user_ids:
-            if uid in creator_map:
-                c = creator_map[uid]
-                competitors.append({
-                    'user_id': c['id'],
-                    'nickname': c.get('nickname', c.get('name', '')),
-                    'followers': c.get('followers', 0),
-                    'total_engagement': c.get('totalEngagement', 0),
-                    'note_count': c.get('noteCount', 0),
-                    'topics': c.get('topics', [])[:3],
-                    'avatar': c.get('avatar', '')
-                })
+        for c in ego['neighbors']:
+            competitors.append({
+                'user_id': c['id'],
+                'nickname': c.get('nickname', c.get('name', '')),
+                'followers': c.get('followers', 0),
+                'total_engagement': c.get('totalEngagement', 0),
+                'note_count': c.get('noteCount', 0),
+                'topics': c.get('topics', [])[:3],
+                'avatar': c.get('avatar', '')
+            })
         
         # 按互动数排序
         competitors.sort(key=lambda x: x['total_engagement'], reverse=True)
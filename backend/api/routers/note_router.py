@@ -3,6 +3,8 @@
 提供基于 embedding 的语义搜索接口
 """
 
+import asyncio
+import functools
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Optional
@@ -10,7 +12,8 @@ from typing import Optional
 from api.services.note_search_service import (
     search_notes,
     get_note_stats,
-    invalidate_cache
+    invalidate_cache,
+    build_index
 )
 
 router = APIRouter(prefix="/api/notes", tags=["笔记搜索"])
@@ -21,6 +24,7 @@ class NoteSearchRequest(BaseModel):
     query: str = Field(..., min_length=1, max_length=500, description="搜索关键词/句子")
     top_k: int = Field(default=10, ge=1, le=50, description="返回结果数量")
     min_engagement: float = Field(default=0.0, ge=0.0, description="最低互动指数过滤")
+    index: Optional[str] = Field(default=None, description="检索索引：exact / ivf / hnsw，不传使用服务端默认")
 
 
 @router.post("/search")
@@ -28,15 +32,21 @@ async def api_search_notes(request: NoteSearchRequest):
     """
     语义搜索笔记
     
-    用户输入关键词 → embedding → 与所有笔记计算余弦相似度 → 返回 top-k 结果
+    用户输入关键词 → embedding → 通过索引（暴力 / IVF / HNSW）检索余弦相似度最高的笔记 → 返回 top-k 结果
     """
     try:
-        result = search_notes(
+        # embedding 计算和索引检索是 CPU 密集的同步操作，放到线程池执行避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, functools.partial(
+            search_notes,
             query=request.query,
             top_k=request.top_k,
             min_engagement=request.min_engagement,
-        )
+            index_type=request.index,
+        ))
         return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"搜索失败: {str(e)}")
 
@@ -45,7 +55,7 @@ async def api_search_notes(request: NoteSearchRequest):
 async def api_note_stats():
     """获取笔记 embedding 统计信息"""
     try:
-        return get_note_stats()
+        return await get_note_stats()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取统计失败: {str(e)}")
 
@@ -58,3 +68,15 @@ async def api_invalidate_cache():
         return {"success": True, "message": "缓存已清除"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"清除缓存失败: {str(e)}")
+
+
+@router.post("/index/build")
+async def api_build_index(index: Optional[str] = None):
+    """预构建并持久化 ANN 索引（避免首个搜索请求承担构建开销）"""
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, build_index, index)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"构建索引失败: {str(e)}")
@@ -87,7 +87,7 @@ async def get_user_persona(
     """
     try:
         service = get_persona_service()
-        persona = service.get_persona(user_id, platform)
+        persona = await service.get_persona(user_id, platform)
         
         if not persona:
             raise HTTPException(
@@ -120,7 +120,7 @@ async def list_user_personas(
     """
     try:
         service = get_persona_service()
-        personas = service.list_personas(platform, limit)
+        personas = await service.list_personas(platform, limit)
         
         return PersonaListResponse(
             success=True,
@@ -145,7 +145,7 @@ async def delete_user_persona(
     """
     try:
         service = get_persona_service()
-        result = service.db.user_personas.delete_one({
+        result = await service.db.user_personas.delete_one({
             "user_id": user_id,
             "platform": platform.value
         })
@@ -2,7 +2,10 @@
 Style Generation API Router - 使用Service层
 """
 
+import json
+
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict
 
@@ -73,6 +76,7 @@ class GenerateRequest(BaseModel):
     user_input: str  # 改为user_input以匹配前端
     platform: str = "xiaohongshu"  # 可选字段，默认小红书
     prompt_type: str = "style_generation"  # 可选字段，默认使用风格生成模板
+    semantic_cache: bool = False  # 可选，主题相近的请求复用历史生成结果
 
 
 class GenerateResponse(BaseModel):
@@ -115,7 +119,7 @@ async def list_creators(platform: str = None):
             
             all_creators = []
             for plat in ["xiaohongshu", "instagram"]:
-                creators = service.get_available_creators(plat)
+                creators = await service.get_available_creators(plat)
                 # 为每个创作者添加platform字段
                 for creator in creators:
                     creator["platform"] = plat
@@ -135,7 +139,7 @@ async def list_creators(platform: str = None):
             if cached_data is not None:
                 return cached_data
             
-            creators = service.get_available_creators(platform)
+            creators = await service.get_available_creators(platform)
             # 添加platform字段
             for creator in creators:
                 creator["platform"] = platform
@@ -163,6 +167,17 @@ async def clear_cache():
     return {"success": True, "message": "缓存已清除"}
 
 
+@router.get("/llm-stats")
+async def get_llm_stats():
+    """
+    获取LLM网关调用统计（缓存命中、相同请求合并、API调用次数及节省的token/成本）
+    
+    统计为进程内计数，服务重启后清零
+    """
+    from core.llm_gateway import get_llm_gateway
+    return {"success": True, "stats": get_llm_gateway().get_stats()}
+
+
 @router.post("/generate", response_model=GenerateResponse)
 async def generate_style_content(request: GenerateRequest):
     """
@@ -180,7 +195,8 @@ async def generate_style_content(request: GenerateRequest):
             creator_name=request.creator_name,
             user_topic=request.user_input,  # 使用user_input字段
             platform=request.platform,
-            prompt_type=request.prompt_type  # 传递prompt_type
+            prompt_type=request.prompt_type,  # 传递prompt_type
+            semantic_cache=request.semantic_cache
         )
         return result
     except Exception as e:
@@ -191,6 +207,41 @@ async def generate_style_content(request: GenerateRequest):
         )
 
 
+@router.post("/generate/stream")
+async def generate_style_content_stream(request: GenerateRequest):
+    """
+    流式生成风格化内容（Server-Sent Events）
+    
+    每个事件为一行 `data: {json}`：
+    - {"type": "chunk", "content": "..."}  生成的文本片段（缓存命中时为完整文本）
+    - {"type": "done"}                     生成结束
+    - {"type": "error", "error": "..."}    生成失败
+    
+    Args:
+        request: 生成请求（创作者名称、主题、平台、prompt类型）
+    """
+    service = get_style_service()
+    
+    async def event_stream():
+        async for event in service.generate_content_stream(
+            creator_name=request.creator_name,
+            user_topic=request.user_input,
+            platform=request.platform,
+            prompt_type=request.prompt_type,
+            semantic_cache=request.semantic_cache
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # 禁用 nginx 缓冲，保证逐块推送
+        }
+    )
+
+
 @router.get("/prompts")
 async def list_prompt_templates(platform: str = "xiaohongshu"):
     """
@@ -203,10 +254,10 @@ async def list_prompt_templates(platform: str = "xiaohongshu"):
         prompt模板列表
     """
     try:
-        from database.repositories import StylePromptRepository
+        from database.async_repositories import AsyncStylePromptRepository
         
-        repo = StylePromptRepository()
-        prompts = repo.get_all_prompts(platform)
+        repo = AsyncStylePromptRepository()
+        prompts = await repo.get_all_prompts(platform)
         
         # 转换为前端需要的格式
         prompt_list = []
@@ -239,15 +290,15 @@ async def health_check():
 async def debug_database():
     """调试数据库连接 - 仅用于排查问题"""
     try:
-        from database.connection import get_database
-        db = get_database()
+        from database.connection import get_async_database
+        db = get_async_database()
         
         # 测试连接
-        collections = db.list_collection_names()
-        user_profiles_count = db.user_profiles.count_documents({})
+        collections = await db.list_collection_names()
+        user_profiles_count = await db.user_profiles.count_documents({})
         
         # 获取一个示例
-        sample = db.user_profiles.find_one() if user_profiles_count > 0 else None
+        sample = await db.user_profiles.find_one() if user_profiles_count > 0 else None
         
         return {
             "status": "connected",
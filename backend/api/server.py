@@ -1,18 +1,32 @@
 """
 FastAPI服务 - 提供数据分析API（三层架构版本）
 """
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from core.config import settings
+from database.loaders import RequestLoaderMiddleware
+
 # 导入新的路由（使用Service层和Database层）
 from api.routers import style_router, creator_router, persona_router, note_router, growth_path
 
+# 应用日志（LLM Gateway 等模块使用 logging 输出结构化日志）
+logging.basicConfig(
+    level=settings.LOG_LEVEL,
+    format="%(asctime)s %(levelname)s %(name)s %(message)s"
+)
+
 app = FastAPI(
     title="XHS Data Analysis API",
     version="2.0.0",
     description="小红书数据分析API - 三层架构版本"
 )
 
+# 请求级 data loader：同一请求内的按键查询合并为 $in 查询并缓存
+app.add_middleware(RequestLoaderMiddleware)
+
 # 配置CORS
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +36,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up_caches():
+    """启动后台刷新线程，预热笔记 embedding 缓存（搜索请求不再承担加载开销）"""
+    from api.services.note_search_service import start_background_refresher
+    start_background_refresher()
+
+
+@app.on_event("shutdown")
+async def flush_llm_usage_logs():
+    """关闭前写入缓冲中的LLM使用统计，然后关闭数据库连接"""
+    from core.llm_gateway import shutdown_llm_gateway
+    from database.connection import close_connection
+    await shutdown_llm_gateway()
+    close_connection()
+
+
 # 注册路由（新架构）
 app.include_router(style_router, tags=["风格生成"])
 app.include_router(creator_router, tags=["创作者数据"])
@@ -65,10 +95,11 @@ async def root():
 @app.get("/api/health")
 async def health_check():
     """健康检查"""
-    from database.connection import test_connection
+    from database.connection import test_async_connection
+    from database.pool_metrics import get_pool_stats
     
     # 测试数据库连接
-    db_connected = test_connection()
+    db_connected = await test_async_connection()
     
     return {
         "status": "ok" if db_connected else "degraded",
@@ -76,7 +107,8 @@ async def health_check():
         "architecture": "three-tier",
         "database": {
             "connected": db_connected,
-            "type": "MongoDB Atlas"
+            "type": "MongoDB Atlas",
+            "pool": get_pool_stats()
         },
         "services": {
             "style_generation": "active",
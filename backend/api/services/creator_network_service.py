@@ -0,0 +1,416 @@
+"""
+创作者网络构建服务
+在进程内生成/增量更新创作者网络，代替 subprocess 调用 regenerate_creator_networks.py：
+- build_full: 全量重建（分块矩阵乘法计算所有两两相似度）
+- add_creator: 新增/刷新单个创作者时只计算该创作者与已缓存矩阵的一次矩阵向量乘，
+  然后把节点和连边写入当前网络版本（creator_network_nodes / creator_network_edges）
+"""
+
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import settings
+from core.note_stats import calculate_note_stats
+from core.similarity import (
+    DEFAULT_BLOCK_SIZE,
+    knn_edges,
+    normalize_rows,
+    threshold_edges,
+    top_k_neighbors,
+)
+from database import CreatorNetworkRepository, CreatorStatsRepository
+from database.connection import get_database, get_analytics_database
+from database.vector_codec import decode_vector
+
+
+# 网络节点的互动数据统计窗口（天）
+RECENT_DAYS = 30
+# 计算近期统计需要的笔记字段
+RECENT_NOTE_FIELDS = [
+    'id', 'note_id', 'create_time', 'title', 'display_title',
+    'likes', 'collected_count', 'comments_count', 'share_count',
+]
+
+
+def build_creator_node(profile: Dict[str, Any], creator_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    把 user_profiles 文档转换为网络节点
+
+    Args:
+        profile: user_profiles 文档
+        creator_stats: creator_stats 文档；提供时互动数据以它为准（最近30天），
+            否则回退到 profile.stats 中的统计
+
+    Returns:
+        前端期望的创作者节点结构
+    """
+    basic_info = profile.get('basic_info', {})
+    stats = profile.get('stats', {})
+    profile_data = profile.get('profile_data', {})
+    if creator_stats:
+        recent = creator_stats.get('recent', {})
+        stats = {
+            **stats,
+            'total_engagement': recent.get('total_engagement', 0),
+            'total_likes': recent.get('total_likes', 0),
+            'total_collects': recent.get('total_collects', 0),
+            'total_comments': recent.get('total_comments', 0),
+            'total_shares': recent.get('total_shares', 0),
+            'note_count': recent.get('note_count', 0),
+            'index_series': creator_stats.get('index_series', []),
+        }
+
+    # 从profile_data获取topics
+    content_topics = profile_data.get('content_topics', [])
+    if not content_topics:
+        # fallback到旧的user_style
+        user_style = profile_data.get('user_style', {})
+        interests = user_style.get('interests', [])
+        content_topics = interests if interests else ['综合内容']
+
+    return {
+        'id': profile['user_id'],
+        'name': basic_info.get('nickname', profile.get('nickname', 'Unknown')),
+        'followers': stats.get('fans', 0),
+        'fansGrowth7d': 0,  # TODO: 可以从stats_history计算
+        'totalEngagement': stats.get('total_engagement', 0),
+        'totalLikes': stats.get('total_likes', 0),
+        'totalCollects': stats.get('total_collects', 0),
+        'totalComments': stats.get('total_comments', 0),
+        'totalShares': stats.get('total_shares', 0),
+        'noteCount': stats.get('note_count', 0),
+        'primaryTrack': content_topics[0] if content_topics else '综合内容',
+        'contentForm': '创作者',
+        'recentKeywords': [],
+        'position': {'x': 0, 'y': 0},
+        'avatar': basic_info.get('avatar', ''),
+        'ipLocation': basic_info.get('ip_location', ''),
+        'desc': basic_info.get('desc', ''),
+        'redId': basic_info.get('red_id', ''),
+        'topics': content_topics[:8],  # 最多8个话题
+        'indexSeries': stats.get('index_series', [])  # 包含笔记标题用于成长路径功能
+    }
+
+
+def build_edge(source: str, target: str, similarity: float) -> Dict[str, Any]:
+    """构造一条相似度连边"""
+    return {
+        'source': source,
+        'target': target,
+        'weight': similarity,
+        'types': {
+            'keyword': similarity,
+            'audience': 0,
+            'style': 0,
+            'campaign': 0
+        }
+    }
+
+
+class CreatorNetworkBuilder:
+    """
+    创作者网络构建器
+
+    缓存当前网络节点顺序对应的归一化 embedding 矩阵，新增创作者时只需一次矩阵向量乘。
+    所有方法都是同步的（CPU + PyMongo），在 API 中通过 run_in_executor 调用。
+    """
+
+    def __init__(self, platform: str = "xiaohongshu"):
+        self.platform = platform
+        self.db = get_database()
+        # 全量扫描走分析读偏好（默认 secondaryPreferred），按ID读取仍读主节点
+        self.analytics_db = get_analytics_database()
+        self.network_repo = CreatorNetworkRepository()
+        self.stats_repo = CreatorStatsRepository()
+        self._lock = threading.Lock()
+        # 缓存：与已存储网络的节点顺序对齐
+        self._cache_key = None  # (network_version, updated_at)
+        self._user_ids: List[str] = []
+        self._row_of: Dict[str, int] = {}
+        self._matrix: Optional[np.ndarray] = None
+
+    # ------------------------------------------------------------------
+    # 数据加载
+    # ------------------------------------------------------------------
+
+    def _load_embeddings(self, user_ids: Optional[List[str]] = None, db=None) -> Dict[str, np.ndarray]:
+        """读取用户 embedding（跳过维度不一致的旧向量）；db 默认：按ID读主节点，全量扫描走分析读偏好"""
+        query: Dict[str, Any] = {'platform': self.platform}
+        if user_ids is not None:
+            query['user_id'] = {'$in': list(user_ids)}
+
+        if db is None:
+            db = self.db if user_ids is not None else self.analytics_db
+        embeddings = {}
+        skipped_dim = 0
+        for doc in db.user_embeddings.find(query, {'user_id': 1, 'embedding': 1, '_id': 0}):
+            user_id = doc.get('user_id')
+            vector = doc.get('embedding')
+            if not user_id or vector is None or len(vector) == 0:
+                continue
+            vector = decode_vector(vector)
+            # 维度不一致的旧向量无法参与矩阵运算
+            if len(vector) != settings.EMBEDDING_DIMENSION:
+                skipped_dim += 1
+                continue
+            embeddings[user_id] = vector
+
+        if skipped_dim:
+            print(f"[CreatorNetwork] ⚠️  跳过 {skipped_dim} 个维度不是 {settings.EMBEDDING_DIMENSION} 的embedding")
+        return embeddings
+
+    def _load_recent_stats(self, db, stats_map: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        按 notes 集合重新计算所有创作者最近 RECENT_DAYS 天的互动统计
+
+        creator_stats.recent 只在写入笔记时刷新，创作者停更后会一直停留在最后一次写入时的窗口；
+        这里用一次 $match create_time / $group 聚合得到当前窗口内的笔记。
+
+        Args:
+            db: 读取使用的数据库
+            stats_map: creator_stats 文档（含 recent / index_series / last_note_time）
+
+        Returns:
+            {user_id: {recent, index_series}}，结构与 creator_stats 一致；
+            最新笔记早于窗口的创作者为零；notes 尚未回填的创作者沿用 creator_stats
+        """
+        cutoff = int((datetime.now() - timedelta(days=RECENT_DAYS)).timestamp())
+        pipeline = [
+            {'$match': {'platform': self.platform, 'create_time': {'$gte': cutoff}}},
+            {'$sort': {'create_time': 1}},
+            {'$project': {'_id': 0, 'user_id': 1, **{f: 1 for f in RECENT_NOTE_FIELDS}}},
+            {'$group': {'_id': '$user_id', 'notes': {'$push': '$$ROOT'}}},
+        ]
+
+        def as_creator_stats(notes: List[Dict[str, Any]]) -> Dict[str, Any]:
+            stats = calculate_note_stats(notes, days=None)  # 已按窗口过滤
+            index_series = stats.pop('index_series')
+            return {'recent': {'days': RECENT_DAYS, **stats}, 'index_series': index_series}
+
+        recent_map = {doc['_id']: as_creator_stats(doc['notes']) for doc in db.notes.aggregate(pipeline, allowDiskUse=True)}
+        for user_id, stats in stats_map.items():
+            if user_id in recent_map:
+                continue
+            if (stats.get('last_note_time') or 0) < cutoff:
+                recent_map[user_id] = as_creator_stats([])
+            else:
+                recent_map[user_id] = stats
+        return recent_map
+
+    @staticmethod
+    def _key_of(meta: Optional[Dict[str, Any]]):
+        return (meta['network_version'], meta.get('updated_at')) if meta else None
+
+    def _set_cache(self, cache_key: Any, user_ids: List[str], matrix: np.ndarray):
+        self._cache_key = cache_key
+        self._user_ids = list(user_ids)
+        self._row_of = {uid: i for i, uid in enumerate(self._user_ids)}
+        self._matrix = matrix
+
+    def _ensure_cache(self) -> Optional[Dict[str, Any]]:
+        """
+        确保缓存矩阵与最新的已存储网络一致（网络被重建或被其他进程修改后自动重新加载）
+
+        Returns:
+            最新网络版本的清单，没有（规范化存储的）网络时返回 None
+        """
+        meta = self.network_repo.get_latest_version(self.platform)
+        if not meta:
+            return None
+        if self._key_of(meta) == self._cache_key and self._matrix is not None:
+            return meta
+
+        t0 = time.time()
+        creator_ids = self.network_repo.get_network_creator_ids(meta['network_version'])
+        embeddings = self._load_embeddings(creator_ids)
+        user_ids = [uid for uid in creator_ids if uid in embeddings]
+        matrix = normalize_rows([embeddings[uid] for uid in user_ids])
+        self._set_cache(self._key_of(meta), user_ids, matrix)
+        print(f"[CreatorNetwork] 已加载 {len(user_ids)} 个节点的向量矩阵 ({time.time() - t0:.2f}s)")
+        return meta
+
+    # ------------------------------------------------------------------
+    # 全量构建
+    # ------------------------------------------------------------------
+
+    def build_full(
+        self,
+        similarity_threshold: float = 0.5,
+        top_k: int = 0,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        use_primary: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        全量重建创作者网络，写入一个新的网络版本（旧版本由仓库自动清理）
+
+        Args:
+            similarity_threshold: 相似度阈值 (0-1)
+            top_k: >0 时每个创作者只连最相似的 top_k 个邻居（仍需超过阈值），0 表示阈值全连接
+            block_size: 分块矩阵乘法每块的行数（控制内存占用）
+            use_primary: 从主节点读取（刚写入 profile / embedding 后重建时使用，避免从节点同步延迟漏掉新数据），
+                默认走分析读偏好
+
+        Returns:
+            {creators, edges}
+        """
+        with self._lock:
+            t0 = time.time()
+            db = self.db if use_primary else self.analytics_db
+            profiles = list(db.user_profiles.find({'platform': self.platform}))
+            embeddings = self._load_embeddings(db=db)
+            print(f"[CreatorNetwork] 读取 {len(profiles)} 个profile, {len(embeddings)} 个embedding")
+
+            stats_map = self._load_recent_stats(db, self.stats_repo.get_stats_map(
+                self.platform, fields=['recent', 'index_series', 'last_note_time']
+            ))
+
+            # 只包含有embedding的用户
+            creators = [
+                build_creator_node(p, stats_map.get(p['user_id']))
+                for p in profiles if p.get('user_id') in embeddings
+            ]
+            user_ids = [c['id'] for c in creators]
+            matrix = normalize_rows([embeddings[uid] for uid in user_ids])
+
+            edges = []
+            if len(creators) >= 2:
+                # 归一化后内积即余弦相似度，分块矩阵乘法代替逐对计算
+                if top_k > 0:
+                    neighbor_idx, neighbor_scores = top_k_neighbors(matrix, top_k, block_size=block_size)
+                    sources, targets, weights = knn_edges(neighbor_idx, neighbor_scores, threshold=similarity_threshold)
+                else:
+                    sources, targets, weights = threshold_edges(matrix, similarity_threshold, block_size=block_size)
+                edges = [
+                    build_edge(user_ids[i], user_ids[j], w)
+                    for i, j, w in zip(sources.tolist(), targets.tolist(), weights.tolist())
+                ]
+
+            # 记录构建参数，增量追加时沿用
+            version = self.network_repo.create_network_version(
+                self.platform, creators, edges,
+                meta={'similarity_threshold': similarity_threshold, 'top_k': top_k}
+            )
+            meta = self.network_repo.get_latest_version(self.platform)
+            self._set_cache(self._key_of(meta), user_ids, matrix)
+
+            print(f"[CreatorNetwork] ✅ 全量构建完成 (版本 {version}): {len(creators)} 个创作者, "
+                  f"{len(edges)} 条连接 ({time.time() - t0:.2f}s)")
+            return {'creators': creators, 'edges': edges, 'network_version': version}
+
+    # ------------------------------------------------------------------
+    # 增量更新
+    # ------------------------------------------------------------------
+
+    def add_creator(self, user_id: str, similarity_threshold: Optional[float] = None) -> Dict[str, Any]:
+        """
+        新增（或刷新）单个创作者：计算其与已有节点的相似度，追加节点和连边
+
+        kNN 模式（网络以 top_k > 0 构建）下新节点还会挤占已有节点的 top-k 名单，
+        只追加新节点的边与全量构建结果不一致，因此退化为全量构建。
+
+        Args:
+            user_id: 创作者用户ID
+            similarity_threshold: 相似度阈值，默认沿用网络构建时的阈值
+
+        Returns:
+            {
+                'rebuilt': 是否退化为全量构建（尚无网络、只有旧格式网络或 kNN 模式时）,
+                'node': 新节点, 'edges': 新连边,
+                'replaced': 是否替换了已存在的同名节点
+            }
+        """
+        # 整个增量过程持有锁：缓存、网络版本和写入必须对应同一版本，期间不能插入 build_full
+        with self._lock:
+            meta = self._ensure_cache()
+            profile, vector = self._load_creator(user_id)
+            if meta is not None and not meta.get('top_k'):
+                return self._append_creator(meta, user_id, profile, vector, similarity_threshold)
+
+        # 退化为全量构建时释放锁（build_full 自己加锁）
+        if meta is None:
+            print("[CreatorNetwork] 尚无规范化存储的网络数据，执行全量构建")
+            threshold, top_k = 0.5, 0
+        else:
+            print(f"[CreatorNetwork] 网络为 kNN 模式 (top_k={meta['top_k']})，执行全量构建")
+            threshold, top_k = meta.get('similarity_threshold', 0.5), meta['top_k']
+        if similarity_threshold is not None:
+            threshold = similarity_threshold
+        # 新创作者的 profile / embedding 刚写入主节点，从节点可能还没同步
+        result = self.build_full(threshold, top_k=top_k, use_primary=True)
+        return {'rebuilt': True, **result}
+
+    def _load_creator(self, user_id: str) -> Tuple[Dict[str, Any], np.ndarray]:
+        """读取创作者的 profile 和 embedding，不存在时抛出 ValueError"""
+        profile = self.db.user_profiles.find_one({'user_id': user_id, 'platform': self.platform})
+        if not profile:
+            raise ValueError(f"用户 {user_id} 不存在")
+        vectors = self._load_embeddings([user_id])
+        if user_id not in vectors:
+            raise ValueError(f"用户 {user_id} 没有embedding向量")
+        return profile, vectors[user_id]
+
+    def _append_creator(
+        self,
+        meta: Dict[str, Any],
+        user_id: str,
+        profile: Dict[str, Any],
+        vector: np.ndarray,
+        similarity_threshold: Optional[float]
+    ) -> Dict[str, Any]:
+        """阈值模式下把创作者追加到 meta 对应的网络版本（调用方持有 self._lock）"""
+        threshold = similarity_threshold
+        if threshold is None:
+            threshold = meta.get('similarity_threshold', 0.5)
+
+        # 已在网络中（刷新数据）：先移除旧节点及其连边
+        replaced = user_id in self._row_of
+        if replaced:
+            self.network_repo.remove_creator(self.platform, meta['network_version'], user_id)
+            keep = np.ones(len(self._user_ids), dtype=bool)
+            keep[self._row_of[user_id]] = False
+            self._set_cache(
+                None,
+                [uid for uid in self._user_ids if uid != user_id],
+                self._matrix[keep]
+            )
+
+        vec = normalize_rows([vector])
+        edges = []
+        if self._matrix is not None and len(self._user_ids) > 0:
+            scores = self._matrix @ vec[0]
+            hits = np.nonzero(scores > threshold)[0]
+            edges = [build_edge(self._user_ids[i], user_id, float(scores[i])) for i in hits]
+
+        node = build_creator_node(
+            profile,
+            self.stats_repo.get_by_user_id(user_id, self.platform, fields=['recent', 'index_series'])
+        )
+        self.network_repo.append_creator(self.platform, meta['network_version'], node, edges)
+
+        matrix = vec if self._matrix is None or self._matrix.size == 0 else np.vstack([self._matrix, vec])
+        self._set_cache(
+            self._key_of(self.network_repo.get_latest_version(self.platform)),
+            self._user_ids + [user_id],
+            matrix
+        )
+
+        print(f"[CreatorNetwork] ✅ {'刷新' if replaced else '新增'}创作者 {node['name']}: {len(edges)} 条连接")
+        return {
+            'rebuilt': False, 'node': node, 'edges': edges, 'replaced': replaced,
+            'network_version': meta['network_version']
+        }
+
+
+# 全局构建器实例（懒加载，每个平台一个）
+_builders: Dict[str, CreatorNetworkBuilder] = {}
+
+
+def get_creator_network_builder(platform: str = "xiaohongshu") -> CreatorNetworkBuilder:
+    """获取创作者网络构建器单例"""
+    if platform not in _builders:
+        _builders[platform] = CreatorNetworkBuilder(platform)
+    return _builders[platform]
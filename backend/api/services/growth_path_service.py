@@ -2,35 +2,152 @@
 成长路径服务 - 基于竞品分析生成内容建议
 分析竞品爆款笔记，找出"他们做了但我没做"的内容方向
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from database.connection import get_database
-from core.llm_gateway import LLMGateway
+from database.async_repositories import (
+    AsyncNoteEmbeddingRepository,
+    AsyncCreatorStatsRepository,
+    AsyncGrowthOpportunityRepository,
+    AsyncNoteRepository
+)
+from database.loaders import load_profile, load_embedding, request_scope
+from database.vector_codec import decode_vector
+from core.llm_gateway import get_llm_gateway
+from core.llm_scheduler import PRIORITY_BATCH
+from core.config import settings
+from core.similarity import normalize_rows
+
+
+# 参与打分排序的竞品爆款笔记上限（按互动指数取前N条）
+MAX_SCORED_NOTES = 200
 
 
 class GrowthPathService:
     """成长路径分析服务"""
     
+    # 进行中的后台刷新：结果键 -> Task（服务按请求创建，放在类上才能跨请求去重）
+    _refreshing: Dict[tuple, asyncio.Task] = {}
+    
     def __init__(self):
-        self.db = get_database()
-        self.llm = LLMGateway()
+        self.llm = get_llm_gateway()
+        self.note_embedding_repo = AsyncNoteEmbeddingRepository()
+        self.stats_repo = AsyncCreatorStatsRepository()
+        self.result_repo = AsyncGrowthOpportunityRepository()
+        self.note_repo = AsyncNoteRepository()
+    
+    async def get_source_versions(self, user_ids: List[str], platform: str = "xiaohongshu") -> Dict[str, Any]:
+        """获取双方 creator_stats.updated_at（笔记快照写入时刷新），用于判断结果是否过期"""
+        stats = await self.stats_repo.get_stats_map(platform=platform, user_ids=user_ids, fields=["updated_at"])
+        return {user_id: stats.get(user_id, {}).get("updated_at") for user_id in user_ids}
+    
+    @staticmethod
+    def is_stale(doc: Dict[str, Any], source_versions: Dict[str, Any]) -> bool:
+        """任意一方的笔记快照已变化，或超过 GROWTH_RESULT_MAX_AGE_HOURS，结果即过期"""
+        if doc.get("source_versions") != source_versions:
+            return True
+        max_age = timedelta(hours=settings.GROWTH_RESULT_MAX_AGE_HOURS)
+        return datetime.now() - doc["computed_at"] > max_age
+    
+    async def compute_and_store(
+        self,
+        my_user_id: str,
+        competitor_user_id: str,
+        top_n: int = 5,
+        min_engagement_index: float = 1.0,
+        days: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        重新分析并保存到 growth_opportunities
+        
+        Returns:
+            analyze_growth_opportunities 的结果，附加 computed_at
+        """
+        # 先读取来源版本：分析期间有新快照写入时，下次读取会判定为过期
+        source_versions = await self.get_source_versions([my_user_id, competitor_user_id])
+        result = await self.analyze_growth_opportunities(
+            my_user_id=my_user_id,
+            competitor_user_id=competitor_user_id,
+            top_n=top_n,
+            min_engagement_index=min_engagement_index,
+            days=days
+        )
+        key = self.result_repo.make_key(my_user_id, competitor_user_id, top_n, min_engagement_index, days)
+        await self.result_repo.save_result(key, result, source_versions)
+        return {**result, "computed_at": datetime.now()}
+    
+    async def get_growth_opportunities(
+        self,
+        my_user_id: str,
+        competitor_user_id: str,
+        top_n: int = 5,
+        min_engagement_index: float = 1.0,
+        days: Optional[int] = None,
+        refresh: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取成长路径分析结果（优先读取预计算结果）
+        
+        - 有保存的结果：直接返回；已过期时同时在后台重新计算（本次仍返回旧结果，stale=True）
+        - 没有保存的结果或 refresh=True：当场分析并保存
+        
+        Returns:
+            analyze_growth_opportunities 的结果，附加 computed_at 和 stale
+        """
+        if not refresh:
+            key = self.result_repo.make_key(my_user_id, competitor_user_id, top_n, min_engagement_index, days)
+            doc = await self.result_repo.get_result(key)
+            if doc:
+                stale = self.is_stale(doc, await self.get_source_versions([my_user_id, competitor_user_id]))
+                if stale:
+                    self._schedule_refresh(my_user_id, competitor_user_id, top_n, min_engagement_index, days)
+                return {**doc["result"], "computed_at": doc["computed_at"], "stale": stale}
+        
+        result = await self.compute_and_store(my_user_id, competitor_user_id, top_n, min_engagement_index, days)
+        return {**result, "stale": False}
+    
+    def _schedule_refresh(
+        self,
+        my_user_id: str,
+        competitor_user_id: str,
+        top_n: int,
+        min_engagement_index: float,
+        days: Optional[int]
+    ):
+        """在后台重新计算过期结果（同一结果同时只刷新一次）"""
+        task_key = (my_user_id, competitor_user_id, top_n, float(min_engagement_index), days)
+        running = self._refreshing.get(task_key)
+        if running is not None and not running.done():
+            return
+        
+        async def _refresh():
+            try:
+                # 任务会复制发起请求的上下文，这里换成自己的 loader 作用域，读取最新数据
+                with request_scope():
+                    await self.compute_and_store(my_user_id, competitor_user_id, top_n, min_engagement_index, days)
+                print(f"🔄 成长路径结果已刷新: {my_user_id} → {competitor_user_id}")
+            except Exception as e:
+                print(f"⚠️  成长路径后台刷新失败: {my_user_id} → {competitor_user_id}: {e}")
+            finally:
+                self._refreshing.pop(task_key, None)
+        
+        self._refreshing[task_key] = asyncio.get_running_loop().create_task(_refresh())
     
-    def _build_index_series_from_snapshots(self, user_id: str) -> List[Dict]:
+    async def _build_index_series_from_notes(self, user_id: str) -> List[Dict]:
         """
-        从 user_snapshots.notes 构建 index_series 格式数据
+        从 notes 集合构建 index_series 格式数据（只投影需要的字段）
         当 user_profiles.stats.index_series 为空时作为回退
         """
-        snapshot = self.db.user_snapshots.find_one(
-            {'user_id': user_id},
-            {'notes': 1}
+        notes = await self.note_repo.get_notes(
+            user_id,
+            fields=['id', 'cursor', 'title', 'display_title', 'create_time',
+                    'likes', 'collected_count', 'comments_count', 'share_count']
         )
-        if not snapshot or not snapshot.get('notes'):
-            return []
         
         index_series = []
-        for note in snapshot['notes']:
+        for note in notes:
             likes = note.get('likes', 0) or 0
             collected = note.get('collected_count', 0) or 0
             comments = note.get('comments_count', 0) or 0
@@ -54,7 +171,8 @@ class GrowthPathService:
         competitor_user_id: str,
         top_n: int = 5,
         min_engagement_index: float = 1.0,  # 至少1000互动数
-        days: Optional[int] = None  # 只看最近N天的笔记
+        days: Optional[int] = None,  # 只看最近N天的笔记
+        nearest_k: int = 3
     ) -> Dict[str, Any]:
         """
         分析成长机会：找出竞品爆款中我可以借鉴的内容
@@ -64,6 +182,8 @@ class GrowthPathService:
             competitor_user_id: 竞品用户ID
             top_n: 返回前N个建议
             min_engagement_index: 最小互动指数（筛选爆款）
+            days: 只看最近N天的笔记
+            nearest_k: 每条爆款额外与我最相近的k条笔记比较（0=只与我的笔记中心比较）
         
         Returns:
             {
@@ -73,7 +193,9 @@ class GrowthPathService:
                     {
                         'note_title': '笔记标题',
                         'engagement_index': 10.5,
-                        'similarity_to_me': 0.3,  # 低相似度=内容差异大
+                        'similarity_to_me': 0.3,  # 该笔记与我的内容的相似度，低=内容差异大
+                        'novelty': 0.7,
+                        'opportunity_score': 7.35,  # 互动指数 × 新颖度
                         'reason': '这是你还没涉足的领域',
                         'suggestion': 'DeepSeek生成的创作建议'
                     }
@@ -81,32 +203,24 @@ class GrowthPathService:
                 'summary': 'LLM生成的总结'
             }
         """
-        # 1. 获取我的profile和embedding
-        my_profile = self.db.user_profiles.find_one({
-            'user_id': my_user_id,
-            'platform': 'xiaohongshu'
-        })
+        # 1. 获取双方的profile和embedding（loader 合并为两次 $in 查询）
+        my_profile, my_embedding_doc, competitor_profile, competitor_embedding_doc = await asyncio.gather(
+            load_profile(my_user_id),
+            load_embedding(my_user_id, dimension=512),
+            load_profile(competitor_user_id),
+            load_embedding(competitor_user_id, dimension=512)
+        )
         if not my_profile:
             raise ValueError(f"用户 {my_user_id} 不存在")
         
-        my_embedding_doc = self.db.user_embeddings.find_one({
-            'user_id': my_user_id,
-            'platform': 'xiaohongshu',
-            'dimension': 512
-        })
-        
         if not my_embedding_doc:
             raise ValueError(f"用户 {my_user_id} 没有embedding向量")
         
-        my_embedding = np.array(my_embedding_doc['embedding'])
+        my_embedding = decode_vector(my_embedding_doc['embedding'])
         my_nickname = my_profile.get('basic_info', {}).get('nickname', my_user_id[:16])
         my_topics = my_profile.get('content_info', {}).get('content_topics', [])
         
-        # 2. 获取竞品的profile和indexSeries
-        competitor_profile = self.db.user_profiles.find_one({
-            'user_id': competitor_user_id,
-            'platform': 'xiaohongshu'
-        })
+        # 2. 竞品的profile和indexSeries
         if not competitor_profile:
             raise ValueError(f"竞品用户 {competitor_user_id} 不存在")
         
@@ -115,9 +229,9 @@ class GrowthPathService:
         stats = competitor_profile.get('stats', {})
         index_series = stats.get('index_series', [])
         
-        # 如果 index_series 为空，从 user_snapshots.notes 回退读取
+        # 如果 index_series 为空，从 notes 集合回退读取
         if not index_series:
-            index_series = self._build_index_series_from_snapshots(competitor_user_id)
+            index_series = await self._build_index_series_from_notes(competitor_user_id)
         
         if not index_series:
             raise ValueError(f"竞品用户 {competitor_nickname} 没有笔记数据")
@@ -148,19 +262,13 @@ class GrowthPathService:
                 'summary': f"{competitor_nickname} 最近没有超过互动指数 {min_engagement_index} 的爆款笔记"
             }
         
-        # 4. 获取竞品的embedding（用于计算相似度）
-        competitor_embedding_doc = self.db.user_embeddings.find_one({
-            'user_id': competitor_user_id,
-            'platform': 'xiaohongshu',
-            'dimension': 512
-        })
-        
-        # 5. 计算内容差异度
+        # 5. 计算内容差异度（竞品embedding已在第1步取回）
         # 如果没有竞品embedding，使用话题相似度作为备选
         if competitor_embedding_doc:
-            competitor_embedding = np.array(competitor_embedding_doc['embedding'])
-            # 低相似度 = 内容差异大 = 我还没做的方向
-            similarity = float(np.dot(my_embedding, competitor_embedding))
+            competitor_embedding = decode_vector(competitor_embedding_doc['embedding'])
+            # 低相似度 = 内容差异大 = 我还没做的方向（先归一化，结果为余弦相似度）
+            pair = normalize_rows([my_embedding, competitor_embedding])
+            similarity = float(pair[0] @ pair[1])
         else:
             # 基于topic overlap计算相似度
             my_topic_set = set(my_topics)
@@ -171,38 +279,47 @@ class GrowthPathService:
             else:
                 similarity = 0.0
         
-        # 6. 选择差异化机会（爆款 + 与我风格有距离）
+        # 6. 逐条笔记计算与我的相似度，按 互动指数 × 新颖度 排序
+        candidates = hot_notes[:MAX_SCORED_NOTES]
+        note_similarity, nearest_note_ids = await self._score_note_similarity(
+            my_user_id, my_embedding, candidates, fallback_similarity=similarity, nearest_k=nearest_k
+        )
+        novelty = np.clip(1.0 - note_similarity, 0.0, 1.0)
+        engagement = np.array([note.get('value', 0) or 0 for note in candidates], dtype=np.float32)
+        scores = engagement * novelty
+        
         opportunities = []
-        for note in hot_notes[:top_n * 2]:  # 多取一些用于筛选
-            # 相似度决策：中低相似度最佳（太低=完全不相关，太高=已经在做）
-            note_data = {
+        for i in np.argsort(-scores, kind='stable')[:top_n]:
+            note = candidates[i]
+            opportunities.append({
                 'note_title': note.get('title', 'N/A'),
                 'note_id': note.get('note_id', ''),
                 'engagement_index': note.get('value', 0),
                 'timestamp': note.get('ts', 0),
-                'similarity_to_me': similarity,  # 简化版：用整体相似度
+                'similarity_to_me': round(float(note_similarity[i]), 3),
+                'novelty': round(float(novelty[i]), 3),
+                'opportunity_score': round(float(scores[i]), 3),
+                'nearest_my_note_id': nearest_note_ids[i],
                 'engagement_count': int(note.get('value', 0) * 1000)  # 估算互动数
-            }
-            opportunities.append(note_data)
-        
-        # 按互动指数排序，取top_n
-        opportunities = opportunities[:top_n]
-        
-        # 7. 调用LLM生成创作建议
-        llm_opportunities = await self._generate_content_suggestions(
-            my_nickname=my_nickname,
-            my_topics=my_topics,
-            competitor_nickname=competitor_nickname,
-            opportunities=opportunities,
-            overall_similarity=similarity
-        )
+            })
         
-        # 8. 生成总结
-        summary = await self._generate_summary(
-            my_nickname=my_nickname,
-            competitor_nickname=competitor_nickname,
-            opportunities=llm_opportunities,
-            overall_similarity=similarity
+        # 7. 并发调用LLM生成创作建议和总结
+        # 总结只依赖机会列表的数量和互动指数（在LLM调用前已确定），两个调用互不依赖；
+        # 两个方法内部各自处理失败并降级，一个失败不影响另一个
+        llm_opportunities, summary = await asyncio.gather(
+            self._generate_content_suggestions(
+                my_nickname=my_nickname,
+                my_topics=my_topics,
+                competitor_nickname=competitor_nickname,
+                opportunities=opportunities,
+                overall_similarity=similarity
+            ),
+            self._generate_summary(
+                my_nickname=my_nickname,
+                competitor_nickname=competitor_nickname,
+                opportunities=opportunities,
+                overall_similarity=similarity
+            )
         )
         
         return {
@@ -222,6 +339,68 @@ class GrowthPathService:
             'summary': summary
         }
     
+    async def _score_note_similarity(
+        self,
+        my_user_id: str,
+        my_embedding: np.ndarray,
+        candidates: List[Dict],
+        fallback_similarity: float,
+        nearest_k: int = 3
+    ) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        批量计算每条竞品笔记与我的内容的相似度
+        
+        一次查询取回我的全部笔记向量和候选笔记向量，用一次矩阵乘法算出所有相似度：
+        - 与我的笔记中心（均值向量）的相似度；我没有笔记向量时用用户级embedding
+        - nearest_k > 0 时，再取与我最相近的k条笔记的平均相似度，两者取较大值
+          （避免"我只写过一两篇"的方向因为被中心平均掉而被误判为新方向）
+        
+        Args:
+            my_user_id: 我的用户ID
+            my_embedding: 我的用户级embedding（没有笔记向量时的备选）
+            candidates: 竞品笔记（index_series 格式，含 note_id）
+            fallback_similarity: 没有向量的候选笔记使用的相似度（创作者整体相似度）
+            nearest_k: 最近邻数量
+        
+        Returns:
+            (相似度数组, 与每条候选最相近的我的笔记ID列表)
+        """
+        n = len(candidates)
+        similarity = np.full(n, fallback_similarity, dtype=np.float32)
+        nearest_note_ids: List[Optional[str]] = [None] * n
+        if n == 0:
+            return similarity, nearest_note_ids
+        
+        candidate_ids = [note.get('note_id') for note in candidates if note.get('note_id')]
+        docs = await self.note_embedding_repo.get_vectors(user_id=my_user_id, note_ids=candidate_ids)
+        my_docs = [doc for doc in docs if doc.get('user_id') == my_user_id]
+        candidate_vectors = {doc['note_id']: doc['embedding'] for doc in docs if doc.get('user_id') != my_user_id}
+        
+        rows = [i for i, note in enumerate(candidates) if note.get('note_id') in candidate_vectors]
+        if not rows:
+            return similarity, nearest_note_ids
+        
+        candidate_matrix = normalize_rows([candidate_vectors[candidates[i]['note_id']] for i in rows])
+        if my_docs:
+            my_matrix = normalize_rows([doc['embedding'] for doc in my_docs])
+            centroid = normalize_rows([my_matrix.mean(axis=0)])[0]
+        else:
+            my_matrix = None
+            centroid = normalize_rows([my_embedding])[0]
+        
+        scores = candidate_matrix @ centroid
+        if my_matrix is not None and nearest_k > 0:
+            pairwise = candidate_matrix @ my_matrix.T  # (候选数, 我的笔记数)
+            k = min(nearest_k, pairwise.shape[1])
+            top = np.partition(pairwise, -k, axis=1)[:, -k:]
+            scores = np.maximum(scores, top.mean(axis=1))
+            best = np.argmax(pairwise, axis=1)
+            for row, j in zip(rows, best):
+                nearest_note_ids[row] = my_docs[j]['note_id']
+        
+        similarity[rows] = scores
+        return similarity, nearest_note_ids
+    
     async def _generate_content_suggestions(
         self,
         my_nickname: str,
@@ -279,7 +458,9 @@ class GrowthPathService:
                 prompt=prompt,
                 model="deepseek-chat",
                 temperature=0.7,
-                max_tokens=2000
+                max_tokens=2000,
+                priority=PRIORITY_BATCH,  # 批量分析任务，让位于交互式生成请求
+                caller="growth_path.analyze"
             )
             
             # 解析JSON响应
@@ -342,7 +523,9 @@ class GrowthPathService:
                 prompt=prompt,
                 model="deepseek-chat",
                 temperature=0.7,
-                max_tokens=200
+                max_tokens=200,
+                priority=PRIORITY_BATCH,
+                caller="growth_path.summary"
             )
             return summary.strip()
         except Exception as e:
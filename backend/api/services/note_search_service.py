@@ -1,118 +1,354 @@
 """
 笔记语义搜索服务
 使用 BAAI/bge-small-zh-v1.5 embedding + numpy cosine similarity
+检索可走暴力矩阵乘（exact）或 ANN 索引（ivf / hnsw），见 vector_index.py
 """
 
 import time
+import threading
 import numpy as np
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 
-from database import NoteEmbeddingRepository
+from core.config import settings
+from core.embedding_model import get_embedding_model
+from database import NoteEmbeddingRepository, AsyncNoteEmbeddingRepository
+from api.services.vector_index import (
+    INDEX_TYPES,
+    VectorIndex,
+    load_or_build_index,
+    matrix_fingerprint,
+    save_index,
+)
 
 
 # =====================================================
 # 内存缓存：笔记embedding矩阵
 # =====================================================
+# 检索数据放在一个不可变快照里，刷新时构建新快照后一次赋值发布：
+# 检索只读取一次 _embedding_cache["snapshot"]，矩阵、行号和索引始终来自同一版本
+#   note_ids:    List[str] - 与矩阵行一一对应
+#   matrix:      numpy ndarray (N, 512)
+#   metadata:    Dict[note_id -> {title, desc, ...}]
+#   row_of:      Dict[note_id -> 矩阵行号]
+#   fingerprint: 矩阵指纹，用于匹配磁盘上的 ANN 索引
+#   indexes:     Dict[index_type -> VectorIndex]（只会按需补充基于本快照矩阵构建的索引）
 _embedding_cache: Dict[str, Any] = {
-    "note_ids": [],        # List[str] - 与矩阵行一一对应
-    "matrix": None,        # numpy ndarray (N, 512)
-    "metadata": {},        # Dict[note_id -> {title, desc, ...}]
+    "snapshot": None,      # 当前发布的快照，None 表示尚未加载
     "loaded_at": None,     # datetime
     "ttl_seconds": 600,    # 缓存10分钟
+    "high_water": None,    # 已加载数据中最大的 updated_at，增量刷新的起点
+    "overlap_seconds": 60, # 增量查询向前重叠的时间窗口
+    "full_loaded_at": None,       # 上次全量加载时间
+    "full_reload_seconds": 3600,  # 每小时全量重载一次（清理已删除的笔记）
 }
 
-# 全局 embedding model 实例（懒加载）
-_embedding_model = None
-
-
-def _get_embedding_model():
-    """懒加载 FlagModel（首次调用时加载，约2-3秒）"""
-    global _embedding_model
-    if _embedding_model is None:
-        print("[NoteSearch] 加载 embedding 模型 BAAI/bge-small-zh-v1.5 ...")
-        t0 = time.time()
-        from FlagEmbedding import FlagModel
-        _embedding_model = FlagModel(
-            "BAAI/bge-small-zh-v1.5",
-            query_instruction_for_retrieval="为这个句子生成表示以用于检索相关文章：",
-            use_fp16=True
-        )
-        print(f"[NoteSearch] 模型加载完成 ({time.time() - t0:.1f}s)")
-    return _embedding_model
+# 刷新锁：保证同一时间只有一个加载/刷新在运行
+_refresh_lock = threading.Lock()
+_refresher_thread: Optional[threading.Thread] = None
 
 
-def _load_embeddings_into_cache() -> bool:
-    """从 MongoDB 加载所有笔记 embedding 到内存"""
-    global _embedding_cache
+def _note_metadata(note: Dict[str, Any]) -> Dict[str, Any]:
+    """从 note_embeddings 文档提取搜索结果展示所需的字段"""
+    nid = note["note_id"]
+    return {
+        "note_id": nid,
+        "user_id": note.get("user_id", ""),
+        "title": note.get("title", ""),
+        "desc": note.get("desc", ""),
+        "likes": note.get("likes", 0),
+        "collected_count": note.get("collected_count", 0),
+        "comments_count": note.get("comments_count", 0),
+        "share_count": note.get("share_count", 0),
+        "engagement_score": note.get("engagement_score", 0.0),
+        "nickname": note.get("nickname", ""),
+        "avatar": note.get("avatar", ""),
+        "note_create_time": note.get("note_create_time", 0),
+    }
+
+
+def _normalize_rows(embeddings: List[Any]) -> np.ndarray:
+    """转为 float32 矩阵并做 L2 归一化，方便后续用 dot product 计算 cosine similarity"""
+    matrix = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # 避免除零
+    return matrix / norms
+
+
+def _make_snapshot(
+    note_ids: List[str],
+    matrix: np.ndarray,
+    metadata: Dict[str, Dict[str, Any]],
+    row_of: Dict[str, int],
+    fingerprint: Optional[str],
+    indexes: Dict[str, VectorIndex]
+) -> Dict[str, Any]:
+    """组装检索快照（发布后不再修改，见 _embedding_cache 说明）"""
+    return {
+        "note_ids": note_ids,
+        "matrix": matrix,
+        "metadata": metadata,
+        "row_of": row_of,
+        "fingerprint": fingerprint,
+        "indexes": indexes,
+    }
 
-    # 检查缓存是否有效
-    if _embedding_cache["matrix"] is not None and _embedding_cache["loaded_at"]:
-        age = (datetime.now() - _embedding_cache["loaded_at"]).total_seconds()
-        if age < _embedding_cache["ttl_seconds"]:
-            return True
 
-    print("[NoteSearch] 从 MongoDB 加载笔记 embedding 到内存缓存...")
+def _doc_watermark(note: Dict[str, Any]) -> Optional[datetime]:
+    """文档的变更时间（优先 updated_at，旧数据回退到 created_at）"""
+    return note.get("updated_at") or note.get("created_at")
+
+
+def _full_reload():
+    """从 MongoDB 全量加载所有笔记 embedding，构建完成后整体替换缓存"""
+    print("[NoteSearch] 从 MongoDB 全量加载笔记 embedding 到内存缓存...")
     t0 = time.time()
 
     repo = NoteEmbeddingRepository()
     all_notes = repo.get_all_embeddings()
 
-    if not all_notes:
-        print("[NoteSearch] 没有笔记 embedding 数据")
-        _embedding_cache["note_ids"] = []
-        _embedding_cache["matrix"] = np.array([])
-        _embedding_cache["metadata"] = {}
-        _embedding_cache["loaded_at"] = datetime.now()
-        return False
-
     note_ids = []
     embeddings = []
     metadata = {}
+    high_water = None
 
     for note in all_notes:
         nid = note["note_id"]
         emb = note.get("embedding")
-        if not emb or len(emb) == 0:
+        if emb is None or len(emb) == 0:
             continue
 
         note_ids.append(nid)
         embeddings.append(emb)
-        metadata[nid] = {
-            "note_id": nid,
-            "user_id": note.get("user_id", ""),
-            "title": note.get("title", ""),
-            "desc": note.get("desc", ""),
-            "likes": note.get("likes", 0),
-            "collected_count": note.get("collected_count", 0),
-            "comments_count": note.get("comments_count", 0),
-            "share_count": note.get("share_count", 0),
-            "engagement_score": note.get("engagement_score", 0.0),
-            "nickname": note.get("nickname", ""),
-            "avatar": note.get("avatar", ""),
-            "note_create_time": note.get("note_create_time", 0),
-        }
+        metadata[nid] = _note_metadata(note)
+        ts = _doc_watermark(note)
+        if ts and (high_water is None or ts > high_water):
+            high_water = ts
 
-    matrix = np.array(embeddings, dtype=np.float32)
-    # L2 归一化，方便后续用 dot product 计算 cosine similarity
-    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
-    norms[norms == 0] = 1.0  # 避免除零
-    matrix = matrix / norms
+    now = datetime.now()
+    if not note_ids:
+        print("[NoteSearch] 没有笔记 embedding 数据")
+        _embedding_cache["snapshot"] = _make_snapshot([], np.array([]), {}, {}, None, {})
+        _embedding_cache["high_water"] = None
+        _embedding_cache["loaded_at"] = now
+        _embedding_cache["full_loaded_at"] = now
+        return
+
+    matrix = _normalize_rows(embeddings)
+    fingerprint = matrix_fingerprint(note_ids, matrix)
+
+    # 在替换缓存前预先准备好默认索引，避免首个搜索请求承担构建开销
+    indexes = {}
+    kind = settings.NOTE_INDEX_TYPE
+    if kind != "exact" and len(note_ids) >= settings.NOTE_INDEX_MIN_SIZE:
+        try:
+            indexes[kind] = load_or_build_index(kind, matrix, fingerprint)
+        except Exception as e:
+            print(f"[NoteSearch] ⚠️  预构建 {kind} 索引失败，检索时将回退: {e}")
+
+    _embedding_cache["snapshot"] = _make_snapshot(
+        note_ids, matrix, metadata, {nid: i for i, nid in enumerate(note_ids)}, fingerprint, indexes
+    )
+    _embedding_cache["high_water"] = high_water
+    _embedding_cache["loaded_at"] = now
+    _embedding_cache["full_loaded_at"] = now
+
+    print(f"[NoteSearch] 全量加载完成: {len(note_ids)} 条笔记 ({time.time() - t0:.2f}s)")
+
+
+def _delta_refresh():
+    """
+    增量刷新：只拉取高水位之后新增/修改的笔记
+
+    在当前快照的副本上修改：复制矩阵后覆盖已存在笔记的行，新笔记追加到末尾，
+    索引也先复制再更新，最后整体发布新快照；正在进行的检索继续使用旧快照。
+    查询窗口向前多留一段重叠时间，防止写入时钟偏差导致漏数据（重复应用是幂等的）。
+    """
+    high_water = _embedding_cache["high_water"]
+    if high_water is None:
+        _full_reload()
+        return
+
+    t0 = time.time()
+    since = high_water - timedelta(seconds=_embedding_cache["overlap_seconds"])
+    changed = NoteEmbeddingRepository().get_embeddings_since(since)
 
-    _embedding_cache["note_ids"] = note_ids
-    _embedding_cache["matrix"] = matrix
-    _embedding_cache["metadata"] = metadata
+    snapshot = _embedding_cache["snapshot"]
+    row_of = snapshot["row_of"]
+    matrix = snapshot["matrix"]
+    metadata = dict(snapshot["metadata"])
+
+    patched_rows, patched_vecs = [], []
+    new_ids, new_vecs = [], []
+    for note in changed:
+        nid = note["note_id"]
+        emb = note.get("embedding")
+        ts = _doc_watermark(note)
+        if ts and ts > high_water:
+            high_water = ts
+        if emb is None or len(emb) == 0:
+            continue
+        if len(emb) != matrix.shape[1]:
+            print(f"[NoteSearch] ⚠️  跳过维度不一致的笔记 {nid} ({len(emb)} != {matrix.shape[1]})")
+            continue
+
+        metadata[nid] = _note_metadata(note)
+        if nid in row_of:
+            patched_rows.append(row_of[nid])
+            patched_vecs.append(emb)
+        elif nid not in new_ids:
+            new_ids.append(nid)
+            new_vecs.append(emb)
+
+    if patched_rows or new_ids:
+        note_ids = snapshot["note_ids"]
+        if new_ids:
+            matrix = np.concatenate([matrix, _normalize_rows(new_vecs)])
+            row_of = {**row_of, **{nid: len(note_ids) + i for i, nid in enumerate(new_ids)}}
+            note_ids = note_ids + new_ids
+        else:
+            matrix = matrix.copy()
+        if patched_rows:
+            matrix[patched_rows] = _normalize_rows(patched_vecs)
+
+        new_rows = np.arange(len(note_ids) - len(new_ids), len(note_ids))
+        indexes = {}
+        for kind, index in list(snapshot["indexes"].items()):
+            try:
+                updated = index.copy()
+                updated.attach(matrix)
+                updated.add(new_rows)
+                updated.update(np.array(patched_rows, dtype=np.int64))
+                indexes[kind] = updated
+            except Exception as e:
+                print(f"[NoteSearch] ⚠️  增量更新 {kind} 索引失败，下次检索时重建: {e}")
+
+        fingerprint = matrix_fingerprint(note_ids, matrix)
+        for kind, index in indexes.items():
+            save_index(index, kind, fingerprint)
+        _embedding_cache["snapshot"] = _make_snapshot(note_ids, matrix, metadata, row_of, fingerprint, indexes)
+
+    _embedding_cache["high_water"] = high_water
     _embedding_cache["loaded_at"] = datetime.now()
+    print(f"[NoteSearch] 增量刷新完成: 更新 {len(patched_rows)} 条, 新增 {len(new_ids)} 条 "
+          f"({time.time() - t0:.2f}s)")
+
+
+def _refresh(full: bool = False):
+    """执行一次刷新（全量或增量），同一时间只允许一个刷新在运行"""
+    if not _refresh_lock.acquire(blocking=False):
+        return
+    try:
+        full_loaded_at = _embedding_cache["full_loaded_at"]
+        full_due = (
+            full_loaded_at is None
+            or (datetime.now() - full_loaded_at).total_seconds() >= _embedding_cache["full_reload_seconds"]
+        )
+        snapshot = _embedding_cache["snapshot"]
+        if full or full_due or snapshot is None or len(snapshot["note_ids"]) == 0:
+            _full_reload()
+        else:
+            _delta_refresh()
+    except Exception as e:
+        print(f"[NoteSearch] ❌ 刷新缓存失败（继续使用旧缓存）: {e}")
+    finally:
+        _refresh_lock.release()
+
+
+def trigger_background_refresh(full: bool = False) -> bool:
+    """
+    在后台线程中刷新缓存，不阻塞调用方
 
-    print(f"[NoteSearch] 缓存加载完成: {len(note_ids)} 条笔记 ({time.time() - t0:.2f}s)")
+    Returns:
+        是否启动了新的刷新（已有刷新在运行时返回 False）
+    """
+    if _refresh_lock.locked():
+        return False
+    threading.Thread(target=_refresh, args=(full,), name="note-cache-refresh", daemon=True).start()
     return True
 
 
+def start_background_refresher():
+    """启动常驻刷新线程：立即预热缓存，之后每个 TTL 周期做一次增量刷新"""
+    global _refresher_thread
+    if _refresher_thread is not None and _refresher_thread.is_alive():
+        return
+
+    def _loop():
+        while True:
+            _refresh()
+            time.sleep(_embedding_cache["ttl_seconds"])
+
+    _refresher_thread = threading.Thread(target=_loop, name="note-cache-refresher", daemon=True)
+    _refresher_thread.start()
+    print("[NoteSearch] 后台缓存刷新线程已启动")
+
+
+def _load_embeddings_into_cache() -> bool:
+    """
+    确保笔记 embedding 已加载到内存
+
+    只有冷启动（缓存为空）时才会同步加载；缓存过期时立即返回旧数据，
+    并在后台线程中做增量刷新，搜索请求不承担刷新开销。
+    """
+    if _embedding_cache["snapshot"] is None:
+        with _refresh_lock:
+            if _embedding_cache["snapshot"] is None:
+                _full_reload()
+    elif _embedding_cache["loaded_at"]:
+        age = (datetime.now() - _embedding_cache["loaded_at"]).total_seconds()
+        if age >= _embedding_cache["ttl_seconds"]:
+            trigger_background_refresh()
+
+    return len(_embedding_cache["snapshot"]["note_ids"]) > 0
+
+
 def invalidate_cache():
-    """手动清除缓存（新增笔记后调用）"""
-    _embedding_cache["loaded_at"] = None
-    _embedding_cache["matrix"] = None
-    print("[NoteSearch] 缓存已清除")
+    """手动刷新缓存（新增笔记后调用）：后台全量重载，完成前继续使用旧缓存"""
+    trigger_background_refresh(full=True)
+    print("[NoteSearch] 已触发后台全量刷新")
+
+
+def _resolve_index_type(index_type: Optional[str], snapshot: Dict[str, Any]) -> str:
+    """确定本次检索实际使用的索引类型（数据量较小时直接暴力检索）"""
+    kind = index_type or settings.NOTE_INDEX_TYPE
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"未知的索引类型: {kind}，可选: {', '.join(INDEX_TYPES)}")
+    if len(snapshot["note_ids"]) < settings.NOTE_INDEX_MIN_SIZE:
+        return "exact"
+    return kind
+
+
+def _get_index(kind: str, snapshot: Dict[str, Any]) -> VectorIndex:
+    """获取（必要时基于快照矩阵加载或构建）指定类型的索引，失败时回退到暴力检索"""
+    indexes = snapshot["indexes"]
+    if kind not in indexes:
+        try:
+            indexes[kind] = load_or_build_index(kind, snapshot["matrix"], snapshot["fingerprint"])
+        except Exception as e:
+            if kind == "exact":
+                raise
+            print(f"[NoteSearch] ⚠️  {kind} 索引不可用，回退到暴力检索: {e}")
+            return _get_index("exact", snapshot)
+    return indexes[kind]
+
+
+def build_index(index_type: Optional[str] = None) -> Dict[str, Any]:
+    """预先加载缓存并构建/持久化 ANN 索引（供脚本或运维接口调用）"""
+    _load_embeddings_into_cache()
+    snapshot = _embedding_cache["snapshot"]
+    if snapshot is None or len(snapshot["note_ids"]) == 0:
+        return {"success": False, "message": "暂无笔记 embedding 数据"}
+    kind = index_type or settings.NOTE_INDEX_TYPE
+    t0 = time.time()
+    index = _get_index(kind, snapshot)
+    return {
+        "success": True,
+        "index": index.name,
+        "size": index.size,
+        "fingerprint": snapshot["fingerprint"],
+        "elapsed_seconds": round(time.time() - t0, 2),
+    }
 
 
 # =====================================================
@@ -123,6 +359,7 @@ def search_notes(
     query: str,
     top_k: int = 10,
     min_engagement: float = 0.0,
+    index_type: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     语义搜索笔记
@@ -131,6 +368,7 @@ def search_notes(
         query: 用户输入的搜索关键词/句子
         top_k: 返回前 K 条结果
         min_engagement: 最低互动指数过滤
+        index_type: 检索索引 exact / ivf / hnsw，None 使用配置默认值
 
     Returns:
         { "success": True, "results": [...], "query": "...", "total": N }
@@ -139,7 +377,8 @@ def search_notes(
 
     # 1. 加载缓存
     has_data = _load_embeddings_into_cache()
-    if not has_data or len(_embedding_cache["note_ids"]) == 0:
+    snapshot = _embedding_cache["snapshot"]  # 只读取一次，本次检索全程使用同一快照
+    if not has_data or len(snapshot["note_ids"]) == 0:
         return {
             "success": True,
             "results": [],
@@ -149,7 +388,7 @@ def search_notes(
         }
 
     # 2. 编码查询文本
-    model = _get_embedding_model()
+    model = get_embedding_model()
     query_vec = model.encode([query])  # shape (1, 512)
     query_vec = np.array(query_vec, dtype=np.float32)
     # L2 归一化
@@ -157,24 +396,21 @@ def search_notes(
     if norm > 0:
         query_vec = query_vec / norm
 
-    # 3. 计算余弦相似度（因为已归一化，dot product == cosine similarity）
-    matrix = _embedding_cache["matrix"]
-    similarities = np.dot(matrix, query_vec.T).flatten()  # shape (N,)
-
-    # 4. 获取 top-k 索引
-    top_indices = np.argsort(similarities)[::-1][:top_k * 2]  # 取多一些用于过滤
+    # 3. 检索最相似的行（因为已归一化，dot product == cosine similarity）
+    index = _get_index(_resolve_index_type(index_type, snapshot), snapshot)
+    top_indices, top_scores = index.search(query_vec.flatten(), top_k * 2)  # 取多一些用于过滤
 
-    # 5. 组装结果
+    # 4. 组装结果
     results = []
-    note_ids = _embedding_cache["note_ids"]
-    metadata = _embedding_cache["metadata"]
+    note_ids = snapshot["note_ids"]
+    metadata = snapshot["metadata"]
 
-    for idx in top_indices:
+    for idx, score in zip(top_indices, top_scores):
         if len(results) >= top_k:
             break
 
         nid = note_ids[idx]
-        sim = float(similarities[idx])
+        sim = float(score)
         meta = metadata.get(nid, {})
 
         # 互动指数过滤
@@ -195,17 +431,19 @@ def search_notes(
         "total": len(results),
         "search_time_ms": round(t_elapsed * 1000, 1),
         "index_size": len(note_ids),
+        "index_type": index.name,
     }
 
 
-def get_note_stats() -> Dict[str, Any]:
+async def get_note_stats() -> Dict[str, Any]:
     """获取笔记 embedding 统计信息"""
-    repo = NoteEmbeddingRepository()
-    stats = repo.get_stats()
+    repo = AsyncNoteEmbeddingRepository()
+    stats = await repo.get_stats()
 
     # 补充缓存状态
-    cache_loaded = _embedding_cache["matrix"] is not None
-    cache_size = len(_embedding_cache["note_ids"]) if cache_loaded else 0
+    snapshot = _embedding_cache["snapshot"]
+    cache_loaded = snapshot is not None
+    cache_size = len(snapshot["note_ids"]) if cache_loaded else 0
     cache_age = None
     if _embedding_cache["loaded_at"]:
         cache_age = (datetime.now() - _embedding_cache["loaded_at"]).total_seconds()
@@ -217,5 +455,9 @@ def get_note_stats() -> Dict[str, Any]:
             "size": cache_size,
             "age_seconds": round(cache_age, 1) if cache_age else None,
             "ttl_seconds": _embedding_cache["ttl_seconds"],
+            "indexes": sorted(snapshot["indexes"].keys()) if cache_loaded else [],
+            "default_index": settings.NOTE_INDEX_TYPE,
+            "high_water": _embedding_cache["high_water"].isoformat() if _embedding_cache["high_water"] else None,
+            "refreshing": _refresh_lock.locked(),
         }
     }
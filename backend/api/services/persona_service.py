@@ -4,11 +4,13 @@ User Persona Analysis Service
 """
 
 import re
+import asyncio
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from collections import Counter
 
-from database.connection import get_database
+from database.connection import get_async_database
+from database.async_repositories import AsyncNoteRepository
 from database.models import (
     UserPersona,
     PersonaTag,
@@ -17,13 +19,15 @@ from database.models import (
     PlatformType
 )
 from core.llm_gateway import get_llm_gateway
+from core.llm_scheduler import PRIORITY_BATCH
 
 
 class PersonaAnalysisService:
     """用户画像分析服务"""
     
     def __init__(self):
-        self.db = get_database()
+        self.db = get_async_database()
+        self.note_repo = AsyncNoteRepository()
         self.llm = get_llm_gateway()
         print("✅ PersonaAnalysisService 初始化完成")
     
@@ -47,7 +51,7 @@ class PersonaAnalysisService:
         
         # 1️⃣ 检查缓存（如果不是强制刷新）
         if not force_refresh:
-            cached_persona = self.db.user_personas.find_one({
+            cached_persona = await self.db.user_personas.find_one({
                 "user_id": user_id,
                 "platform": platform.value
             })
@@ -60,20 +64,22 @@ class PersonaAnalysisService:
         print(f"[Persona] 🔍 开始分析用户画像: {user_id}")
         
         # 2️⃣ 获取用户基础数据
-        user_profile = self.db.user_profiles.find_one({
+        user_profile = await self.db.user_profiles.find_one({
             "user_id": user_id,
             "platform": platform.value
         })
         if not user_profile:
             raise ValueError(f"用户档案不存在: {user_id}")
         
-        # 3️⃣ 获取用户笔记快照
-        user_snapshot = self.db.user_snapshots.find_one({
-            "user_id": user_id,
-            "platform": platform.value
-        })
-        if not user_snapshot:
+        # 3️⃣ 获取用户笔记（只投影画像分析用到的字段）
+        notes = await self.note_repo.get_notes(
+            user_id,
+            platform.value,
+            fields=["id", "title", "desc", "create_time", "liked_count", "collected_count", "comment_count"]
+        )
+        if not notes:
             raise ValueError(f"用户笔记快照不存在: {user_id}")
+        user_snapshot = {"notes": notes, "total_notes": len(notes)}
         
         # 4️⃣ 提取画像特征
         persona_tags = await self._extract_tags(user_profile, user_snapshot)
@@ -81,17 +87,27 @@ class PersonaAnalysisService:
         style_keywords = self._extract_keywords(user_profile)
         activity_pattern = self._analyze_activity_pattern(user_snapshot)
         
-        # 5️⃣ 使用LLM生成洞察
-        ai_summary = await self._generate_ai_summary(
-            user_profile,
-            user_snapshot,
-            persona_tags,
-            content_themes
-        )
-        recommendations = await self._generate_recommendations(
-            user_profile,
-            activity_pattern
+        # 5️⃣ 使用LLM生成洞察（总结和建议互不依赖，并发调用；一个失败时降级，不影响另一个）
+        ai_summary, recommendations = await asyncio.gather(
+            self._generate_ai_summary(
+                user_profile,
+                user_snapshot,
+                persona_tags,
+                content_themes
+            ),
+            self._generate_recommendations(
+                user_profile,
+                activity_pattern
+            ),
+            return_exceptions=True
         )
+        degraded = isinstance(ai_summary, Exception) or isinstance(recommendations, Exception)
+        if isinstance(ai_summary, Exception):
+            print(f"[Persona] ⚠️  LLM生成画像总结失败: {ai_summary}")
+            ai_summary = f"{user_profile.get('nickname', '该创作者')}专注于{'、'.join(content_themes[:3]) or '综合内容'}方向的内容创作"
+        if isinstance(recommendations, Exception):
+            print(f"[Persona] ⚠️  LLM生成优化建议失败: {recommendations}")
+            recommendations = []
         
         # 6️⃣ 构建UserPersona对象
         persona = UserPersona(
@@ -111,12 +127,15 @@ class PersonaAnalysisService:
             version="1.0.0"
         )
         
-        # 7️⃣ 保存到数据库
-        self.db.user_personas.update_one(
-            {"user_id": user_id, "platform": platform.value},
-            {"$set": persona.model_dump()},
-            upsert=True
-        )
+        # 7️⃣ 保存到数据库（降级结果不缓存，下次请求重新分析）
+        if degraded:
+            print(f"[Persona] ⚠️  画像包含降级内容，不写入缓存: {user_id}")
+        else:
+            await self.db.user_personas.update_one(
+                {"user_id": user_id, "platform": platform.value},
+                {"$set": persona.model_dump()},
+                upsert=True
+            )
         
         print(f"[Persona] ✅ 用户画像分析完成: {user_id}")
         return persona
@@ -251,7 +270,9 @@ class PersonaAnalysisService:
             model="deepseek-chat",
             max_tokens=300,
             temperature=0.7,
-            use_cache=True
+            use_cache=True,
+            priority=PRIORITY_BATCH,  # 批量分析任务，让位于交互式生成请求
+            caller="persona.summary"
         )
         
         return summary.strip()
@@ -278,7 +299,9 @@ class PersonaAnalysisService:
             model="deepseek-chat",
             max_tokens=400,
             temperature=0.8,
-            use_cache=True
+            use_cache=True,
+            priority=PRIORITY_BATCH,
+            caller="persona.recommendations"
         )
         
         # 解析成列表
@@ -290,9 +313,13 @@ class PersonaAnalysisService:
         
         return recommendations[:5]
     
-    def get_persona(self, user_id: str, platform: PlatformType = PlatformType.XIAOHONGSHU) -> Optional[UserPersona]:
+    async def get_persona(
+        self,
+        user_id: str,
+        platform: PlatformType = PlatformType.XIAOHONGSHU
+    ) -> Optional[UserPersona]:
         """获取用户画像（仅查询，不分析）"""
-        persona_doc = self.db.user_personas.find_one({
+        persona_doc = await self.db.user_personas.find_one({
             "user_id": user_id,
             "platform": platform.value
         })
@@ -301,13 +328,17 @@ class PersonaAnalysisService:
             return UserPersona(**persona_doc)
         return None
     
-    def list_personas(self, platform: PlatformType = PlatformType.XIAOHONGSHU, limit: int = 50) -> List[UserPersona]:
+    async def list_personas(
+        self,
+        platform: PlatformType = PlatformType.XIAOHONGSHU,
+        limit: int = 50
+    ) -> List[UserPersona]:
         """列出所有用户画像"""
         personas = self.db.user_personas.find({
             "platform": platform.value
         }).limit(limit)
         
-        return [UserPersona(**p) for p in personas]
+        return [UserPersona(**p) async for p in personas]
 
 
 # 全局服务实例（懒加载）
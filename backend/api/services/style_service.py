@@ -3,15 +3,23 @@ Style Generation Service
 风格生成业务逻辑层 - 从数据库读取数据
 """
 
-from typing import Dict, List, Any, Optional
+import asyncio
+from typing import Dict, List, Any, Optional, AsyncIterator
 
 from core.config import settings
 from core.llm_gateway import get_llm_gateway
 from database import (
-    UserProfileRepository,
-    UserSnapshotRepository,
-    StylePromptRepository
+    AsyncUserProfileRepository,
+    AsyncUserSnapshotRepository,
+    AsyncStylePromptRepository
 )
+from database.loaders import load_network_node_by_name, load_recent_notes
+
+
+# load_creator_profile 和 load_creator_notes 共用同一字段集，同一请求内只查询一次节点
+CREATOR_NODE_FIELDS = [
+    "name", "topics", "contentForm", "primaryTrack", "desc", "followers", "totalEngagement", "indexSeries"
+]
 
 
 class StyleGenerationService:
@@ -19,16 +27,16 @@ class StyleGenerationService:
     
     def __init__(self):
         # 初始化数据仓库
-        self.profile_repo = UserProfileRepository()
-        self.snapshot_repo = UserSnapshotRepository()
-        self.prompt_repo = StylePromptRepository()
+        self.profile_repo = AsyncUserProfileRepository()
+        self.snapshot_repo = AsyncUserSnapshotRepository()
+        self.prompt_repo = AsyncStylePromptRepository()
         
         # 使用LLM Gateway替代直接调用OpenAI
         self.llm = get_llm_gateway()
         
         print("✅ StyleGenerationService 初始化完成（已启用LLM Gateway）")
     
-    def get_available_creators(self, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
+    async def get_available_creators(self, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
         """
         获取可用的创作者列表（从creator_networks获取，避免user_profiles超时）
         
@@ -39,39 +47,27 @@ class StyleGenerationService:
             创作者列表 [{"nickname": "xxx", "user_id": "xxx", "topics": [...], "followers": 0, ...}, ...]
         """
         try:
-            from database.repositories import CreatorNetworkRepository
-            
-            # 使用CreatorNetworkRepository获取网络数据（更快，有索引）
-            network_repo = CreatorNetworkRepository()
-            network = network_repo.get_latest_network(platform)
-            
-            if not network:
-                print(f"⚠️  未找到平台 {platform} 的网络数据")
-                return []
+            from database.async_repositories import AsyncCreatorNetworkRepository
             
-            # 从network_data中提取creators
-            network_data = network.get("network_data", {})
-            creators_from_network = network_data.get("creators", [])
+            # 只读取节点的列表字段（不加载 indexSeries 和连边）
+            network_repo = AsyncCreatorNetworkRepository()
+            creators_from_network = await network_repo.get_nodes(
+                platform, fields=["name", "topics", "followers", "avatar"]
+            )
             
             if not creators_from_network:
                 print(f"⚠️  网络数据中没有创作者")
                 return []
             
-            # 从 user_snapshots 读取真实的笔记数和互动数（唯一数据源）
+            # 从 creator_stats 物化视图读取笔记数和互动数（写入笔记时同步维护，无需遍历笔记）
             snapshot_data = {}  # uid -> {note_count, total_engagement}
             try:
-                from database.connection import get_database
-                db = get_database()
-                for snap in db.user_snapshots.find({}, {'user_id': 1, 'notes': 1}):
-                    uid = snap['user_id']
-                    notes = snap.get('notes', [])
-                    total = 0
-                    for n in notes:
-                        total += (n.get('likes', 0) or 0) + (n.get('collected_count', 0) or 0) + \
-                                 (n.get('comments_count', 0) or 0) + (n.get('share_count', 0) or 0)
-                    snapshot_data[uid] = {'note_count': len(notes), 'total_engagement': total}
-            except Exception:
-                pass
+                from database.async_repositories import AsyncCreatorStatsRepository
+                snapshot_data = await AsyncCreatorStatsRepository().get_stats_map(
+                    platform, fields=['note_count', 'total_engagement']
+                )
+            except Exception as e:
+                print(f"⚠️  读取 creator_stats 失败: {e}")
             
             # 转换格式以匹配前端期望
             creators = []
@@ -101,7 +97,7 @@ class StyleGenerationService:
             # 确保返回空列表而不是 None
             return []
     
-    def get_available_creators_from_profiles(self, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
+    async def get_available_creators_from_profiles(self, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
         """
         获取可用的创作者列表（从user_profiles + snapshots，备用方案）
         
@@ -112,13 +108,20 @@ class StyleGenerationService:
             创作者列表 [{"nickname": "xxx", "user_id": "xxx", "topics": [...], "followers": 0, ...}, ...]
         """
         try:
-            from database.repositories import UserSnapshotRepository
             from datetime import datetime, timedelta
             import re
             from collections import Counter
             
-            profiles = self.profile_repo.get_all_profiles(platform=platform)
-            snapshot_repo = UserSnapshotRepository()
+            profiles = await self.profile_repo.get_all_profiles(platform=platform)
+            
+            # 一次查询取所有创作者最近30天的最新20条笔记（只读取标题和正文，提取#hashtags）
+            cutoff_ts = int((datetime.now() - timedelta(days=30)).timestamp())
+            user_ids = [profile["user_id"] for profile in profiles if profile.get("user_id")]
+            recent_notes_list = await asyncio.gather(*(
+                load_recent_notes(user_id, platform, fields=["title", "desc"], limit=20, since=cutoff_ts)
+                for user_id in user_ids
+            ))
+            recent_notes_map = dict(zip(user_ids, recent_notes_list))
             
             creators = []
             for profile in profiles:
@@ -128,17 +131,11 @@ class StyleGenerationService:
                 if not user_id:
                     continue
                 
-                # 从snapshot中提取最近30天的#hashtags
-                snapshot = snapshot_repo.get_by_user_id(user_id, platform)
+                # 从最近30天的笔记中提取#hashtags
+                recent_notes = recent_notes_map.get(user_id, [])
                 topics = []
                 
-                if snapshot:
-                    notes = snapshot.get('notes', [])
-                    # 过滤最近30天
-                    cutoff_time = datetime.now() - timedelta(days=30)
-                    cutoff_ts = int(cutoff_time.timestamp())
-                    recent_notes = [n for n in notes if n.get('create_time', 0) >= cutoff_ts]
-                    
+                if recent_notes:
                     # 提取hashtags
                     hashtags = []
                     for note in recent_notes[:20]:
@@ -205,7 +202,7 @@ class StyleGenerationService:
             # 确保返回空列表而不是 None
             return []
     
-    def load_creator_profile(self, creator_name: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+    async def load_creator_profile(self, creator_name: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
         """
         加载创作者档案（从creator_networks读取，避免user_profiles超时）
         
@@ -217,25 +214,8 @@ class StyleGenerationService:
             档案数据 or None
         """
         try:
-            from database.repositories import CreatorNetworkRepository
-            
-            # 从creator_networks获取网络数据
-            network_repo = CreatorNetworkRepository()
-            network = network_repo.get_latest_network(platform)
-            
-            if not network:
-                print(f"⚠️  未找到平台 {platform} 的网络数据")
-                return None
-            
-            # 从network_data中查找指定创作者
-            network_data = network.get("network_data", {})
-            creators = network_data.get("creators", [])
-            
-            creator_data = None
-            for c in creators:
-                if c.get("name") == creator_name:
-                    creator_data = c
-                    break
+            # 按昵称直接查询单个节点（有索引，不加载整张网络；同一请求内与 load_creator_notes 共用一次查询）
+            creator_data = await load_network_node_by_name(creator_name, platform, fields=CREATOR_NODE_FIELDS)
             
             if not creator_data:
                 print(f"⚠️  未找到创作者档案: {creator_name}")
@@ -262,7 +242,7 @@ class StyleGenerationService:
             traceback.print_exc()
             return None
     
-    def load_creator_notes(self, creator_name: str, platform: str = "xiaohongshu", limit: int = 5) -> List[Dict[str, Any]]:
+    async def load_creator_notes(self, creator_name: str, platform: str = "xiaohongshu", limit: int = 5) -> List[Dict[str, Any]]:
         """
         加载创作者的笔记样本（从creator_networks的indexSeries读取，避免user_snapshots超时）
         
@@ -275,25 +255,8 @@ class StyleGenerationService:
             笔记列表
         """
         try:
-            from database.repositories import CreatorNetworkRepository
-            
-            # 从creator_networks获取网络数据
-            network_repo = CreatorNetworkRepository()
-            network = network_repo.get_latest_network(platform)
-            
-            if not network:
-                print(f"⚠️  未找到平台 {platform} 的网络数据")
-                return []
-            
-            # 从network_data中查找指定创作者
-            network_data = network.get("network_data", {})
-            creators = network_data.get("creators", [])
-            
-            creator_data = None
-            for c in creators:
-                if c.get("name") == creator_name:
-                    creator_data = c
-                    break
+            # 按昵称直接查询单个节点（同一请求内与 load_creator_profile 共用一次查询）
+            creator_data = await load_network_node_by_name(creator_name, platform, fields=CREATOR_NODE_FIELDS)
             
             if not creator_data:
                 print(f"⚠️  未找到创作者: {creator_name}")
@@ -312,6 +275,7 @@ class StyleGenerationService:
                     "title": item.get("title", ""),
                     "note_id": item.get("note_id", ""),
                     "create_time": item.get("ts", 0),
+                    "value": item.get("value", 0),
                     "desc": f"（标题）{item.get('title', '')}"  # 只有标题，没有正文
                 })
             
@@ -324,7 +288,7 @@ class StyleGenerationService:
             traceback.print_exc()
             return []
     
-    def build_style_prompt(
+    async def build_style_prompt(
         self,
         creator_profile: Dict[str, Any],
         sample_notes: List[Dict[str, Any]],
@@ -346,7 +310,6 @@ class StyleGenerationService:
             完整的提示词
         """
         try:
-            from database.repositories import UserSnapshotRepository
             from datetime import datetime, timedelta
             import re
             from collections import Counter
@@ -368,21 +331,17 @@ class StyleGenerationService:
                 print(f"⚠️  未找到提示词模板 {prompt_type}，使用默认模板")
                 template = self._get_default_template()
             
-            # 从 snapshot 提取真实的 #hashtags（最近30天）
-            profile = self.profile_repo.get_profile_by_nickname(creator_name, "xiaohongshu")
+            # 从最近30天的笔记中提取真实的 #hashtags
+            profile = await self.profile_repo.get_profile_by_nickname(creator_name, "xiaohongshu")
             topics = []
             if profile:
                 user_id = profile.get("user_id")
                 if user_id:
-                    snapshot_repo = UserSnapshotRepository()
-                    snapshot = snapshot_repo.get_by_user_id(user_id, "xiaohongshu")
-                    if snapshot:
-                        notes = snapshot.get('notes', [])
-                        # 过滤最近30天
-                        cutoff_time = datetime.now() - timedelta(days=30)
-                        cutoff_ts = int(cutoff_time.timestamp())
-                        recent_notes = [n for n in notes if n.get('create_time', 0) >= cutoff_ts]
-                        
+                    cutoff_ts = int((datetime.now() - timedelta(days=30)).timestamp())
+                    recent_notes = await load_recent_notes(
+                        user_id, "xiaohongshu", fields=["title", "desc"], limit=20, since=cutoff_ts
+                    )
+                    if recent_notes:
                         # 提取hashtags
                         hashtags = []
                         for note in recent_notes[:20]:
@@ -402,7 +361,8 @@ class StyleGenerationService:
             content_style = creator_profile.get("content_style", "")
             value_points = "\n".join([f"- {vp}" for vp in creator_profile.get("value_points", [])])
             
-            # 格式化样本笔记
+            # 格式化样本笔记（按互动指数从高到低排列：prompt超出token预算时网关从最后一条开始丢弃）
+            sample_notes = sorted(sample_notes, key=lambda n: n.get("value", 0) or 0, reverse=True)
             sample_notes_text = ""
             for i, note in enumerate(sample_notes, 1):
                 title = note.get("title", "")
@@ -430,12 +390,52 @@ class StyleGenerationService:
             print(f"❌ 构建提示词失败: {e}")
             return self._get_fallback_prompt(creator_name, user_topic)
     
+    @staticmethod
+    def _semantic_key(creator_name: str, user_topic: str, platform: str, prompt_type: str) -> Dict[str, str]:
+        """语义缓存键：只对用户主题做 embedding，创作者、平台和模板必须完全一致"""
+        return {"text": user_topic, "namespace": f"{platform}:{creator_name}:{prompt_type}"}
+    
+    async def _prepare_prompt(
+        self,
+        creator_name: str,
+        user_topic: str,
+        platform: str,
+        prompt_type: str
+    ) -> Optional[str]:
+        """
+        加载创作者档案和笔记样本并构建提示词（generate_content / generate_content_stream 共用）
+        
+        Returns:
+            提示词；找不到创作者档案时返回 None
+        """
+        # 1. 并发加载创作者档案和笔记样本（优化：减少样本数量以节省token）
+        print(f"📥 加载创作者档案和笔记样本: {creator_name}")
+        creator_profile, sample_notes = await asyncio.gather(
+            self.load_creator_profile(creator_name, platform),
+            self.load_creator_notes(creator_name, platform, limit=3)
+        )
+        if not creator_profile:
+            return None
+        if not sample_notes:
+            print("⚠️  未找到笔记样本，将基于档案信息生成")
+        
+        # 2. 构建提示词
+        print(f"🔨 构建提示词（使用模板: {prompt_type}）...")
+        return await self.build_style_prompt(
+            creator_profile,
+            sample_notes,
+            user_topic,
+            creator_name,
+            prompt_type
+        )
+    
     async def generate_content(
         self,
         creator_name: str,
         user_topic: str,
         platform: str = "xiaohongshu",
-        prompt_type: str = "style_generation"
+        prompt_type: str = "style_generation",
+        semantic_cache: bool = False
     ) -> Dict[str, Any]:
         """
         生成风格化内容
@@ -445,37 +445,20 @@ class StyleGenerationService:
             user_topic: 用户主题
             platform: 平台类型
             prompt_type: prompt模板类型
+            semantic_cache: 是否启用语义缓存（主题相近的请求复用历史结果）
             
         Returns:
             生成结果 {"success": bool, "content": str, "error": str}
         """
         try:
-            # 1. 加载创作者档案
-            print(f"📥 加载创作者档案: {creator_name}")
-            creator_profile = self.load_creator_profile(creator_name, platform)
-            if not creator_profile:
+            prompt = await self._prepare_prompt(creator_name, user_topic, platform, prompt_type)
+            if prompt is None:
                 return {
                     "success": False,
                     "content": "",
                     "error": f"未找到创作者档案: {creator_name}"
                 }
             
-            # 2. 加载笔记样本（优化：减少数量以节省token）
-            print(f"📥 加载笔记样本...")
-            sample_notes = self.load_creator_notes(creator_name, platform, limit=3)
-            if not sample_notes:
-                print("⚠️  未找到笔记样本，将基于档案信息生成")
-            
-            # 3. 构建提示词
-            print(f"🔨 构建提示词（使用模板: {prompt_type}）...")
-            prompt = self.build_style_prompt(
-                creator_profile,
-                sample_notes,
-                user_topic,
-                creator_name,
-                prompt_type
-            )
-            
             # 4. 使用LLM Gateway调用API（自动缓存+限流）
             print(f"🤖 调用LLM Gateway生成内容（启用缓存）...")
             generated_content = await self.llm.chat(
@@ -483,7 +466,9 @@ class StyleGenerationService:
                 model="deepseek-chat",
                 max_tokens=2000,
                 temperature=0.7,
-                use_cache=True  # 启用缓存
+                use_cache=True,  # 启用缓存
+                semantic_key=self._semantic_key(creator_name, user_topic, platform, prompt_type) if semantic_cache else None,
+                caller="style.generate"
             )
             
             print(f"✅ 内容生成成功")
@@ -503,6 +488,53 @@ class StyleGenerationService:
                 "error": error_msg
             }
     
+    async def generate_content_stream(
+        self,
+        creator_name: str,
+        user_topic: str,
+        platform: str = "xiaohongshu",
+        prompt_type: str = "style_generation",
+        semantic_cache: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        流式生成风格化内容
+        
+        Args:
+            creator_name: 创作者昵称
+            user_topic: 用户主题
+            platform: 平台类型
+            prompt_type: prompt模板类型
+            semantic_cache: 是否启用语义缓存
+            
+        Yields:
+            事件 {"type": "chunk", "content": str} / {"type": "done"} / {"type": "error", "error": str}
+        """
+        try:
+            prompt = await self._prepare_prompt(creator_name, user_topic, platform, prompt_type)
+            if prompt is None:
+                yield {"type": "error", "error": f"未找到创作者档案: {creator_name}"}
+                return
+            
+            print(f"🤖 调用LLM Gateway流式生成内容（启用缓存）...")
+            async for chunk in self.llm.chat_stream(
+                prompt=prompt,
+                model="deepseek-chat",
+                max_tokens=2000,
+                temperature=0.7,
+                use_cache=True,
+                semantic_key=self._semantic_key(creator_name, user_topic, platform, prompt_type) if semantic_cache else None,
+                caller="style.generate_stream"
+            ):
+                yield {"type": "chunk", "content": chunk}
+            
+            print(f"✅ 内容流式生成完成")
+            yield {"type": "done"}
+            
+        except Exception as e:
+            error_msg = f"生成失败: {str(e)}"
+            print(f"❌ {error_msg}")
+            yield {"type": "error", "error": error_msg}
+    
     def _get_default_template(self) -> str:
         """获取默认提示词模板"""
         return """你是一位经验丰富的小红书内容创作者，擅长模仿不同博主的风格进行创作。
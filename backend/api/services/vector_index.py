@@ -0,0 +1,403 @@
+"""
+笔记向量索引（ANN）
+为语义搜索提供可插拔的近似最近邻索引，所有索引都基于同一个已 L2 归一化的
+embedding 矩阵（内积 == 余弦相似度），只保存检索结构，不复制向量本身。
+
+- exact: numpy 暴力检索（兜底方案，结果精确）
+- ivf:   纯 numpy 实现的倒排聚类索引（IVF-Flat），无额外依赖
+- hnsw:  基于 hnswlib 的图索引（可选依赖：pip install hnswlib）
+"""
+
+import copy
+import json
+import time
+import hashlib
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+import numpy as np
+
+from core.config import settings
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """返回分数最高的 k 个下标（降序），用 argpartition 避免对全部分数排序"""
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return np.array([], dtype=np.int64)
+    if k >= n:
+        return np.argsort(scores)[::-1]
+    part = np.argpartition(scores, n - k)[n - k:]
+    return part[np.argsort(scores[part])[::-1]]
+
+
+def matrix_fingerprint(note_ids: List[str], matrix: np.ndarray) -> str:
+    """
+    根据行顺序（note_id 列表）和矩阵内容生成索引指纹，用于判断磁盘索引是否可复用
+
+    向量内容也计入指纹：服务停机期间 embedding 被重新生成或修改后，
+    重启时不会加载基于旧向量构建的索引（HNSW 自带一份向量副本，会按旧向量排序）。
+    """
+    h = hashlib.sha1(f"{matrix.shape[1]}:{len(note_ids)}".encode())
+    for nid in note_ids:
+        h.update(nid.encode())
+        h.update(b"\0")
+    h.update(np.ascontiguousarray(matrix, dtype=np.float32).data)
+    return h.hexdigest()[:16]
+
+
+class VectorIndex(ABC):
+    """向量索引抽象基类"""
+
+    name = "base"
+    persistent = True
+
+    def __init__(self):
+        self.matrix: Optional[np.ndarray] = None
+
+    @property
+    def size(self) -> int:
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    def attach(self, matrix: np.ndarray):
+        """绑定（或重新绑定）底层归一化矩阵，矩阵扩容后需要重新调用"""
+        self.matrix = matrix
+
+    @abstractmethod
+    def build(self, matrix: np.ndarray):
+        """基于完整矩阵构建索引"""
+        pass
+
+    @abstractmethod
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        检索最相似的 k 行
+
+        Args:
+            query: 已归一化的查询向量 (dim,)
+            k: 返回数量
+
+        Returns:
+            (行下标数组, 相似度数组)，按相似度降序
+        """
+        pass
+
+    @abstractmethod
+    def add(self, rows: np.ndarray):
+        """矩阵末尾追加了新行后，把这些行加入索引（调用前先 attach 新矩阵）"""
+        pass
+
+    @abstractmethod
+    def update(self, rows: np.ndarray):
+        """已有行的向量被原地修改后，刷新这些行在索引中的位置"""
+        pass
+
+    def copy(self) -> "VectorIndex":
+        """复制索引（增量刷新在副本上 attach/add/update，正在进行的检索继续使用原索引）"""
+        return copy.copy(self)
+
+    def save(self, path: Path):
+        """持久化索引结构到磁盘"""
+        pass
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray) -> "VectorIndex":
+        """从磁盘加载索引并绑定矩阵"""
+        raise NotImplementedError(f"{cls.name} 索引不支持持久化")
+
+
+class ExactIndex(VectorIndex):
+    """暴力检索：一次矩阵乘 + argpartition"""
+
+    name = "exact"
+    persistent = False
+
+    def build(self, matrix: np.ndarray):
+        self.attach(matrix)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        scores = self.matrix @ query
+        idx = top_k_indices(scores, k)
+        return idx, scores[idx]
+
+    def add(self, rows: np.ndarray):
+        pass
+
+    def update(self, rows: np.ndarray):
+        pass
+
+
+class IVFIndex(VectorIndex):
+    """
+    倒排聚类索引（IVF-Flat）
+
+    用球面 k-means 把向量划分到 nlist 个簇，检索时只扫描与查询最接近的
+    nprobe 个簇，扫描量约为 N * nprobe / nlist。
+    """
+
+    name = "ivf"
+
+    def __init__(self, nlist: Optional[int] = None, nprobe: Optional[int] = None,
+                 train_iters: int = 10, max_train_size: int = 100_000):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe or settings.NOTE_INDEX_NPROBE
+        self.train_iters = train_iters
+        self.max_train_size = max_train_size
+        self.centroids: Optional[np.ndarray] = None   # (nlist, dim)
+        self.assignments: Optional[np.ndarray] = None  # (N,) 每行所属的簇
+        self.lists: List[np.ndarray] = []              # 每个簇包含的行号
+
+    def _assign(self, vectors: np.ndarray, block: int = 65536) -> np.ndarray:
+        """分块计算每个向量最近的簇中心，限制峰值内存"""
+        out = np.empty(vectors.shape[0], dtype=np.int32)
+        for start in range(0, vectors.shape[0], block):
+            sims = vectors[start:start + block] @ self.centroids.T
+            out[start:start + block] = np.argmax(sims, axis=1)
+        return out
+
+    def _train(self, matrix: np.ndarray):
+        n = matrix.shape[0]
+        rng = np.random.default_rng(42)
+        sample = matrix
+        if n > self.max_train_size:
+            sample = matrix[rng.choice(n, self.max_train_size, replace=False)]
+
+        centroids = sample[rng.choice(sample.shape[0], self.nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=self.nlist)
+            empty = counts == 0
+            if empty.any():
+                # 空簇用随机样本重新初始化
+                sums[empty] = sample[rng.choice(sample.shape[0], int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+        self.centroids = centroids
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignments, kind="stable")
+        counts = np.bincount(self.assignments, minlength=self.nlist)
+        self.lists = np.split(order, np.cumsum(counts)[:-1])
+
+    def build(self, matrix: np.ndarray):
+        self.attach(matrix)
+        n = matrix.shape[0]
+        if not self.nlist:
+            self.nlist = int(4 * np.sqrt(n))
+        self.nlist = max(1, min(self.nlist, n))
+        self._train(matrix)
+        self.assignments = self._assign(matrix)
+        self._rebuild_lists()
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        probe = top_k_indices(self.centroids @ query, min(self.nprobe, self.nlist))
+        candidates = np.concatenate([self.lists[c] for c in probe])
+        if candidates.size == 0:
+            return candidates, np.array([], dtype=np.float32)
+        scores = self.matrix[candidates] @ query
+        idx = top_k_indices(scores, k)
+        return candidates[idx], scores[idx]
+
+    def add(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        labels = self._assign(self.matrix[rows])
+        self.assignments = np.concatenate([self.assignments, labels])
+        for c in np.unique(labels):
+            self.lists[c] = np.concatenate([self.lists[c], rows[labels == c]])
+
+    def update(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        old = self.assignments[rows]
+        new = self._assign(self.matrix[rows])
+        moved = old != new
+        if not moved.any():
+            return
+        for c in np.unique(old[moved]):
+            self.lists[c] = np.setdiff1d(self.lists[c], rows[moved & (old == c)], assume_unique=True)
+        for c in np.unique(new[moved]):
+            self.lists[c] = np.concatenate([self.lists[c], rows[moved & (new == c)]])
+        self.assignments[rows] = new
+
+    def copy(self) -> "IVFIndex":
+        clone = copy.copy(self)
+        clone.assignments = self.assignments.copy()
+        clone.lists = list(self.lists)  # add / update 只替换列表元素，不原地修改数组
+        return clone
+
+    def save(self, path: Path):
+        np.savez(
+            path.with_suffix(".npz"),
+            centroids=self.centroids,
+            assignments=self.assignments,
+            nprobe=np.array(self.nprobe),
+        )
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray) -> "IVFIndex":
+        data = np.load(path.with_suffix(".npz"))
+        index = cls(nlist=data["centroids"].shape[0], nprobe=int(data["nprobe"]))
+        index.attach(matrix)
+        index.centroids = data["centroids"]
+        index.assignments = data["assignments"]
+        index._rebuild_lists()
+        return index
+
+
+class HNSWIndex(VectorIndex):
+    """HNSW 图索引（需要安装 hnswlib）"""
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: Optional[int] = None):
+        super().__init__()
+        try:
+            import hnswlib
+            self._hnswlib = hnswlib
+        except ImportError:
+            raise ImportError("请安装 hnswlib: pip install hnswlib")
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search or settings.NOTE_INDEX_HNSW_EF_SEARCH
+        self.index = None
+
+    def _new_index(self, dim: int, max_elements: int):
+        index = self._hnswlib.Index(space="ip", dim=dim)
+        index.init_index(max_elements=max_elements, ef_construction=self.ef_construction, M=self.m)
+        return index
+
+    def build(self, matrix: np.ndarray):
+        self.attach(matrix)
+        n, dim = matrix.shape
+        self.index = self._new_index(dim, max(n, 1))
+        self.index.add_items(matrix, np.arange(n))
+        self.index.set_ef(self.ef_search)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        k = min(k, self.index.get_current_count())
+        self.index.set_ef(max(self.ef_search, k))
+        labels, distances = self.index.knn_query(query.reshape(1, -1), k=k)
+        # space="ip" 的距离为 1 - 内积
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def add(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        needed = self.index.get_current_count() + rows.size
+        if needed > self.index.get_max_elements():
+            self.index.resize_index(max(needed, int(self.index.get_max_elements() * 1.5)))
+        self.index.add_items(self.matrix[rows], rows)
+
+    def update(self, rows: np.ndarray):
+        if rows.size == 0:
+            return
+        # hnswlib 对已存在的 label 调用 add_items 会原地更新该元素
+        self.index.add_items(self.matrix[rows], rows)
+
+    def copy(self) -> "HNSWIndex":
+        clone = copy.copy(self)
+        clone.index = copy.deepcopy(self.index)  # hnswlib.Index 支持 pickle，深拷贝整个图
+        return clone
+
+    def save(self, path: Path):
+        self.index.save_index(str(path.with_suffix(".hnsw")))
+
+    @classmethod
+    def load(cls, path: Path, matrix: np.ndarray) -> "HNSWIndex":
+        index = cls()
+        index.attach(matrix)
+        index.index = index._hnswlib.Index(space="ip", dim=matrix.shape[1])
+        index.index.load_index(str(path.with_suffix(".hnsw")), max_elements=matrix.shape[0])
+        index.index.set_ef(index.ef_search)
+        return index
+
+
+INDEX_TYPES: Dict[str, Type[VectorIndex]] = {
+    ExactIndex.name: ExactIndex,
+    IVFIndex.name: IVFIndex,
+    HNSWIndex.name: HNSWIndex,
+}
+
+
+def _index_path(kind: str, fingerprint: str) -> Path:
+    return Path(settings.NOTE_INDEX_DIR) / f"{kind}_{fingerprint}"
+
+
+def load_or_build_index(kind: str, matrix: np.ndarray, fingerprint: str) -> VectorIndex:
+    """
+    获取指定类型的索引：优先加载磁盘上指纹一致的索引，否则重新构建并持久化
+
+    Args:
+        kind: 索引类型 exact / ivf / hnsw
+        matrix: 已归一化的 embedding 矩阵
+        fingerprint: 矩阵指纹（见 matrix_fingerprint）
+
+    Returns:
+        VectorIndex 实例
+    """
+    if kind not in INDEX_TYPES:
+        raise ValueError(f"未知的索引类型: {kind}，可选: {', '.join(INDEX_TYPES)}")
+    index_cls = INDEX_TYPES[kind]
+
+    if not index_cls.persistent:
+        index = index_cls()
+        index.build(matrix)
+        return index
+
+    path = _index_path(kind, fingerprint)
+    meta_path = path.with_suffix(".json")
+    if meta_path.exists():
+        try:
+            index = index_cls.load(path, matrix)
+            print(f"[VectorIndex] 从磁盘加载 {kind} 索引: {path.name}")
+            return index
+        except Exception as e:
+            print(f"[VectorIndex] ⚠️  加载 {kind} 索引失败，重新构建: {e}")
+
+    t0 = time.time()
+    index = index_cls()
+    index.build(matrix)
+    print(f"[VectorIndex] 构建 {kind} 索引完成: {matrix.shape[0]} 行 ({time.time() - t0:.2f}s)")
+
+    save_index(index, kind, fingerprint)
+    return index
+
+
+def save_index(index: VectorIndex, kind: str, fingerprint: str) -> bool:
+    """把索引按指纹持久化到磁盘（失败只打印警告，不影响检索）"""
+    if not index.persistent:
+        return False
+    path = _index_path(kind, fingerprint)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        index.save(path)
+        path.with_suffix(".json").write_text(json.dumps({
+            "kind": kind,
+            "fingerprint": fingerprint,
+            "rows": int(index.size),
+            "dim": int(index.matrix.shape[1]),
+            "built_at": time.time(),
+        }))
+    except Exception as e:
+        print(f"[VectorIndex] ⚠️  索引持久化失败（不影响检索）: {e}")
+        return False
+    _remove_stale_indexes(kind, fingerprint)
+    return True
+
+
+def _remove_stale_indexes(kind: str, fingerprint: str):
+    """删除该类型其他指纹的索引文件（每次增量刷新都会生成新指纹，旧文件不再会被加载）"""
+    keep = _index_path(kind, fingerprint).name
+    for path in Path(settings.NOTE_INDEX_DIR).glob(f"{kind}_*"):
+        if path.stem == keep:
+            continue
+        try:
+            path.unlink()
+        except OSError as e:
+            print(f"[VectorIndex] ⚠️  删除旧索引文件失败 {path.name}: {e}")
@@ -5,7 +5,7 @@
 
 import os
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field, field_validator
 
@@ -24,6 +24,52 @@ class Settings(BaseSettings):
         default="tikhub_xhs",
         description="MongoDB数据库名称"
     )
+    MONGO_EXECUTOR_WORKERS: int = Field(
+        default=8,
+        description="异步接口执行同步PyMongo操作的线程池大小（应不超过 MONGO_API_MAX_POOL_SIZE）"
+    )
+    MONGO_CONNECT_TIMEOUT_MS: int = Field(
+        default=5000,
+        description="建立连接和服务器选择的超时（毫秒），所有客户端配置共用"
+    )
+    # 在线接口（api 配置）：短超时，慢查询尽快失败
+    MONGO_API_MAX_POOL_SIZE: int = Field(
+        default=10,
+        description="api 客户端每个进程的最大连接数（同步和Motor客户端各一个连接池）"
+    )
+    MONGO_API_MIN_POOL_SIZE: int = Field(
+        default=1,
+        description="api 客户端保持的最小连接数"
+    )
+    MONGO_API_SOCKET_TIMEOUT_MS: int = Field(
+        default=5000,
+        description="api 客户端单次操作的socket超时（毫秒）"
+    )
+    MONGO_API_READ_PREFERENCE: str = Field(
+        default="primary",
+        description="api 客户端的读偏好"
+    )
+    # 离线脚本（batch 配置）：全集合扫描和批量写入，需要更长的超时
+    MONGO_BATCH_MAX_POOL_SIZE: int = Field(
+        default=4,
+        description="batch 客户端的最大连接数"
+    )
+    MONGO_BATCH_MIN_POOL_SIZE: int = Field(
+        default=0,
+        description="batch 客户端保持的最小连接数"
+    )
+    MONGO_BATCH_SOCKET_TIMEOUT_MS: int = Field(
+        default=600000,
+        description="batch 客户端单次操作的socket超时（毫秒，0 表示不超时）"
+    )
+    MONGO_BATCH_READ_PREFERENCE: str = Field(
+        default="primary",
+        description="batch 客户端的读偏好（脚本会读取自己刚写入的数据，默认读主节点）"
+    )
+    MONGO_ANALYTICS_READ_PREFERENCE: str = Field(
+        default="secondaryPreferred",
+        description="只读的全集合分析扫描（构建网络、生成笔记向量）使用的读偏好，单节点部署时自动读主节点"
+    )
     
     # ========================================
     # API Keys配置
@@ -89,6 +135,68 @@ class Settings(BaseSettings):
         default="deepseek-chat",
         description="聊天模型名称"
     )
+    LLM_CACHE_TTL_SECONDS: int = Field(
+        default=86400,
+        description="LLM响应缓存有效期（秒），同时用于 llm_cache 的 TTL 索引"
+    )
+    LLM_CACHE_MEMORY_SIZE: int = Field(
+        default=512,
+        description="进程内LLM响应缓存的最大条目数（0 表示只用MongoDB缓存）"
+    )
+    SEMANTIC_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="是否允许请求使用语义缓存（请求需显式开启）"
+    )
+    SEMANTIC_CACHE_THRESHOLD: float = Field(
+        default=0.95,
+        description="语义缓存命中所需的最低余弦相似度"
+    )
+    SEMANTIC_CACHE_MAX_CANDIDATES: int = Field(
+        default=200,
+        description="语义缓存每次查找最多比较的历史条目数（同一创作者+模板下按时间倒序）"
+    )
+    LLM_MAX_IN_FLIGHT: int = Field(
+        default=8,
+        description="每个模型同时进行的最大LLM请求数"
+    )
+    LLM_REQUESTS_PER_SECOND: float = Field(
+        default=10.0,
+        gt=0,
+        description="每个模型每秒最多发起的LLM请求数"
+    )
+    LLM_TOKENS_PER_MINUTE: int = Field(
+        default=1_000_000,
+        gt=0,
+        description="每个模型每分钟的token预算（按 prompt + max_tokens 预估，结束后按实际用量校正）"
+    )
+    LLM_MODEL_LIMITS: Dict[str, Dict[str, float]] = Field(
+        default={},
+        description='按模型覆盖调度参数，如 {"deepseek-reasoner": {"max_in_flight": 2, "tokens_per_minute": 200000}}'
+    )
+    LLM_PROMPT_MAX_TOKENS: int = Field(
+        default=6000,
+        description="单次调用prompt的token上限（超出时先丢弃价值最低的样本笔记）"
+    )
+    LLM_PROMPT_RESERVE_TOKENS: int = Field(
+        default=256,
+        description="在模型上下文中为消息格式等额外开销预留的token数"
+    )
+    LLM_MODEL_CONTEXT_TOKENS: Dict[str, int] = Field(
+        default={"deepseek-chat": 65536, "deepseek-reasoner": 65536},
+        description="各模型的上下文长度（prompt预算 = 上下文 - max_tokens - 预留）"
+    )
+    LLM_CALLER_SAMPLE_RATE: float = Field(
+        default=0.05,
+        description="未显式传入 caller 的LLM调用中，采集调用栈定位来源的抽样比例（0~1）"
+    )
+    LLM_USAGE_LOG_BATCH_SIZE: int = Field(
+        default=50,
+        description="llm_usage_logs 缓冲写入的批量大小"
+    )
+    LLM_USAGE_LOG_FLUSH_SECONDS: float = Field(
+        default=5.0,
+        description="llm_usage_logs 缓冲写入的最长间隔（秒）"
+    )
     EMBEDDING_MODEL: str = Field(
         default="BAAI/bge-small-zh-v1.5",
         description="向量Embedding模型"
@@ -97,7 +205,47 @@ class Settings(BaseSettings):
         default=512,
         description="向量维度"
     )
-    
+    EMBEDDING_STORAGE_DTYPE: str = Field(
+        default="float32",
+        description="向量在MongoDB中的存储格式：float32, float16（BSON Binary）, list（旧的double数组）"
+    )
+
+    # ========================================
+    # 笔记向量索引（ANN）配置
+    # ========================================
+    NOTE_INDEX_TYPE: str = Field(
+        default="ivf",
+        description="默认的笔记检索索引：exact（暴力检索）, ivf, hnsw"
+    )
+    NOTE_INDEX_DIR: str = Field(
+        default="/tmp/xhs_storage/note_index",
+        description="ANN索引持久化目录"
+    )
+    NOTE_INDEX_MIN_SIZE: int = Field(
+        default=5000,
+        description="笔记数低于该值时始终使用暴力检索"
+    )
+    NOTE_INDEX_NPROBE: int = Field(
+        default=16,
+        description="IVF索引每次检索扫描的簇数量"
+    )
+    NOTE_INDEX_HNSW_EF_SEARCH: int = Field(
+        default=64,
+        description="HNSW索引检索时的ef参数"
+    )
+
+    # ========================================
+    # 成长路径预计算配置
+    # ========================================
+    GROWTH_PRECOMPUTE_NEIGHBORS: int = Field(
+        default=5,
+        description="预计算时每个创作者取网络中权重最高的前K个相邻创作者作为竞品"
+    )
+    GROWTH_RESULT_MAX_AGE_HOURS: int = Field(
+        default=168,
+        description="成长路径结果的最长有效期（小时），双方笔记未变化时也会在到期后重新计算"
+    )
+
     # ========================================
     # 日志配置
     # ========================================
@@ -157,6 +305,46 @@ class Settings(BaseSettings):
             raise ValueError(f"ENV must be one of {allowed}")
         return v
     
+    @field_validator("MONGO_API_READ_PREFERENCE", "MONGO_BATCH_READ_PREFERENCE", "MONGO_ANALYTICS_READ_PREFERENCE")
+    @classmethod
+    def validate_read_preference(cls, v):
+        """验证MongoDB读偏好"""
+        allowed = ["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+        if v not in allowed:
+            raise ValueError(f"read preference must be one of {allowed}")
+        return v
+
+    @field_validator("EMBEDDING_STORAGE_DTYPE")
+    @classmethod
+    def validate_embedding_storage_dtype(cls, v):
+        """验证向量存储格式"""
+        allowed = ["float32", "float16", "list"]
+        if v not in allowed:
+            raise ValueError(f"EMBEDDING_STORAGE_DTYPE must be one of {allowed}")
+        return v
+
+    @field_validator("NOTE_INDEX_TYPE")
+    @classmethod
+    def validate_note_index_type(cls, v):
+        """验证笔记索引类型"""
+        allowed = ["exact", "ivf", "hnsw"]
+        if v not in allowed:
+            raise ValueError(f"NOTE_INDEX_TYPE must be one of {allowed}")
+        return v
+
+    @field_validator("LLM_MODEL_LIMITS")
+    @classmethod
+    def validate_llm_model_limits(cls, v):
+        """验证按模型覆盖的调度参数（限速为0会导致调度器除零、排队请求永远等待）"""
+        allowed = ["max_in_flight", "requests_per_second", "tokens_per_minute"]
+        for model, limits in v.items():
+            for key, value in limits.items():
+                if key not in allowed:
+                    raise ValueError(f"LLM_MODEL_LIMITS[{model}] keys must be one of {allowed}")
+                if value <= 0:
+                    raise ValueError(f"LLM_MODEL_LIMITS[{model}][{key}] must be > 0")
+        return v
+
     @field_validator("LOG_LEVEL")
     @classmethod
     def validate_log_level(cls, v):
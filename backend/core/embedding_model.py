@@ -0,0 +1,56 @@
+"""
+共享的本地 embedding 模型（BAAI/bge-small-zh-v1.5）
+笔记语义搜索和 LLM 语义缓存共用同一个模型实例，避免重复加载
+"""
+
+import threading
+import time
+from typing import List
+
+import numpy as np
+
+from core.config import settings
+
+
+# 检索场景下查询文本的前缀（bge 推荐用法）
+QUERY_INSTRUCTION = "为这个句子生成表示以用于检索相关文章："
+
+# 全局 embedding model 实例（懒加载）
+_embedding_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """懒加载 FlagModel（首次调用时加载，约2-3秒；线程安全）"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                print(f"[Embedding] 加载 embedding 模型 {settings.EMBEDDING_MODEL} ...")
+                t0 = time.time()
+                from FlagEmbedding import FlagModel
+                _embedding_model = FlagModel(
+                    settings.EMBEDDING_MODEL,
+                    query_instruction_for_retrieval=QUERY_INSTRUCTION,
+                    use_fp16=True
+                )
+                print(f"[Embedding] 模型加载完成 ({time.time() - t0:.1f}s)")
+    return _embedding_model
+
+
+def encode_texts(texts: List[str]) -> np.ndarray:
+    """
+    编码文本为 L2 归一化的 float32 向量（不加检索前缀，用于文本之间的对称相似度）
+
+    Args:
+        texts: 文本列表
+
+    Returns:
+        (len(texts), dim) 矩阵
+    """
+    vectors = np.asarray(get_embedding_model().encode(texts), dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
@@ -1,44 +1,83 @@
 """
 LLM Gateway - 统一的LLM调用网关
-实现缓存、压缩、限流等优化
+实现缓存、压缩、调度限流等优化
+
+全链路非阻塞：DeepSeek 调用走 AsyncOpenAI，缓存读写和使用统计
+通过数据库线程池执行，不会阻塞事件循环中的其他请求。
 """
 
 import hashlib
-import json
-import re
+import sys
+import time
+import random
 import asyncio
+import logging
 import uuid
-import traceback
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
-from openai import OpenAI
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
+from datetime import datetime, timezone
+from openai import AsyncOpenAI
 
 from core.config import settings
-from database.connection import get_database
+from core.ttl_cache import TTLLRUCache
+from core.semantic_cache import SemanticCache
+from core.llm_scheduler import LLMScheduler, PRIORITY_INTERACTIVE, estimate_tokens
+from core.prompt_compressor import PromptCompressor
+from core.usage_log_writer import UsageLogWriter
+from database.connection import get_database, run_in_db_executor
+
+
+logger = logging.getLogger(__name__)
+
+
+# DeepSeek 定价（美元 / 百万 token），用于成本估算
+INPUT_PRICE_PER_M = 0.27
+OUTPUT_PRICE_PER_M = 1.1
 
 
 class LLMGateway:
-    """LLM网关 - 缓存 + 压缩 + 限流"""
+    """LLM网关 - 缓存 + 压缩 + 调度限流 + 相同请求合并"""
     
     def __init__(self):
+        # 进行中的请求：(缓存键, 语义缓存键, 优先级) -> Task，用于合并并发的相同请求
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        self.stats: Dict[str, Any] = {
+            "requests": 0,
+            "cache_hits": 0,
+            "coalesced_hits": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "coalesced_tokens_saved": 0,
+            "coalesced_cost_saved": 0.0,
+            "semantic_hits": 0,
+            "prompt_tokens_saved": 0,
+            "prompts_trimmed": 0,
+        }
+        self._semantic_cache: Optional[SemanticCache] = None
+        # 两级缓存：进程内 LRU（热点prompt免去 Atlas 往返）+ MongoDB llm_cache（跨进程共享）
+        self.memory_cache = TTLLRUCache(
+            max_size=settings.LLM_CACHE_MEMORY_SIZE,
+            ttl_seconds=settings.LLM_CACHE_TTL_SECONDS
+        )
+        self.mongo_cache_stats: Dict[str, int] = {"hits": 0, "misses": 0, "expired": 0, "writes": 0}
+        # 按模型的并发上限 + 请求/token 预算 + 优先级队列
+        self.scheduler = LLMScheduler()
+        # 按 token 预算压缩 prompt
+        self.compressor = PromptCompressor()
+        # 使用统计批量写入 llm_usage_logs
+        self.usage_writer = UsageLogWriter()
         try:
             # 简化初始化，避免版本兼容问题
-            self.client = OpenAI(
+            self.client = AsyncOpenAI(
                 api_key=settings.DEEPSEEK_API_KEY,
                 base_url=settings.DEEPSEEK_BASE_URL,
                 timeout=30.0  # 添加超时设置
             )
-            self.rate_limiter = TokenBucketRateLimiter(
-                capacity=100,   # 桶容量
-                refill_rate=10  # 每秒补充10个token
-            )
             self.db = get_database()
-            print("✅ LLM Gateway 初始化完成（缓存 + 限流已启用）")
+            logger.info("llm_gateway_ready cache=on scheduler=on")
         except Exception as e:
-            print(f"⚠️  LLM Gateway 初始化警告: {e}")
+            logger.warning("llm_gateway_init_failed error=%s", e)
             # 即使初始化失败也创建客户端（用于非AI功能）
             self.client = None
-            self.rate_limiter = None
             self.db = get_database()
     
     async def chat(
@@ -47,7 +86,10 @@ class LLMGateway:
         model: str = "deepseek-chat",
         max_tokens: int = 1000,
         temperature: float = 0.7,
-        use_cache: bool = True
+        use_cache: bool = True,
+        semantic_key: Optional[Dict[str, str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        caller: Optional[str] = None
     ) -> str:
         """
         统一的聊天接口
@@ -58,114 +100,443 @@ class LLMGateway:
             max_tokens: 最大token数
             temperature: 温度参数
             use_cache: 是否启用缓存
+            semantic_key: 可选，启用语义缓存 {"text": 用户主题, "namespace": 创作者+模板等}；
+                          精确缓存未命中时查找语义相近的历史结果
+            priority: 调度优先级，交互请求用 PRIORITY_INTERACTIVE，批量任务用 PRIORITY_BATCH
+            caller: 调用方标识（如 "style.generate"），写入使用统计；
+                    未提供时按 LLM_CALLER_SAMPLE_RATE 抽样采集调用栈
             
         Returns:
             生成的文本
         """
         
-        # 🔍 调用追踪（诊断异常调用）
-        call_id = str(uuid.uuid4())[:8]
-        print(f"\n{'='*60}")
-        print(f"[LLM #{call_id}] 📞 新的API调用请求")
-        print(f"[LLM #{call_id}] 🕐 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"[LLM #{call_id}] 🤖 Model: {model}")
-        print(f"[LLM #{call_id}] 📝 Prompt长度: {len(prompt)} 字符 (压缩前)")
-        print(f"[LLM #{call_id}] ⚙️  Max Tokens: {max_tokens}")
-        print(f"[LLM #{call_id}] 🔥 Temperature: {temperature}")
-        print(f"[LLM #{call_id}] 💾 Cache: {'启用' if use_cache else '禁用'}")
+        call_id, caller_info, compressed_prompt = self._begin_call(
+            prompt, model, max_tokens, temperature, use_cache, caller
+        )
+        
+        # 2️⃣ 生成缓存键
+        cache_key = self._generate_cache_key(compressed_prompt, model, temperature)
+        self.stats["requests"] += 1
         
-        # 获取调用栈（诊断来源）
-        stack = traceback.extract_stack()
-        caller_info = None
-        for frame in reversed(stack[:-1]):  # 跳过当前函数
-            if 'llm_gateway' not in frame.filename:
-                caller_info = f"{frame.filename}:{frame.lineno} in {frame.name}"
-                break
-        if caller_info:
-            print(f"[LLM #{call_id}] 📍 调用来源: {caller_info}")
-        print(f"{'='*60}\n")
+        if not use_cache:
+            result, _ = await self._complete(
+                cache_key, compressed_prompt, model, max_tokens, temperature,
+                use_cache, call_id, caller_info, priority=priority
+            )
+            return result
         
-        # 1️⃣ Prompt压缩
-        compressed_prompt = self._compress_prompt(prompt)
-        print(f"[LLM #{call_id}] 🗜️  压缩后长度: {len(compressed_prompt)} 字符 (节省 {len(prompt) - len(compressed_prompt)} 字符)")
+        # 3️⃣ 合并进行中的相同请求（single-flight）
+        # 相同缓存键的请求正在调用API时，直接等待它的结果，共享同一次API调用和缓存写入；
+        # 语义缓存选项和优先级也必须一致：未启用语义缓存的请求不能拿到语义命中的结果，交互请求不排在批量请求后面
+        flight_key = self._flight_key(cache_key, semantic_key, priority)
+        inflight = self._inflight.get(flight_key)
+        if inflight is not None:
+            self.stats["coalesced_hits"] += 1
+            result, usage = await asyncio.shield(inflight)
+            if usage is not None:
+                self.stats["coalesced_tokens_saved"] += usage.total_tokens
+                self.stats["coalesced_cost_saved"] += self._estimate_cost(usage)
+            self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model, outcome="coalesced")
+            return result
         
-        # 2️⃣ 生成缓存键
+        # shield 保证发起方被取消（如客户端断开）时，等待中的其他请求仍能拿到结果
+        task = asyncio.ensure_future(self._complete(
+            cache_key, compressed_prompt, model, max_tokens, temperature,
+            use_cache, call_id, caller_info, semantic_key, priority
+        ))
+        self._inflight[flight_key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(flight_key, None))
+        result, _ = await asyncio.shield(task)
+        return result
+    
+    async def chat_stream(
+        self,
+        prompt: str,
+        model: str = "deepseek-chat",
+        max_tokens: int = 1000,
+        temperature: float = 0.7,
+        use_cache: bool = True,
+        semantic_key: Optional[Dict[str, str]] = None,
+        priority: int = PRIORITY_INTERACTIVE,
+        caller: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        流式聊天接口：边生成边返回文本片段
+        
+        缓存命中（或有相同请求正在进行）时一次性返回完整文本；
+        流式生成完整结束后才写入缓存，客户端中途断开时不缓存残缺内容。
+        
+        Args:
+            prompt: 提示词
+            model: 模型名称
+            max_tokens: 最大token数
+            temperature: 温度参数
+            use_cache: 是否启用缓存
+            semantic_key: 可选，启用语义缓存（同 chat）
+            priority: 调度优先级（同 chat）
+            caller: 调用方标识（同 chat）
+            
+        Yields:
+            生成的文本片段
+        """
+        call_id, caller_info, compressed_prompt = self._begin_call(
+            prompt, model, max_tokens, temperature, use_cache, caller, stream=True
+        )
         cache_key = self._generate_cache_key(compressed_prompt, model, temperature)
+        self.stats["requests"] += 1
         
-        # 3️⃣ 检查缓存（MongoDB）
         if use_cache:
+            # 有相同的非流式请求正在进行，等待它的结果
+            inflight = self._inflight.get(self._flight_key(cache_key, semantic_key, priority))
+            if inflight is not None:
+                self.stats["coalesced_hits"] += 1
+                result, _ = await asyncio.shield(inflight)
+                self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model, outcome="coalesced", stream=True)
+                yield result
+                return
+            
             cached_response = await self._get_from_cache(cache_key)
             if cached_response:
-                print(f"[LLM #{call_id}] 💰 ✅ 缓存命中！节省了API调用")
-                print(f"[LLM #{call_id}] 🎯 返回缓存内容长度: {len(cached_response)} 字符\n")
-                return cached_response
-            else:
-                print(f"[LLM #{call_id}] 💰 ❌ 缓存未命中，需要调用API")
+                self.stats["cache_hits"] += 1
+                self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model,
+                                outcome="cache_hit", stream=True, response_chars=len(cached_response))
+                yield cached_response
+                return
         
-        # 4️⃣ 频率限制
-        print(f"[LLM #{call_id}] ⏱️  等待限流器放行...")
-        await self.rate_limiter.acquire()
-        print(f"[LLM #{call_id}] ✅ 限流器已放行")
+        semantic = await self._semantic_lookup(call_id, cache_key, semantic_key, model, temperature) if use_cache else None
+        if semantic and "response" in semantic:
+            self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model,
+                            outcome="semantic_hit", stream=True, similarity=round(semantic["similarity"], 4))
+            yield semantic["response"]
+            return
         
-        # 5️⃣ 调用API
         try:
-            print(f"[LLM #{call_id}] 🚀 正在调用DeepSeek API...")
-            api_start_time = datetime.now()
+            estimated_tokens = estimate_tokens(compressed_prompt) + max_tokens
+            queued_at = time.perf_counter()
+            # 名额一直占用到流结束（或客户端断开）
+            async with self.scheduler.slot(model, estimated_tokens, priority) as slot:
+                api_start = time.perf_counter()
+                first_chunk_seconds = None
+                self.stats["upstream_calls"] += 1
+                
+                stream = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": compressed_prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    stream=True,
+                    stream_options={"include_usage": True}  # 最后一个chunk带上token用量
+                )
+                
+                parts: List[str] = []
+                usage = None
+                # 客户端断开时生成器在 yield 处被关闭，async with 立即关闭上游连接，DeepSeek 停止生成（不再计费）
+                async with stream:
+                    async for chunk in stream:
+                        if chunk.usage is not None:
+                            usage = chunk.usage
+                            slot["actual_tokens"] = usage.total_tokens
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if first_chunk_seconds is None:
+                                first_chunk_seconds = time.perf_counter() - api_start
+                            parts.append(delta)
+                            yield delta
             
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": compressed_prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature
+            result = "".join(parts)
+            self._log_upstream(
+                call_id, caller_info, model, usage, result,
+                queue_seconds=api_start - queued_at,
+                api_seconds=time.perf_counter() - api_start,
+                first_chunk_seconds=first_chunk_seconds
             )
             
-            api_duration = (datetime.now() - api_start_time).total_seconds()
-            result = response.choices[0].message.content
+            if use_cache and result:
+                await self._save_to_cache(cache_key, result)
+                if semantic is not None:
+                    await self._semantic_store(semantic_key, semantic, model, temperature, result)
+            
+            if usage is not None:
+                self._log_usage(model, usage, compressed_prompt, result, call_id, caller_info)
+            
+        except Exception as e:
+            self.stats["upstream_errors"] += 1
+            self._log_event(logging.ERROR, "llm_call_failed", call_id, caller_info, model=model, stream=True, error=e)
+            raise
+    
+    @staticmethod
+    def _flight_key(cache_key: str, semantic_key: Optional[Dict[str, str]], priority: int) -> tuple:
+        """single-flight 合并键：缓存键 + 语义缓存选项 + 优先级"""
+        semantic = tuple(sorted(semantic_key.items())) if semantic_key else None
+        return cache_key, semantic, priority
+    
+    def _begin_call(
+        self,
+        prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        use_cache: bool,
+        caller: Optional[str] = None,
+        stream: bool = False
+    ) -> Tuple[str, Dict[str, Any], str]:
+        """
+        生成调用ID、确定调用来源并压缩Prompt（chat / chat_stream 共用）
+        
+        Returns:
+            (call_id, 调用来源信息, 压缩后的prompt)
+        """
+        call_id = uuid.uuid4().hex[:8]
+        # 必须在当前协程中采集：合并执行的API调用运行在独立的 Task 中，那里看不到调用方
+        caller_info = self._resolve_caller(caller)
+        
+        # 1️⃣ Prompt压缩（按 token 预算，超出时丢弃价值最低的样本笔记）
+        compressed_prompt, compression = self.compressor.compress(prompt, model, max_tokens)
+        self.stats["prompt_tokens_saved"] += compression["tokens_saved"]
+        trimmed = compression["dropped_notes"] > 0 or compression["truncated"]
+        if trimmed:
+            self.stats["prompts_trimmed"] += 1
+        self._log_event(
+            logging.INFO if trimmed else logging.DEBUG, "llm_request", call_id, caller_info,
+            model=model, stream=stream, max_tokens=max_tokens, temperature=temperature,
+            use_cache=use_cache, prompt_tokens_est=compression["original_tokens"],
+            compressed_tokens_est=compression["compressed_tokens"],
+            tokens_saved=compression["tokens_saved"], budget=compression["budget"],
+            dropped_notes=compression["dropped_notes"], truncated=compression["truncated"]
+        )
+        
+        return call_id, caller_info, compressed_prompt
+    
+    @staticmethod
+    def _resolve_caller(caller: Optional[str]) -> Dict[str, Any]:
+        """
+        确定调用来源：优先使用显式传入的 caller 标识；
+        否则按 LLM_CALLER_SAMPLE_RATE 抽样沿栈帧向上找到第一个不在本模块的调用方
+        （只读取帧对象，不像 traceback.extract_stack 那样格式化整个调用栈和源码行）
+        """
+        if caller:
+            return {"caller": caller}
+        if random.random() >= settings.LLM_CALLER_SAMPLE_RATE:
+            return {"caller": "unknown"}
+        
+        frame = sys._getframe(1)
+        while frame is not None and frame.f_code.co_filename == __file__:
+            frame = frame.f_back
+        if frame is None:
+            return {"caller": "unknown"}
+        code = frame.f_code
+        caller_file = code.co_filename.split('/')[-1]  # 只保留文件名
+        return {
+            "caller": f"{caller_file}:{frame.f_lineno} in {code.co_name}",
+            "caller_file": caller_file,
+            "caller_line": frame.f_lineno,
+            "caller_function": code.co_name,
+        }
+    
+    @staticmethod
+    def _log_event(level: int, event: str, call_id: str, caller_info: Dict[str, Any], **fields):
+        """
+        输出一条结构化日志：消息为 `event call_id=... caller=... key=value ...`，
+        同时通过 extra 附带字段，方便 JSON 格式的日志处理器直接使用
+        """
+        if not logger.isEnabledFor(level):
+            return
+        fields = {"call_id": call_id, "caller": caller_info.get("caller", "unknown"), **fields}
+        message = event + " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        logger.log(level, message, extra={"llm_event": event, "llm_fields": fields})
+    
+    async def _complete(
+        self,
+        cache_key: str,
+        compressed_prompt: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        use_cache: bool,
+        call_id: str,
+        caller_info: Optional[Dict[str, Any]] = None,
+        semantic_key: Optional[Dict[str, str]] = None,
+        priority: int = PRIORITY_INTERACTIVE
+    ) -> Tuple[str, Any]:
+        """
+        查缓存并在未命中时调用API（每个缓存键同一时刻只会执行一次）
+        
+        Returns:
+            (生成的文本, token用量)；命中缓存时用量为 None
+        """
+        caller_info = caller_info or {"caller": "unknown"}
+        
+        # 检查缓存（进程内 + MongoDB）
+        if use_cache:
+            cached_response = await self._get_from_cache(cache_key)
+            if cached_response:
+                self.stats["cache_hits"] += 1
+                self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model,
+                                outcome="cache_hit", response_chars=len(cached_response))
+                return cached_response, None
+        
+        semantic = await self._semantic_lookup(call_id, cache_key, semantic_key, model, temperature) if use_cache else None
+        if semantic and "response" in semantic:
+            self._log_event(logging.INFO, "llm_call", call_id, caller_info, model=model,
+                            outcome="semantic_hit", similarity=round(semantic["similarity"], 4))
+            return semantic["response"], None
+        
+        # 4️⃣ 调度限流 + 5️⃣ 调用API
+        try:
+            estimated_tokens = estimate_tokens(compressed_prompt) + max_tokens
+            queued_at = time.perf_counter()
+            async with self.scheduler.slot(model, estimated_tokens, priority) as slot:
+                api_start = time.perf_counter()
+                self.stats["upstream_calls"] += 1
+                
+                response = await self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": compressed_prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                )
+                if response.usage is not None:
+                    slot["actual_tokens"] = response.usage.total_tokens
             
-            # 打印详细的API使用统计
+            result = response.choices[0].message.content
             usage = response.usage
-            print(f"[LLM #{call_id}] ✅ API调用成功！")
-            print(f"[LLM #{call_id}] ⏱️  耗时: {api_duration:.2f}秒")
-            print(f"[LLM #{call_id}] 📊 Token统计:")
-            print(f"[LLM #{call_id}]    - 输入: {usage.prompt_tokens:,} tokens")
-            print(f"[LLM #{call_id}]    - 输出: {usage.completion_tokens:,} tokens")
-            print(f"[LLM #{call_id}]    - 总计: {usage.total_tokens:,} tokens")
-            print(f"[LLM #{call_id}] 💵 估算成本 (DeepSeek):")
-            input_cost = usage.prompt_tokens * 0.27 / 1_000_000
-            output_cost = usage.completion_tokens * 1.1 / 1_000_000
-            print(f"[LLM #{call_id}]    - 输入: ${input_cost:.6f}")
-            print(f"[LLM #{call_id}]    - 输出: ${output_cost:.6f}")
-            print(f"[LLM #{call_id}]    - 本次总计: ${input_cost + output_cost:.6f}")
-            print(f"[LLM #{call_id}] 📝 返回内容长度: {len(result)} 字符\n")
+            self._log_upstream(
+                call_id, caller_info, model, usage, result,
+                queue_seconds=api_start - queued_at,
+                api_seconds=time.perf_counter() - api_start
+            )
             
-            # 6️⃣ 写入缓存（TTL=24小时）
+            # 6️⃣ 写入缓存（TTL=LLM_CACHE_TTL_SECONDS，默认24小时）
             if use_cache:
                 await self._save_to_cache(cache_key, result)
-                print(f"[LLM #{call_id}] 💾 已保存到缓存")
             
-            # 7️⃣ 记录统计
-            await self._log_usage(model, response.usage, compressed_prompt, result, call_id)
+            if semantic is not None:
+                await self._semantic_store(semantic_key, semantic, model, temperature, result)
             
-            return result
+            # 7️⃣ 记录统计（缓冲批量写入，不等待）
+            if usage is not None:
+                self._log_usage(model, usage, compressed_prompt, result, call_id, caller_info)
+            
+            return result, usage
             
         except Exception as e:
-            print(f"[LLM #{call_id}] ❌ API调用失败: {e}")
+            self.stats["upstream_errors"] += 1
+            self._log_event(logging.ERROR, "llm_call_failed", call_id, caller_info, model=model, error=e)
             raise
     
-    def _compress_prompt(self, prompt: str) -> str:
-        """Prompt压缩优化"""
-        # 1. 去除多余空白
-        compressed = ' '.join(prompt.split())
+    def _get_semantic_cache(self) -> SemanticCache:
+        """语义缓存懒加载（embedding 模型只在第一次使用语义缓存时加载）"""
+        if self._semantic_cache is None:
+            self._semantic_cache = SemanticCache()
+        return self._semantic_cache
+    
+    async def _semantic_lookup(
+        self,
+        call_id: str,
+        cache_key: str,
+        semantic_key: Optional[Dict[str, str]],
+        model: str,
+        temperature: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        精确缓存未命中后查询语义缓存
         
-        # 2. 移除HTML标签（如果存在）
-        compressed = re.sub(r'<[^>]+>', '', compressed)
+        Returns:
+            None 表示未启用；命中时包含 response（同时回填到精确缓存）；未命中时只包含 embedding
+        """
+        if not semantic_key or not settings.SEMANTIC_CACHE_ENABLED:
+            return None
+        text, namespace = semantic_key.get("text"), semantic_key.get("namespace")
+        if not text or not namespace:
+            return None
         
-        # 3. 截断过长内容（保留重要部分）
-        if len(compressed) > 8000:
-            # 保留开头2000字符 + 结尾2000字符
-            compressed = compressed[:2000] + "\n...(中间省略)...\n" + compressed[-2000:]
+        semantic = await self._get_semantic_cache().lookup(text, namespace, model, temperature)
+        if semantic and "response" in semantic:
+            self.stats["semantic_hits"] += 1
+            # 回填精确缓存，相同请求下次直接命中
+            await self._save_to_cache(cache_key, semantic["response"])
+        return semantic
+    
+    async def _semantic_store(
+        self,
+        semantic_key: Dict[str, str],
+        semantic: Dict[str, Any],
+        model: str,
+        temperature: float,
+        result: str
+    ):
+        """API调用成功后写入语义缓存（复用查找时计算的 embedding）"""
+        await self._get_semantic_cache().store(
+            semantic_key["text"], semantic_key["namespace"], model, temperature,
+            result, embedding=semantic.get("embedding")
+        )
+    
+    def _log_upstream(
+        self,
+        call_id: str,
+        caller_info: Dict[str, Any],
+        model: str,
+        usage: Any,
+        result: str,
+        queue_seconds: float,
+        api_seconds: float,
+        first_chunk_seconds: Optional[float] = None
+    ):
+        """记录一次API调用的耗时、token用量和估算成本（每次调用一行INFO日志）"""
+        fields: Dict[str, Any] = {
+            "model": model,
+            "outcome": "upstream",
+            "queue_s": round(queue_seconds, 3),
+            "api_s": round(api_seconds, 3),
+        }
+        if first_chunk_seconds is not None:
+            fields["stream"] = True
+            fields["first_chunk_s"] = round(first_chunk_seconds, 3)
+        if usage is not None:
+            fields.update(
+                prompt_tokens=usage.prompt_tokens,
+                completion_tokens=usage.completion_tokens,
+                cost_usd=round(self._estimate_cost(usage), 6),
+            )
+        fields["response_chars"] = len(result)
+        self._log_event(logging.INFO, "llm_call", call_id, caller_info, **fields)
+    
+    @staticmethod
+    def _estimate_cost(usage: Any) -> float:
+        """按 DeepSeek 定价估算一次调用的成本（美元）"""
+        return (
+            usage.prompt_tokens * INPUT_PRICE_PER_M +
+            usage.completion_tokens * OUTPUT_PRICE_PER_M
+        ) / 1_000_000
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取网关调用统计（进程内，重启后清零）
         
-        return compressed
+        Returns:
+            {requests, cache_hits, coalesced_hits, semantic_hits, upstream_calls, upstream_errors,
+             coalesced_tokens_saved, coalesced_cost_saved, prompt_tokens_saved, prompts_trimmed, inflight, scheduler: {model: {...}},
+             usage_log_writer: {...},
+             cache: {memory: {...}, mongo: {...}, semantic: {...} 或 None}}
+        """
+        mongo_lookups = self.mongo_cache_stats["hits"] + self.mongo_cache_stats["misses"]
+        return {
+            **self.stats,
+            "coalesced_cost_saved": round(self.stats["coalesced_cost_saved"], 6),
+            "inflight": len(self._inflight),
+            "scheduler": self.scheduler.get_stats(),
+            "usage_log_writer": self.usage_writer.get_stats(),
+            "cache": {
+                "memory": self.memory_cache.get_stats(),
+                "semantic": self._semantic_cache.get_stats() if self._semantic_cache else None,
+                "mongo": {
+                    **self.mongo_cache_stats,
+                    "hit_rate": round(self.mongo_cache_stats["hits"] / mongo_lookups, 4) if mongo_lookups else 0.0,
+                },
+            },
+        }
     
     def _generate_cache_key(self, prompt: str, model: str, temperature: float) -> str:
         """生成缓存键（基于内容哈希）"""
@@ -173,44 +544,68 @@ class LLMGateway:
         return f"llm_cache:{hashlib.sha256(content.encode()).hexdigest()}"
     
     async def _get_from_cache(self, cache_key: str) -> Optional[str]:
-        """从MongoDB缓存读取"""
-        cache_doc = self.db.llm_cache.find_one({"key": cache_key})
-        if cache_doc:
-            # 检查是否过期（24小时）
-            if datetime.now() - cache_doc['created_at'] < timedelta(hours=24):
-                return cache_doc['response']
-        return None
+        """
+        两级缓存读取：先查进程内 LRU，未命中再查 MongoDB（在数据库线程池中执行）
+        
+        MongoDB 命中后回填到进程内缓存，过期时间取文档剩余的有效期。
+        """
+        cached = self.memory_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        cache_doc = await run_in_db_executor(
+            self.db.llm_cache.find_one, {"key": cache_key}, {"response": 1, "created_at": 1}
+        )
+        if not cache_doc:
+            self.mongo_cache_stats["misses"] += 1
+            return None
+        
+        # TTL 索引由后台线程约每分钟清理一次，这里仍需检查是否已过期
+        created_at = cache_doc['created_at'].replace(tzinfo=timezone.utc)
+        remaining = settings.LLM_CACHE_TTL_SECONDS - (datetime.now(timezone.utc) - created_at).total_seconds()
+        if remaining <= 0:
+            self.mongo_cache_stats["expired"] += 1
+            self.mongo_cache_stats["misses"] += 1
+            return None
+        
+        self.mongo_cache_stats["hits"] += 1
+        self.memory_cache.set(cache_key, cache_doc['response'], ttl_seconds=remaining)
+        return cache_doc['response']
     
     async def _save_to_cache(self, cache_key: str, response: str):
-        """保存到MongoDB缓存"""
-        self.db.llm_cache.update_one(
+        """同时写入进程内缓存和MongoDB缓存（MongoDB 写入在数据库线程池中执行）"""
+        self.memory_cache.set(cache_key, response)
+        await run_in_db_executor(
+            self.db.llm_cache.update_one,
             {"key": cache_key},
             {
                 "$set": {
                     "response": response,
-                    "created_at": datetime.now()
+                    # 使用UTC时间，与 created_at 上的 TTL 索引保持一致
+                    "created_at": datetime.now(timezone.utc)
                 }
             },
             upsert=True
         )
+        self.mongo_cache_stats["writes"] += 1
     
-    async def _log_usage(self, model: str, usage: Any, prompt: str, response: str, call_id: str = "unknown"):
-        """记录使用统计（增强版 - 包含调用追踪）"""
-        
-        # 获取调用栈信息
-        stack = traceback.extract_stack()
-        caller_file = "unknown"
-        caller_line = 0
-        caller_function = "unknown"
-        
-        for frame in reversed(stack[:-2]):  # 跳过当前和chat函数
-            if 'llm_gateway' not in frame.filename:
-                caller_file = frame.filename.split('/')[-1]  # 只保留文件名
-                caller_line = frame.lineno
-                caller_function = frame.name
-                break
-        
-        log_data = {
+    def _log_usage(
+        self,
+        model: str,
+        usage: Any,
+        prompt: str,
+        response: str,
+        call_id: str = "unknown",
+        caller_info: Optional[Dict[str, Any]] = None
+    ):
+        """
+        记录使用统计（包含调用来源）
+
+        调用来源由 chat() 在调用方协程中确定后传入；记录进入缓冲区后立即返回，
+        由 UsageLogWriter 按数量或时间间隔批量写入，写入失败不影响本次调用结果。
+        """
+        caller_info = caller_info or {"caller": "unknown"}
+        self.usage_writer.add({
             "call_id": call_id,
             "model": model,
             "prompt_tokens": usage.prompt_tokens,
@@ -219,42 +614,15 @@ class LLMGateway:
             "prompt_length": len(prompt),
             "response_length": len(response),
             "timestamp": datetime.now(),
-            "caller_file": caller_file,
-            "caller_line": caller_line,
-            "caller_function": caller_function
-        }
-        
-        self.db.llm_usage_logs.insert_one(log_data)
-        # 已在上面打印详细信息，这里不重复打印
-
-
-class TokenBucketRateLimiter:
-    """令牌桶限流器"""
-    
-    def __init__(self, capacity: int, refill_rate: float):
-        self.capacity = capacity
-        self.refill_rate = refill_rate
-        self.tokens = capacity
-        self.last_refill = datetime.now()
-        self._lock = asyncio.Lock()
+            "caller": caller_info.get("caller", "unknown"),
+            "caller_file": caller_info.get("caller_file", "unknown"),
+            "caller_line": caller_info.get("caller_line", 0),
+            "caller_function": caller_info.get("caller_function", "unknown")
+        })
     
-    async def acquire(self, tokens: int = 1):
-        """获取令牌（阻塞直到有可用令牌）"""
-        async with self._lock:
-            while True:
-                self._refill()
-                if self.tokens >= tokens:
-                    self.tokens -= tokens
-                    return
-                await asyncio.sleep(0.1)
-    
-    def _refill(self):
-        """补充令牌"""
-        now = datetime.now()
-        elapsed = (now - self.last_refill).total_seconds()
-        new_tokens = elapsed * self.refill_rate
-        self.tokens = min(self.capacity, self.tokens + new_tokens)
-        self.last_refill = now
+    async def close(self):
+        """服务关闭时调用：写入缓冲中剩余的使用统计"""
+        await self.usage_writer.close()
 
 
 # 全局LLM Gateway实例（懒加载）
@@ -266,3 +634,9 @@ def get_llm_gateway() -> LLMGateway:
     if _llm_gateway is None:
         _llm_gateway = LLMGateway()
     return _llm_gateway
+
+
+async def shutdown_llm_gateway():
+    """关闭LLM Gateway（已创建时写入剩余的使用统计）"""
+    if _llm_gateway is not None:
+        await _llm_gateway.close()
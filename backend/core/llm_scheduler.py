@@ -0,0 +1,265 @@
+"""
+LLM 调用调度器 - 按模型限流 + 并发上限 + 优先级队列
+
+替代原来的 TokenBucketRateLimiter（持锁轮询、只按请求数限流）：
+- 请求数令牌桶：限制每秒请求数
+- token 令牌桶：按预估的 prompt + completion token 数限制每分钟 token 用量，
+  调用结束后用实际用量校正
+- 并发上限：每个模型同时进行的请求数
+- 优先级：交互请求（如 /api/style/generate）总是排在批量任务（人设分析、成长路径）前面
+
+等待时间根据令牌桶的补充速率精确计算，由事件循环定时唤醒，不轮询。
+"""
+
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from core.config import settings
+
+
+# 优先级：数值越小越优先
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+_CJK_PATTERN = re.compile(r'[一-鿿　-〿＀-￯]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数（DeepSeek：1个中文字符约0.6 token，1个英文字符约0.3 token）
+
+    Args:
+        text: 文本
+
+    Returns:
+        估算的 token 数
+    """
+    cjk = len(_CJK_PATTERN.findall(text))
+    return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+
+
+class _Bucket:
+    """令牌桶（只在事件循环线程中使用，无需加锁）"""
+
+    def __init__(self, capacity: float, per_second: float):
+        self.capacity = capacity
+        self.per_second = per_second
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.per_second)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """距离桶内令牌足够 amount 还需等待的秒数"""
+        amount = min(amount, self.capacity)  # 超过桶容量的请求按满桶处理，避免永远等待
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.per_second
+
+    def consume(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """按实际用量校正（delta > 0 表示多用了），最多欠一个满桶"""
+        self.level = max(-self.capacity, min(self.capacity, self.level - delta))
+
+
+class _ModelLane:
+    """单个模型的调度状态"""
+
+    def __init__(self, max_in_flight: int, requests_per_second: float, tokens_per_minute: float):
+        if requests_per_second <= 0 or tokens_per_minute <= 0:
+            # 速率为0时令牌永远补充不满，等待时间的计算也会除零
+            raise ValueError(
+                f"requests_per_second and tokens_per_minute must be > 0, "
+                f"got {requests_per_second} and {tokens_per_minute}"
+            )
+        self.max_in_flight = max(1, int(max_in_flight))
+        self.requests = _Bucket(capacity=max(1.0, requests_per_second), per_second=requests_per_second)
+        self.tokens = _Bucket(capacity=tokens_per_minute, per_second=tokens_per_minute / 60.0)
+        self.in_flight = 0
+        self.waiters: List[tuple] = []  # 堆：(priority, seq, future, tokens)
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.timer_at = 0.0
+        self.stats: Dict[str, Any] = {
+            "granted": 0,
+            "granted_by_priority": {},
+            "total_wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+            "estimated_tokens": 0,
+            "actual_tokens": 0,
+        }
+
+
+class LLMScheduler:
+    """按模型调度 LLM 调用"""
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,
+        requests_per_second: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        model_limits: Optional[Dict[str, Dict[str, float]]] = None
+    ):
+        """
+        Args:
+            max_in_flight: 每个模型的最大并发数，默认 LLM_MAX_IN_FLIGHT
+            requests_per_second: 每个模型每秒请求数，默认 LLM_REQUESTS_PER_SECOND
+            tokens_per_minute: 每个模型每分钟 token 预算，默认 LLM_TOKENS_PER_MINUTE
+            model_limits: 按模型覆盖以上参数，默认 LLM_MODEL_LIMITS
+        """
+        self.defaults = {
+            "max_in_flight": settings.LLM_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight,
+            "requests_per_second": settings.LLM_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second,
+            "tokens_per_minute": settings.LLM_TOKENS_PER_MINUTE if tokens_per_minute is None else tokens_per_minute,
+        }
+        self.model_limits = settings.LLM_MODEL_LIMITS if model_limits is None else model_limits
+        self._lanes: Dict[str, _ModelLane] = {}
+        self._seq = itertools.count()
+
+    def _lane(self, model: str) -> _ModelLane:
+        lane = self._lanes.get(model)
+        if lane is None:
+            limits = {**self.defaults, **self.model_limits.get(model, {})}
+            lane = _ModelLane(**limits)
+            self._lanes[model] = lane
+        return lane
+
+    def _dispatch(self, model: str):
+        """按优先级放行队首请求，资源不足时定时到令牌足够的时刻再检查"""
+        lane = self._lanes[model]
+        lane.timer = None
+        while lane.waiters:
+            _, _, future, tokens = lane.waiters[0]
+            if future.done():  # 等待方已取消
+                heapq.heappop(lane.waiters)
+                continue
+            if lane.in_flight >= lane.max_in_flight:
+                return  # 有请求结束时 release 会再次调度
+
+            now = time.monotonic()
+            lane.requests.refill(now)
+            lane.tokens.refill(now)
+            wait = max(lane.requests.wait_time(1), lane.tokens.wait_time(tokens))
+            if wait > 0:
+                # 队首优先：即使后面的小请求令牌足够也不插队，保证高优先级请求不被饿死
+                self._schedule(model, lane, now + wait)
+                return
+
+            heapq.heappop(lane.waiters)
+            lane.requests.consume(1)
+            lane.tokens.consume(tokens)
+            lane.in_flight += 1
+            future.set_result(None)
+
+    def _schedule(self, model: str, lane: _ModelLane, at: float):
+        if lane.timer is not None:
+            if lane.timer_at <= at:
+                return
+            lane.timer.cancel()
+        loop = asyncio.get_running_loop()
+        lane.timer = loop.call_later(max(0.0, at - time.monotonic()), self._dispatch, model)
+        lane.timer_at = at
+
+    async def acquire(self, model: str, estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE):
+        """
+        等待调度放行（放行后必须调用 release）
+
+        Args:
+            model: 模型名称
+            estimated_tokens: 预估的 prompt + completion token 数
+            priority: 优先级，PRIORITY_INTERACTIVE / PRIORITY_BATCH
+        """
+        lane = self._lane(model)
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(lane.waiters, (priority, next(self._seq), future, estimated_tokens))
+        start = time.monotonic()
+        self._dispatch(model)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # 已经放行但调用方被取消：归还并发名额
+                self.release(model)
+            else:
+                future.cancel()
+                self._dispatch(model)
+            raise
+
+        waited = time.monotonic() - start
+        stats = lane.stats
+        stats["granted"] += 1
+        stats["granted_by_priority"][priority] = stats["granted_by_priority"].get(priority, 0) + 1
+        stats["total_wait_seconds"] += waited
+        stats["max_wait_seconds"] = max(stats["max_wait_seconds"], waited)
+        stats["estimated_tokens"] += estimated_tokens
+
+    def release(self, model: str, estimated_tokens: int = 0, actual_tokens: Optional[int] = None):
+        """
+        释放并发名额，并用实际 token 用量校正预算
+
+        Args:
+            model: 模型名称
+            estimated_tokens: acquire 时的预估 token 数
+            actual_tokens: 实际 token 用量（未知则不校正）
+        """
+        lane = self._lanes[model]
+        lane.in_flight = max(0, lane.in_flight - 1)
+        if actual_tokens is not None:
+            lane.tokens.adjust(actual_tokens - estimated_tokens)
+            lane.stats["actual_tokens"] += actual_tokens
+        self._dispatch(model)
+
+    @asynccontextmanager
+    async def slot(self, model: str, estimated_tokens: int, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[Dict[str, Any]]:
+        """
+        获取一个调用名额的上下文管理器
+
+        用法：
+            async with scheduler.slot(model, estimated, priority) as slot:
+                response = await client.chat.completions.create(...)
+                slot["actual_tokens"] = response.usage.total_tokens
+        """
+        await self.acquire(model, estimated_tokens, priority)
+        slot: Dict[str, Any] = {"actual_tokens": None}
+        try:
+            yield slot
+        finally:
+            self.release(model, estimated_tokens, slot["actual_tokens"])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取各模型的调度统计
+
+        Returns:
+            {model: {in_flight, max_in_flight, waiting, granted, avg_wait_seconds, ...}}
+        """
+        result = {}
+        now = time.monotonic()
+        for model, lane in self._lanes.items():
+            lane.tokens.refill(now)
+            stats = lane.stats
+            waiting: Dict[int, int] = {}
+            for priority, _, future, _ in lane.waiters:
+                if not future.done():
+                    waiting[priority] = waiting.get(priority, 0) + 1
+            result[model] = {
+                "in_flight": lane.in_flight,
+                "max_in_flight": lane.max_in_flight,
+                "waiting": waiting,
+                "token_budget_remaining": int(lane.tokens.level),
+                "granted": stats["granted"],
+                "granted_by_priority": dict(stats["granted_by_priority"]),
+                "avg_wait_seconds": round(stats["total_wait_seconds"] / stats["granted"], 3) if stats["granted"] else 0.0,
+                "max_wait_seconds": round(stats["max_wait_seconds"], 3),
+                "estimated_tokens": stats["estimated_tokens"],
+                "actual_tokens": stats["actual_tokens"],
+            }
+        return result
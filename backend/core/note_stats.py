@@ -0,0 +1,98 @@
+"""
+笔记互动统计
+统一的笔记互动聚合逻辑，供 creator_stats 物化视图、统计脚本和网络构建共用
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+
+def note_engagement(note: Dict[str, Any]) -> int:
+    """单条笔记的总互动数（点赞 + 收藏 + 评论 + 分享）"""
+    return (
+        (note.get('likes', 0) or 0) +
+        (note.get('collected_count', 0) or 0) +
+        (note.get('comments_count', 0) or 0) +
+        (note.get('share_count', 0) or 0)
+    )
+
+
+def weighted_engagement(note: Dict[str, Any]) -> int:
+    """单条笔记的加权互动分（收藏×2、评论×3、分享×4，用于笔记排序和爆款判断）"""
+    return (
+        (note.get('likes', 0) or 0) +
+        (note.get('collected_count', 0) or 0) * 2 +
+        (note.get('comments_count', 0) or 0) * 3 +
+        (note.get('share_count', 0) or 0) * 4
+    )
+
+
+def calculate_note_stats(notes: List[Dict[str, Any]], days: Optional[int] = 30) -> Dict[str, Any]:
+    """
+    计算最近N天的笔记互动数据
+
+    Args:
+        notes: 笔记列表
+        days: 统计最近多少天，默认30天；None 表示全部笔记
+
+    Returns:
+        互动统计数据 {total_engagement, total_likes, total_collects, total_comments,
+                      total_shares, note_count, index_series}
+    """
+    if days is not None:
+        cutoff_timestamp = int((datetime.now() - timedelta(days=days)).timestamp())
+        notes = [n for n in notes if (n.get('create_time', 0) or 0) >= cutoff_timestamp]
+
+    total_likes = sum(n.get('likes', 0) or 0 for n in notes)
+    total_collects = sum(n.get('collected_count', 0) or 0 for n in notes)
+    total_comments = sum(n.get('comments_count', 0) or 0 for n in notes)
+    total_shares = sum(n.get('share_count', 0) or 0 for n in notes)
+
+    # 生成index时间序列
+    index_series = []
+    for note in sorted(notes, key=lambda x: x.get('create_time', 0) or 0):
+        create_time = note.get('create_time', 0) or 0
+        if create_time > 0:
+            index_series.append({
+                'ts': create_time * 1000,  # 转为毫秒
+                # 转换为互动指数（简化：直接用互动数/1000）
+                'value': round(note_engagement(note) / 1000.0, 2),
+                # 采集到的笔记字段是 id，旧数据可能是 note_id
+                'note_id': note.get('id') or note.get('note_id', ''),
+                'title': (note.get('title') or note.get('display_title') or '')[:30]  # 成长路径功能需要
+            })
+
+    return {
+        'total_engagement': total_likes + total_collects + total_comments + total_shares,
+        'total_likes': total_likes,
+        'total_collects': total_collects,
+        'total_comments': total_comments,
+        'total_shares': total_shares,
+        'note_count': len(notes),
+        'index_series': index_series
+    }
+
+
+def build_creator_stats(notes: List[Dict[str, Any]], days: int = 30) -> Dict[str, Any]:
+    """
+    生成 creator_stats 文档的统计字段
+
+    Args:
+        notes: 创作者的全部笔记
+        days: 近期统计窗口（天）
+
+    Returns:
+        {note_count, total_engagement, total_likes, ..., recent: {...}, index_series, last_note_time}
+        其中顶层是全部笔记的合计，recent 是最近 days 天的合计，index_series 只包含最近 days 天
+    """
+    all_stats = calculate_note_stats(notes, days=None)
+    recent_stats = calculate_note_stats(notes, days=days)
+    index_series = recent_stats.pop('index_series')
+    all_stats.pop('index_series')
+
+    return {
+        **all_stats,
+        'recent': {'days': days, **recent_stats},
+        'index_series': index_series,
+        'last_note_time': max((n.get('create_time', 0) or 0 for n in notes), default=0),
+    }
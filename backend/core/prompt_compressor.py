@@ -0,0 +1,143 @@
+"""
+Prompt 压缩 - 按 token 预算裁剪
+
+替代原来按字符截断的做法（超过8000字符只保留首尾各2000字符，会切掉模板中间的任务说明，
+并把模板依赖的换行全部压成空格）：
+- 只规整空白：合并行内连续空格、去掉行尾空格和多余空行，保留换行结构
+- 只在包含 "<" 时才清理HTML标签
+- 预算 = min(LLM_PROMPT_MAX_TOKENS, 模型上下文 - max_tokens - 预留)
+- 超出预算时先丢弃价值最低的样本笔记（【笔记N】块，约定按价值从高到低排列，从最后一条开始丢），
+  仍然超出才退回首尾保留的截断
+
+token 数用 estimate_tokens 估算（与调度器的 token 预算口径一致）。
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import settings
+from core.llm_scheduler import estimate_tokens
+
+
+# 模型上下文长度未配置时使用的默认值
+DEFAULT_CONTEXT_TOKENS = 32768
+
+_HTML_TAG_PATTERN = re.compile(r'</?[A-Za-z][^<>]*>')
+_INLINE_SPACE_PATTERN = re.compile(r'[ \t　\xa0]+')
+_TRAILING_SPACE_PATTERN = re.compile(r' *\n *')
+_BLANK_LINES_PATTERN = re.compile(r'\n{3,}')
+# 样本笔记块：从【笔记N】开始，到下一个【...】段落标题或文本结尾为止
+_SAMPLE_NOTE_PATTERN = re.compile(r'【笔记\d+】.*?(?=\n\s*【|\Z)', re.S)
+
+_TRUNCATION_MARKER = "\n...(中间省略)...\n"
+
+
+def normalize_whitespace(text: str) -> str:
+    """合并行内空白、去掉行尾空格，最多保留一个空行"""
+    text = _INLINE_SPACE_PATTERN.sub(' ', text)
+    text = _TRAILING_SPACE_PATTERN.sub('\n', text)
+    text = _BLANK_LINES_PATTERN.sub('\n\n', text)
+    return text.strip()
+
+
+class PromptCompressor:
+    """按 token 预算压缩 prompt"""
+
+    def __init__(
+        self,
+        max_prompt_tokens: Optional[int] = None,
+        reserve_tokens: Optional[int] = None,
+        context_tokens: Optional[Dict[str, int]] = None
+    ):
+        """
+        Args:
+            max_prompt_tokens: prompt 的 token 上限（控制成本），默认 LLM_PROMPT_MAX_TOKENS
+            reserve_tokens: 在上下文中为消息格式等额外开销预留的 token 数，默认 LLM_PROMPT_RESERVE_TOKENS
+            context_tokens: 各模型的上下文长度，默认 LLM_MODEL_CONTEXT_TOKENS
+        """
+        self.max_prompt_tokens = settings.LLM_PROMPT_MAX_TOKENS if max_prompt_tokens is None else max_prompt_tokens
+        self.reserve_tokens = settings.LLM_PROMPT_RESERVE_TOKENS if reserve_tokens is None else reserve_tokens
+        self.context_tokens = settings.LLM_MODEL_CONTEXT_TOKENS if context_tokens is None else context_tokens
+
+    def budget(self, model: str, max_tokens: int) -> int:
+        """
+        计算 prompt 的 token 预算
+
+        Args:
+            model: 模型名称
+            max_tokens: 本次调用的最大输出 token 数
+
+        Returns:
+            prompt 最多可用的 token 数
+        """
+        context = self.context_tokens.get(model, DEFAULT_CONTEXT_TOKENS)
+        return max(1, min(self.max_prompt_tokens, context - max_tokens - self.reserve_tokens))
+
+    def compress(self, prompt: str, model: str, max_tokens: int) -> Tuple[str, Dict[str, Any]]:
+        """
+        压缩 prompt
+
+        Args:
+            prompt: 原始 prompt
+            model: 模型名称
+            max_tokens: 本次调用的最大输出 token 数
+
+        Returns:
+            (压缩后的 prompt, {original_tokens, compressed_tokens, tokens_saved,
+                               budget, dropped_notes, truncated})
+        """
+        original_tokens = estimate_tokens(prompt)
+        budget = self.budget(model, max_tokens)
+
+        text = _HTML_TAG_PATTERN.sub('', prompt) if '<' in prompt else prompt
+        text = normalize_whitespace(text)
+        tokens = estimate_tokens(text)
+
+        dropped_notes = 0
+        if tokens > budget:
+            text, dropped_notes = self._drop_sample_notes(text, budget)
+            tokens = estimate_tokens(text)
+
+        truncated = False
+        if tokens > budget:
+            text = self._truncate_middle(text, budget)
+            tokens = estimate_tokens(text)
+            truncated = True
+
+        return text, {
+            "original_tokens": original_tokens,
+            "compressed_tokens": tokens,
+            "tokens_saved": max(0, original_tokens - tokens),
+            "budget": budget,
+            "dropped_notes": dropped_notes,
+            "truncated": truncated,
+        }
+
+    @staticmethod
+    def _drop_sample_notes(text: str, budget: int) -> Tuple[str, int]:
+        """从最后一条（价值最低）开始丢弃样本笔记，直到满足预算"""
+        spans: List[Tuple[int, int]] = [m.span() for m in _SAMPLE_NOTE_PATTERN.finditer(text)]
+        if not spans:
+            return text, 0
+
+        # 每块的 token 数单独估算，避免每丢一条都重新估算整个 prompt
+        excess = estimate_tokens(text) - budget
+        dropped = 0
+        while spans and excess > 0:
+            start, end = spans.pop()
+            excess -= estimate_tokens(text[start:end])
+            text = text[:start] + text[end:]
+            dropped += 1
+        return normalize_whitespace(text), dropped
+
+    @staticmethod
+    def _truncate_middle(text: str, budget: int) -> str:
+        """保留开头（角色与档案）和结尾（任务与输出格式），省略中间部分"""
+        tokens = estimate_tokens(text)
+        chars_per_token = len(text) / tokens
+        keep_chars = int((budget - estimate_tokens(_TRUNCATION_MARKER)) * chars_per_token)
+        if keep_chars <= 0:
+            return text[:max(1, int(budget * chars_per_token))]
+        head = keep_chars // 2
+        tail = keep_chars - head
+        return text[:head] + _TRUNCATION_MARKER + text[-tail:]
@@ -0,0 +1,191 @@
+"""
+LLM 语义缓存
+精确哈希缓存只要主题差一个字符（"咖啡探店" vs "咖啡 探店 "）就会未命中。
+语义缓存对用户主题做 embedding，在同一命名空间（创作者 + 模板）、同一模型和温度下
+查找相似度超过阈值的历史结果，命中则直接复用，省去一次 DeepSeek 调用。
+
+存储在 MongoDB llm_semantic_cache 集合：
+    {scope, namespace, text, embedding(Binary), response, created_at}
+"""
+
+import asyncio
+import logging
+import threading
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from core.config import settings
+from core.embedding_model import encode_texts
+from database.connection import get_database, run_in_db_executor
+from database.vector_codec import encode_vector, decode_vector
+
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticCache:
+    """基于 embedding 相似度的 LLM 响应缓存"""
+
+    def __init__(
+        self,
+        threshold: Optional[float] = None,
+        ttl_seconds: Optional[int] = None,
+        max_candidates: Optional[int] = None
+    ):
+        """
+        Args:
+            threshold: 命中所需的最低余弦相似度，默认 SEMANTIC_CACHE_THRESHOLD
+            ttl_seconds: 缓存有效期（秒），默认 LLM_CACHE_TTL_SECONDS
+            max_candidates: 每次查找比较的最多历史条目数（按时间倒序），默认 SEMANTIC_CACHE_MAX_CANDIDATES
+        """
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        self.ttl_seconds = settings.LLM_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_candidates = settings.SEMANTIC_CACHE_MAX_CANDIDATES if max_candidates is None else max_candidates
+        self.collection = get_database().llm_semantic_cache
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, Any] = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "errors": 0,
+            "hit_similarity_sum": 0.0,
+        }
+
+    @staticmethod
+    def make_scope(model: str, temperature: float) -> str:
+        """缓存作用域：不同模型和温度的结果不能互相复用"""
+        return f"{model}:{temperature}"
+
+    @staticmethod
+    def _normalize_text(text: str) -> str:
+        """去除多余空白，减少无意义的差异"""
+        return ' '.join(text.split())
+
+    def _count(self, key: str, value: float = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def _lookup_sync(self, scope: str, namespace: str, query_vec: np.ndarray) -> Optional[Dict[str, Any]]:
+        """在数据库线程中执行：读取候选并计算相似度"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+        candidates = list(
+            self.collection.find(
+                {"scope": scope, "namespace": namespace, "created_at": {"$gte": cutoff}},
+                {"embedding": 1, "response": 1, "text": 1}
+            ).sort("created_at", -1).limit(self.max_candidates)
+        )
+        if not candidates:
+            return None
+
+        matrix = np.vstack([decode_vector(doc["embedding"]) for doc in candidates])
+        scores = matrix @ query_vec
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return {
+            "response": candidates[best]["response"],
+            "text": candidates[best].get("text", ""),
+            "similarity": float(scores[best]),
+        }
+
+    async def lookup(
+        self,
+        text: str,
+        namespace: str,
+        model: str,
+        temperature: float
+    ) -> Optional[Dict[str, Any]]:
+        """
+        查找语义相近的历史结果
+
+        Args:
+            text: 用户主题（被 embedding 的文本）
+            namespace: 命名空间（如 创作者 + 平台 + 模板），只在同一命名空间内匹配
+            model: 模型名称
+            temperature: 温度参数
+
+        Returns:
+            命中时返回 {response, text, similarity, embedding}，未命中返回 {embedding}
+            （embedding 供随后的 store 复用，避免重复编码）；出错返回 None
+        """
+        self._count("lookups")
+        try:
+            loop = asyncio.get_running_loop()
+            # 模型推理是CPU密集操作，放到默认线程池执行
+            query_vec = (await loop.run_in_executor(
+                None, encode_texts, [self._normalize_text(text)]
+            ))[0]
+            hit = await run_in_db_executor(
+                self._lookup_sync, self.make_scope(model, temperature), namespace, query_vec
+            )
+        except Exception as e:
+            self._count("errors")
+            logger.warning("semantic_cache_lookup_failed namespace=%s error=%s", namespace, e)
+            return None
+
+        if hit is None:
+            self._count("misses")
+            return {"embedding": query_vec}
+        self._count("hits")
+        self._count("hit_similarity_sum", hit["similarity"])
+        return {**hit, "embedding": query_vec}
+
+    async def store(
+        self,
+        text: str,
+        namespace: str,
+        model: str,
+        temperature: float,
+        response: str,
+        embedding: Optional[np.ndarray] = None
+    ):
+        """
+        保存一条结果到语义缓存
+
+        Args:
+            text: 用户主题
+            namespace: 命名空间
+            model: 模型名称
+            temperature: 温度参数
+            response: LLM 返回的文本
+            embedding: lookup 时已计算的向量，为空则重新编码
+        """
+        try:
+            text = self._normalize_text(text)
+            if embedding is None:
+                loop = asyncio.get_running_loop()
+                embedding = (await loop.run_in_executor(None, encode_texts, [text]))[0]
+            await run_in_db_executor(self.collection.insert_one, {
+                "scope": self.make_scope(model, temperature),
+                "namespace": namespace,
+                "text": text,
+                "embedding": encode_vector(embedding),
+                "response": response,
+                # 使用UTC时间，与 created_at 上的 TTL 索引保持一致
+                "created_at": datetime.now(timezone.utc),
+            })
+            self._count("stores")
+        except Exception as e:
+            self._count("errors")
+            logger.warning("semantic_cache_store_failed namespace=%s error=%s", namespace, e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取语义缓存统计
+
+        Returns:
+            {lookups, hits, misses, hit_rate, avg_hit_similarity, stores, errors, threshold}
+        """
+        with self._stats_lock:
+            stats = dict(self.stats)
+        similarity_sum = stats.pop("hit_similarity_sum")
+        completed = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "hit_rate": round(stats["hits"] / completed, 4) if completed else 0.0,
+            "avg_hit_similarity": round(similarity_sum / stats["hits"], 4) if stats["hits"] else 0.0,
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,212 @@
+"""
+批量相似度计算引擎
+基于预先 L2 归一化的 embedding 矩阵，用分块矩阵乘法一次性计算所有两两余弦相似度，
+代替 Python 双重循环逐对调用 np.dot。
+
+- threshold_edges: 输出相似度超过阈值的无向边（只计算上三角）
+- top_k_neighbors: 输出每个节点的 top-k 近邻（行、列都分块，全图 kNN 利用对称性只算上三角块）
+
+内存占用约为 block_size × col_block_size × 4 字节，与节点总数无关。
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+DEFAULT_BLOCK_SIZE = 1024
+DEFAULT_COL_BLOCK_SIZE = 16384
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """
+    转为 float32 矩阵并做 L2 归一化（内积 == 余弦相似度）
+
+    Args:
+        vectors: 二维数组或等长向量列表
+
+    Returns:
+        归一化后的 (n, dim) float32 矩阵；全零向量保持为零
+    """
+    if len(vectors) == 0:
+        return np.zeros((0, 0), dtype=np.float32)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # 避免除零
+    return matrix / norms
+
+
+def _row_blocks(n: int, block_size: int) -> Iterator[Tuple[int, int]]:
+    block_size = max(1, int(block_size))
+    for start in range(0, n, block_size):
+        yield start, min(start + block_size, n)
+
+
+def threshold_edges(
+    matrix: np.ndarray,
+    threshold: float,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    col_block_size: int = DEFAULT_COL_BLOCK_SIZE,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    计算所有相似度 > threshold 的节点对（i < j）
+
+    Args:
+        matrix: 已归一化的 (n, dim) 矩阵
+        threshold: 相似度阈值
+        block_size: 每次参与矩阵乘法的行数
+        col_block_size: 每次参与矩阵乘法的列数
+
+    Returns:
+        (sources, targets, weights)，按 (i, j) 升序排列
+    """
+    n = matrix.shape[0]
+    sources: List[np.ndarray] = []
+    targets: List[np.ndarray] = []
+    weights: List[np.ndarray] = []
+
+    for start, end in _row_blocks(n, block_size):
+        # 只与 start 之后的列相乘：对角块取严格上三角，其余块全部有效
+        for c_start in range(start, n, max(1, int(col_block_size))):
+            c_end = min(c_start + col_block_size, n)
+            scores = matrix[start:end] @ matrix[c_start:c_end].T
+            rows, cols = np.divmod(np.flatnonzero(scores > threshold), c_end - c_start)
+            rows_global = rows + start
+            cols_global = cols + c_start
+            keep = cols_global > rows_global
+            sources.append(rows_global[keep])
+            targets.append(cols_global[keep])
+            weights.append(scores[rows[keep], cols[keep]])
+
+    if not sources:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype=np.float32)
+    src, dst, w = np.concatenate(sources), np.concatenate(targets), np.concatenate(weights)
+    order = np.lexsort((dst, src))
+    return src[order], dst[order], w[order]
+
+
+def _merge_top_k(best_scores: np.ndarray, best_idx: np.ndarray, scores: np.ndarray, col_offset: int):
+    """
+    把一块分数并入各行当前的 top-k（原地更新 best_scores / best_idx）
+
+    只有超过该行当前第 k 名的分数才是候选，按行补齐成窄矩阵后与已有结果一起 argpartition，
+    不必对整块分数做排序或分区。
+    """
+    k = best_scores.shape[1]
+    # flatnonzero 比二维 nonzero 快数倍（转置视图先转成连续数组）
+    mask = np.ascontiguousarray(scores > best_scores.min(axis=1, keepdims=True))
+    flat = np.flatnonzero(mask)
+    if flat.size == 0:
+        return
+    rows, cols = np.divmod(flat, mask.shape[1])
+    counts = np.bincount(rows, minlength=scores.shape[0])
+    touched = np.nonzero(counts)[0]
+    local = (np.cumsum(counts > 0) - 1)[rows]
+    pos = np.arange(rows.size) - np.repeat((np.cumsum(counts) - counts)[touched], counts[touched])
+
+    cand_scores = np.full((touched.size, int(counts.max())), -np.inf, dtype=np.float32)
+    cand_idx = np.zeros(cand_scores.shape, dtype=np.int64)
+    cand_scores[local, pos] = scores[rows, cols]
+    cand_idx[local, pos] = cols + col_offset
+
+    merged_scores = np.concatenate([best_scores[touched], cand_scores], axis=1)
+    merged_idx = np.concatenate([best_idx[touched], cand_idx], axis=1)
+    part = np.argpartition(merged_scores, -k, axis=1)[:, -k:]
+    best_scores[touched] = np.take_along_axis(merged_scores, part, axis=1)
+    best_idx[touched] = np.take_along_axis(merged_idx, part, axis=1)
+
+
+def top_k_neighbors(
+    matrix: np.ndarray,
+    k: int,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    col_block_size: int = DEFAULT_COL_BLOCK_SIZE,
+    queries: Optional[np.ndarray] = None,
+    exclude_self: bool = True,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算每一行的 top-k 近邻（分块矩阵乘法 + 逐块归并候选，内存有上界）
+
+    全图 kNN（queries 为 None）时利用相似度矩阵的对称性：每个分块只计算一次，
+    同时更新行块和列块两侧节点的 top-k，矩阵乘法量减半。
+
+    Args:
+        matrix: 已归一化的 (n, dim) 候选矩阵
+        k: 近邻数量
+        block_size: 每次处理的查询行数（全图 kNN 时也是列分块大小）
+        col_block_size: 每次参与计算的候选列数（指定 queries 时使用）
+        queries: 查询矩阵，默认为 matrix 自身（全图 kNN）
+        exclude_self: queries 为 None 时是否排除自身
+
+    Returns:
+        (indices, scores)，形状均为 (n_queries, k')，k' = min(k, 可用候选数)，每行按分数降序
+    """
+    n = matrix.shape[0]
+    self_join = queries is None
+    queries = matrix if self_join else queries
+    m = queries.shape[0]
+    k = min(int(k), n - 1 if (self_join and exclude_self) else n)
+    if k <= 0 or m == 0:
+        return np.zeros((m, 0), dtype=np.int64), np.zeros((m, 0), dtype=np.float32)
+
+    best_scores = np.full((m, k), -np.inf, dtype=np.float32)
+    best_idx = np.zeros((m, k), dtype=np.int64)
+
+    if self_join:
+        blocks = list(_row_blocks(n, block_size))
+        for bi, (start, end) in enumerate(blocks):
+            for c_start, c_end in blocks[bi:]:
+                scores = matrix[start:end] @ matrix[c_start:c_end].T
+                if c_start == start:
+                    if exclude_self:
+                        np.fill_diagonal(scores, -np.inf)
+                    _merge_top_k(best_scores[start:end], best_idx[start:end], scores, c_start)
+                else:
+                    _merge_top_k(best_scores[start:end], best_idx[start:end], scores, c_start)
+                    _merge_top_k(best_scores[c_start:c_end], best_idx[c_start:c_end], scores.T, start)
+    else:
+        for start, end in _row_blocks(m, block_size):
+            for c_start, c_end in _row_blocks(n, col_block_size):
+                scores = queries[start:end] @ matrix[c_start:c_end].T
+                _merge_top_k(best_scores[start:end], best_idx[start:end], scores, c_start)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_idx, order, axis=1), np.take_along_axis(best_scores, order, axis=1)
+
+
+def knn_edges(
+    indices: np.ndarray,
+    scores: np.ndarray,
+    threshold: Optional[float] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    把 top-k 近邻结果转成无向边（i -> j 与 j -> i 合并为一条，source < target）
+
+    Args:
+        indices: top_k_neighbors 返回的近邻下标
+        scores: top_k_neighbors 返回的相似度
+        threshold: 可选，只保留相似度 > threshold 的边
+
+    Returns:
+        (sources, targets, weights)，按 (source, target) 升序排列
+    """
+    n_rows, k = indices.shape
+    src = np.repeat(np.arange(n_rows), k)
+    dst = indices.reshape(-1)
+    w = scores.reshape(-1)
+
+    keep = np.isfinite(w) & (src != dst)
+    if threshold is not None:
+        keep &= w > threshold
+    src, dst, w = src[keep], dst[keep], w[keep]
+
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    # 按 (lo, hi) 去重，余弦相似度对称，两个方向的权重相同
+    order = np.lexsort((hi, lo))
+    lo, hi, w = lo[order], hi[order], w[order]
+    if lo.size:
+        first = np.ones(lo.size, dtype=bool)
+        first[1:] = (lo[1:] != lo[:-1]) | (hi[1:] != hi[:-1])
+        lo, hi, w = lo[first], hi[first], w[first]
+    return lo, hi, w
@@ -0,0 +1,120 @@
+"""
+LLM 使用统计的缓冲写入器
+每次调用单独 insert_one 会在高并发时产生大量小写入，这里先缓存在内存中，
+达到批量大小或定时间隔时用一次 insert_many 写入 llm_usage_logs。
+"""
+
+import asyncio
+import atexit
+import logging
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from database.connection import get_database, run_in_db_executor
+
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLogWriter:
+    """按数量或时间间隔批量写入 llm_usage_logs（只在事件循环线程中调用 add）"""
+
+    def __init__(
+        self,
+        collection_name: str = "llm_usage_logs",
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        max_buffer: int = 10000
+    ):
+        """
+        Args:
+            collection_name: 目标集合
+            batch_size: 缓冲达到该数量时立即写入，默认 LLM_USAGE_LOG_BATCH_SIZE
+            flush_interval: 定时写入间隔（秒），默认 LLM_USAGE_LOG_FLUSH_SECONDS
+            max_buffer: 写入持续失败时最多保留的记录数，超出丢弃最旧的记录
+        """
+        self.collection = get_database()[collection_name]
+        self.batch_size = batch_size or settings.LLM_USAGE_LOG_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.LLM_USAGE_LOG_FLUSH_SECONDS
+        self.max_buffer = max_buffer
+        self._buffer: List[Dict[str, Any]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self.stats = {"buffered": 0, "written": 0, "batches": 0, "failed_batches": 0, "dropped": 0}
+        # 脚本里用 asyncio.run 调用时事件循环会先退出，进程结束前把剩余记录同步写掉
+        atexit.register(self._flush_sync)
+
+    def add(self, record: Dict[str, Any]):
+        """加入一条记录（不阻塞）"""
+        self._buffer.append(record)
+        self.stats["buffered"] += 1
+        if len(self._buffer) > self.max_buffer:
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.stats["dropped"] += overflow
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._flush_sync()
+            return
+
+        if self._flusher is None or self._flusher.done():
+            self._flush_lock = asyncio.Lock()
+            self._flusher = loop.create_task(self._run())
+        if len(self._buffer) >= self.batch_size:
+            loop.create_task(self.flush())
+
+    async def _run(self):
+        """后台定时写入"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """把缓冲中的记录写入数据库（在数据库线程池中执行）"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+            try:
+                await run_in_db_executor(self.collection.insert_many, batch, ordered=False)
+                self.stats["written"] += len(batch)
+                self.stats["batches"] += 1
+            except Exception as e:
+                # 放回缓冲，下次再试
+                self._buffer[:0] = batch
+                self.stats["failed_batches"] += 1
+                logger.warning("llm_usage_log_flush_failed records=%d error=%s", len(batch), e)
+
+    def _flush_sync(self):
+        """同步写入剩余记录（进程退出或没有事件循环时）"""
+        if not self._buffer:
+            return
+        batch, self._buffer = self._buffer, []
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            self.stats["written"] += len(batch)
+            self.stats["batches"] += 1
+        except Exception as e:
+            self.stats["failed_batches"] += 1
+            logger.warning("llm_usage_log_flush_failed records=%d error=%s", len(batch), e)
+
+    async def close(self):
+        """停止定时任务并写入剩余记录（服务关闭时调用）"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            self._flusher = None
+        if self._flush_lock is not None:
+            await self.flush()
+        else:
+            self._flush_sync()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取写入统计
+
+        Returns:
+            {pending, buffered, written, batches, failed_batches, dropped}
+        """
+        return {"pending": len(self._buffer), **self.stats}
@@ -3,7 +3,16 @@ Database Layer - MongoDB Operations
 Provides data access layer with Repository Pattern
 """
 
-from .connection import get_database, close_connection
+from .connection import (
+    get_database,
+    get_async_database,
+    get_analytics_database,
+    use_client_profile,
+    close_connection,
+    run_in_db_executor
+)
+from .pool_metrics import get_pool_stats
+from .loaders import request_scope, RequestLoaderMiddleware
 from .repositories import (
     UserProfileRepository,
     UserSnapshotRepository,
@@ -11,17 +20,52 @@ from .repositories import (
     NoteEmbeddingRepository,
     CreatorNetworkRepository,
     StylePromptRepository,
-    PlatformConfigRepository
+    PlatformConfigRepository,
+    CreatorStatsRepository,
+    GrowthOpportunityRepository,
+    NoteRepository
+)
+from .async_repositories import (
+    AsyncUserProfileRepository,
+    AsyncUserSnapshotRepository,
+    AsyncUserEmbeddingRepository,
+    AsyncNoteEmbeddingRepository,
+    AsyncCreatorNetworkRepository,
+    AsyncStylePromptRepository,
+    AsyncPlatformConfigRepository,
+    AsyncCreatorStatsRepository,
+    AsyncGrowthOpportunityRepository,
+    AsyncNoteRepository
 )
 
 __all__ = [
     'get_database',
+    'get_async_database',
+    'get_analytics_database',
+    'use_client_profile',
+    'get_pool_stats',
+    'request_scope',
+    'RequestLoaderMiddleware',
     'close_connection',
+    'run_in_db_executor',
     'UserProfileRepository',
     'UserSnapshotRepository',
     'UserEmbeddingRepository',
     'NoteEmbeddingRepository',
     'CreatorNetworkRepository',
     'StylePromptRepository',
-    'PlatformConfigRepository'
+    'PlatformConfigRepository',
+    'CreatorStatsRepository',
+    'GrowthOpportunityRepository',
+    'NoteRepository',
+    'AsyncUserProfileRepository',
+    'AsyncUserSnapshotRepository',
+    'AsyncUserEmbeddingRepository',
+    'AsyncNoteEmbeddingRepository',
+    'AsyncCreatorNetworkRepository',
+    'AsyncStylePromptRepository',
+    'AsyncPlatformConfigRepository',
+    'AsyncCreatorStatsRepository',
+    'AsyncGrowthOpportunityRepository',
+    'AsyncNoteRepository'
 ]
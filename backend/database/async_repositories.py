@@ -0,0 +1,705 @@
+"""
+Async Repository Pattern - 异步数据访问层（Motor）
+供 FastAPI 接口等 async 代码使用，查询在事件循环内完成，不占用数据库线程池。
+接口与 repositories.py 中的同步仓库保持一致（方法名、参数和返回值相同，调用时需 await）；
+采集脚本、回填脚本和网络构建等离线任务仍使用同步仓库。
+会同步写入 notes / creator_stats 的快照写操作只在同步仓库中实现。
+"""
+
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+
+from .connection import get_async_database
+from .vector_codec import encode_vector, decode_embedding_field
+from .repositories import (
+    CreatorNetworkRepository,
+    CreatorStatsRepository,
+    GrowthOpportunityRepository,
+    NoteRepository
+)
+
+
+class AsyncBaseRepository:
+    """异步基础仓库类"""
+
+    def __init__(self, collection_name: str):
+        self.db: AsyncIOMotorDatabase = get_async_database()
+        self.collection: AsyncIOMotorCollection = self.db[collection_name]
+
+    async def find_one(self, query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """查询单个文档"""
+        return await self.collection.find_one(query)
+
+    async def find_many(self, query: Dict[str, Any], limit: int = 0) -> List[Dict[str, Any]]:
+        """查询多个文档"""
+        cursor = self.collection.find(query)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def insert_one(self, document: Dict[str, Any]) -> str:
+        """插入单个文档"""
+        result = await self.collection.insert_one(document)
+        return str(result.inserted_id)
+
+    async def update_one(self, query: Dict[str, Any], update: Dict[str, Any]) -> bool:
+        """更新单个文档"""
+        result = await self.collection.update_one(query, {"$set": update})
+        return result.modified_count > 0
+
+    async def delete_one(self, query: Dict[str, Any]) -> bool:
+        """删除单个文档"""
+        result = await self.collection.delete_one(query)
+        return result.deleted_count > 0
+
+    async def count(self, query: Dict[str, Any] = {}) -> int:
+        """统计文档数量"""
+        return await self.collection.count_documents(query)
+
+
+# =====================================================
+# 1. User Profile Repository
+# =====================================================
+
+class AsyncUserProfileRepository(AsyncBaseRepository):
+    """用户档案仓库（异步）"""
+
+    def __init__(self):
+        super().__init__("user_profiles")
+
+    async def get_by_user_id(self, user_id: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        """根据user_id获取用户档案"""
+        return await self.find_one({"user_id": user_id, "platform": platform})
+
+    async def get_by_user_ids(self, user_ids: List[str], platform: str = "xiaohongshu") -> Dict[str, Dict[str, Any]]:
+        """批量获取用户档案（一次 $in 查询）"""
+        cursor = self.collection.find({"user_id": {"$in": list(user_ids)}, "platform": platform})
+        return {doc["user_id"]: doc async for doc in cursor}
+
+    async def get_all_profiles(self, platform: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """获取所有用户档案（只返回必要字段，见 UserProfileRepository.get_all_profiles）"""
+        query = {"platform": platform} if platform else {}
+        projection = {
+            "user_id": 1,
+            "nickname": 1,
+            "platform": 1,
+            "basic_info": 1,
+            "profile_data": 1,
+            "stats": 1,
+            "_id": 0
+        }
+        cursor = self.collection.find(query, projection)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def create_profile(self, profile_data: Dict[str, Any]) -> str:
+        """创建用户档案"""
+        profile_data['created_at'] = datetime.now()
+        profile_data['updated_at'] = datetime.now()
+        return await self.insert_one(profile_data)
+
+    async def update_profile(self, user_id: str, platform: str, update_data: Dict[str, Any]) -> bool:
+        """更新用户档案"""
+        update_data['updated_at'] = datetime.now()
+        return await self.update_one({"user_id": user_id, "platform": platform}, update_data)
+
+    async def get_profile_by_nickname(self, nickname: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        """根据昵称获取用户档案"""
+        return await self.find_one({"nickname": nickname, "platform": platform})
+
+
+# =====================================================
+# 2. User Snapshot Repository
+# =====================================================
+
+class AsyncUserSnapshotRepository(AsyncBaseRepository):
+    """用户笔记快照仓库（异步，只读；写快照请使用 UserSnapshotRepository）"""
+
+    def __init__(self):
+        super().__init__("user_snapshots")
+
+    async def get_by_user_id(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        根据user_id获取笔记快照
+
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            fields: 只返回指定字段（如只需要 nickname 时不取 notes 数组），None 表示全部
+
+        Returns:
+            笔记快照数据 or None
+        """
+        projection = {f: 1 for f in fields} if fields else None
+        return await self.collection.find_one({"user_id": user_id, "platform": platform}, projection)
+
+    async def get_by_user_ids(
+        self,
+        user_ids: List[str],
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量获取笔记快照（一次 $in 查询，fields 同 get_by_user_id）"""
+        projection = {f: 1 for f in fields} if fields else None
+        if projection:
+            projection["user_id"] = 1
+        cursor = self.collection.find({"user_id": {"$in": list(user_ids)}, "platform": platform}, projection)
+        return {doc["user_id"]: doc async for doc in cursor}
+
+    async def get_notes(self, user_id: str, platform: str = "xiaohongshu", limit: int = 5) -> List[Dict[str, Any]]:
+        """获取用户的笔记列表"""
+        snapshot = await self.collection.find_one(
+            {"user_id": user_id, "platform": platform},
+            {"notes": {"$slice": limit}, "_id": 0}
+        )
+        return (snapshot or {}).get("notes", [])
+
+    async def get_known_note_ids(self, user_id: str, platform: str = "xiaohongshu") -> set:
+        """获取已保存的笔记ID（见 UserSnapshotRepository.get_known_note_ids）"""
+        snapshot = await self.collection.find_one(
+            {"user_id": user_id, "platform": platform},
+            {"notes.id": 1, "_id": 0}
+        )
+        return {n["id"] for n in (snapshot or {}).get("notes", []) if n.get("id")}
+
+
+# =====================================================
+# 3. User Embedding Repository
+# =====================================================
+
+class AsyncUserEmbeddingRepository(AsyncBaseRepository):
+    """用户向量embedding仓库（异步）"""
+
+    def __init__(self):
+        super().__init__("user_embeddings")
+
+    async def get_by_user_id(self, user_id: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        """根据user_id获取embedding（embedding 字段已解码为 np.ndarray）"""
+        return decode_embedding_field(await self.find_one({"user_id": user_id, "platform": platform}))
+
+    async def get_by_user_ids(
+        self,
+        user_ids: List[str],
+        platform: str = "xiaohongshu",
+        dimension: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量获取embedding（一次 $in 查询；dimension 只返回指定维度的向量）"""
+        query: Dict[str, Any] = {"user_id": {"$in": list(user_ids)}, "platform": platform}
+        if dimension is not None:
+            query["dimension"] = dimension
+        return {doc["user_id"]: decode_embedding_field(doc) async for doc in self.collection.find(query)}
+
+    async def get_all_embeddings(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取所有embeddings"""
+        query = {"platform": platform} if platform else {}
+        return [decode_embedding_field(doc) for doc in await self.find_many(query)]
+
+    async def create_embedding(self, embedding_data: Dict[str, Any]) -> str:
+        """创建embedding"""
+        embedding_data['created_at'] = datetime.now()
+        if embedding_data.get('embedding') is not None:
+            embedding_data['embedding'] = encode_vector(embedding_data['embedding'])
+        return await self.insert_one(embedding_data)
+
+
+# =====================================================
+# 4. Creator Network Repository
+# =====================================================
+
+class AsyncCreatorNetworkRepository(AsyncBaseRepository):
+    """
+    创作者网络仓库（异步，只读）
+
+    存储结构见 CreatorNetworkRepository；网络版本的写入和增量修改只在同步仓库中实现。
+    """
+
+    _NODE_INTERNAL = CreatorNetworkRepository._NODE_INTERNAL
+    _EDGE_INTERNAL = CreatorNetworkRepository._EDGE_INTERNAL
+    _node_projection = CreatorNetworkRepository._node_projection
+
+    def __init__(self):
+        super().__init__("creator_networks")
+        self.nodes: AsyncIOMotorCollection = self.db["creator_network_nodes"]
+        self.edges: AsyncIOMotorCollection = self.db["creator_network_edges"]
+
+    async def get_latest_version(self, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        """获取最新的已完成版本清单"""
+        return await self.collection.find_one(
+            {"platform": platform, "network_version": {"$exists": True}, "status": "ready"},
+            {"network_data": 0},
+            sort=[("network_version", -1)]
+        )
+
+    async def _resolve_version(self, platform: str, version: Optional[int]) -> Optional[int]:
+        if version is not None:
+            return version
+        manifest = await self.get_latest_version(platform)
+        return manifest["network_version"] if manifest else None
+
+    async def get_node(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """获取单个创作者节点"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            return CreatorNetworkRepository._legacy_node(await self._legacy_network(platform), "id", user_id)
+        return await self.nodes.find_one({"network_version": version, "id": user_id}, self._node_projection(fields))
+
+    async def get_node_by_name(
+        self,
+        name: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """根据创作者昵称获取节点"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            return CreatorNetworkRepository._legacy_node(await self._legacy_network(platform), "name", name)
+        return await self.nodes.find_one({"network_version": version, "name": name}, self._node_projection(fields))
+
+    async def get_nodes_by_names(
+        self,
+        names: List[str],
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """根据昵称批量获取节点（一次 $in 查询）"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            legacy = await self._legacy_network(platform)
+            return {c["name"]: c for c in (legacy or {}).get("creators", []) if c.get("name") in names}
+        projection = self._node_projection(fields)
+        if fields:
+            projection["name"] = 1
+        cursor = self.nodes.find({"network_version": version, "name": {"$in": list(names)}}, projection)
+        return {doc["name"]: doc async for doc in cursor}
+
+    async def get_nodes(
+        self,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """获取某版本的全部节点（建议通过 fields 排除 indexSeries 等大字段）"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            legacy = await self._legacy_network(platform)
+            return legacy.get("creators", []) if legacy else []
+        cursor = self.nodes.find({"network_version": version}, self._node_projection(fields))
+        return await cursor.to_list(length=None)
+
+    async def get_nodes_page(
+        self,
+        platform: str = "xiaohongshu",
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """按节点 id 分页获取节点（keyset 分页），返回 {nodes, next_cursor, network_version}"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            page = CreatorNetworkRepository._legacy_page(await self._legacy_network(platform), limit, after)
+        else:
+            query: Dict[str, Any] = {"network_version": version}
+            if after:
+                query["id"] = {"$gt": after}
+            cursor = self.nodes.find(query, self._node_projection(fields)).sort("id", 1).limit(limit)
+            page = await cursor.to_list(length=None)
+        next_cursor = page[-1]["id"] if len(page) == limit else None
+        return {"nodes": page, "next_cursor": next_cursor, "network_version": version}
+
+    async def get_ego_network(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        limit: int = 0,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """获取某创作者的自我中心网络，返回 {node, neighbors, edges} or None"""
+        version = await self._resolve_version(platform, version)
+        if version is None:
+            return CreatorNetworkRepository._legacy_ego(await self._legacy_network(platform), user_id, limit)
+
+        node = await self.nodes.find_one({"network_version": version, "id": user_id}, self._node_projection(fields))
+        if not node:
+            return None
+
+        cursor = self.edges.find(
+            {"network_version": version, "$or": [{"source": user_id}, {"target": user_id}]},
+            self._EDGE_INTERNAL
+        ).sort("weight", -1)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        edges = await cursor.to_list(length=None)
+
+        neighbor_ids = [e["target"] if e["source"] == user_id else e["source"] for e in edges]
+        neighbors = await self.nodes.find(
+            {"network_version": version, "id": {"$in": neighbor_ids}},
+            self._node_projection(fields)
+        ).to_list(length=None) if neighbor_ids else []
+        return {"node": node, "neighbors": neighbors, "edges": edges}
+
+    async def get_full_network(
+        self,
+        platform: str = "xiaohongshu",
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """获取完整网络，返回 {creators, edges, network_version, created_at} or None"""
+        manifest = None
+        if version is None:
+            manifest = await self.get_latest_version(platform)
+            version = manifest["network_version"] if manifest else None
+        if version is None:
+            legacy = await self._legacy_network(platform)
+            if not legacy:
+                return None
+            return {**legacy, "network_version": None}
+
+        return {
+            "creators": await self.nodes.find({"network_version": version}, self._NODE_INTERNAL).to_list(length=None),
+            "edges": await self.edges.find({"network_version": version}, self._EDGE_INTERNAL).to_list(length=None),
+            "network_version": version,
+            "created_at": manifest.get("created_at") if manifest else None,
+        }
+
+    async def get_network_creator_ids(self, version: int) -> List[str]:
+        """获取某版本所有创作者节点的ID"""
+        cursor = self.nodes.find({"network_version": version}, {"id": 1, "_id": 0})
+        return [doc["id"] async for doc in cursor]
+
+    async def _legacy_network(self, platform: str) -> Optional[Dict[str, Any]]:
+        """读取旧的单文档格式网络（尚未执行 normalize_creator_networks.py 时）"""
+        doc = await self.collection.find_one(
+            {"platform": platform, "network_data": {"$exists": True}},
+            {"network_data": 1, "created_at": 1},
+            sort=[("created_at", -1)]
+        )
+        return CreatorNetworkRepository._legacy_from_doc(doc)
+
+
+# =====================================================
+# 5. Style Prompt Repository
+# =====================================================
+
+class AsyncStylePromptRepository(AsyncBaseRepository):
+    """风格提示词仓库（异步）"""
+
+    def __init__(self):
+        super().__init__("style_prompts")
+
+    async def get_by_type(self, prompt_type: str, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        """根据类型获取提示词模板"""
+        return await self.find_one({"prompt_type": prompt_type, "platform": platform})
+
+    async def get_all_prompts(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
+        """获取所有提示词模板"""
+        query = {"platform": platform} if platform else {}
+        return await self.find_many(query)
+
+
+# =====================================================
+# 6. Note Embedding Repository
+# =====================================================
+
+class AsyncNoteEmbeddingRepository(AsyncBaseRepository):
+    """笔记Embedding仓库（异步；搜索索引的批量加载仍使用 NoteEmbeddingRepository）"""
+
+    def __init__(self):
+        super().__init__("note_embeddings")
+
+    async def get_by_note_id(self, note_id: str) -> Optional[Dict[str, Any]]:
+        """根据笔记ID获取embedding"""
+        return decode_embedding_field(await self.find_one({"note_id": note_id}))
+
+    async def get_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
+        """获取某用户所有笔记的embedding"""
+        return [decode_embedding_field(doc) for doc in await self.find_many({"user_id": user_id})]
+
+    async def get_vectors(
+        self,
+        user_id: Optional[str] = None,
+        note_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """一次查询批量获取向量：某用户的全部笔记 + 指定的笔记（见 NoteEmbeddingRepository.get_vectors）"""
+        conditions = []
+        if user_id:
+            conditions.append({"user_id": user_id})
+        if note_ids:
+            conditions.append({"note_id": {"$in": list(note_ids)}})
+        if not conditions:
+            return []
+        query = conditions[0] if len(conditions) == 1 else {"$or": conditions}
+        projection = {"note_id": 1, "user_id": 1, "embedding": 1, "_id": 0}
+        return [decode_embedding_field(doc) async for doc in self.collection.find(query, projection)]
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """获取笔记embedding统计"""
+        total = await self.count()
+        pipeline = [
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+            {"$count": "total_users"}
+        ]
+        user_count_result = await self.collection.aggregate(pipeline).to_list(length=None)
+        total_users = user_count_result[0]["total_users"] if user_count_result else 0
+        return {
+            "total_notes": total,
+            "total_creators": total_users
+        }
+
+
+# =====================================================
+# 7. Platform Config Repository
+# =====================================================
+
+class AsyncPlatformConfigRepository(AsyncBaseRepository):
+    """平台配置仓库（异步）"""
+
+    def __init__(self):
+        super().__init__("platform_configs")
+
+    async def get_by_platform(self, platform: str) -> Optional[Dict[str, Any]]:
+        """根据平台获取配置"""
+        return await self.find_one({"platform": platform})
+
+    async def get_all_configs(self) -> List[Dict[str, Any]]:
+        """获取所有平台配置"""
+        return await self.find_many({})
+
+
+# =====================================================
+# 8. Creator Stats Repository
+# =====================================================
+
+class AsyncCreatorStatsRepository(AsyncBaseRepository):
+    """创作者统计物化视图仓库（异步，只读；统计在写快照时由 CreatorStatsRepository 刷新）"""
+
+    SUMMARY_FIELDS = CreatorStatsRepository.SUMMARY_FIELDS
+
+    def __init__(self):
+        super().__init__("creator_stats")
+
+    async def get_by_user_id(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """获取单个创作者的统计"""
+        projection = {f: 1 for f in fields} if fields else {}
+        projection["_id"] = 0
+        return await self.collection.find_one({"user_id": user_id, "platform": platform}, projection)
+
+    async def get_stats_map(
+        self,
+        platform: str = "xiaohongshu",
+        user_ids: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """批量获取创作者统计，返回 {user_id: stats}"""
+        query: Dict[str, Any] = {"platform": platform}
+        if user_ids is not None:
+            query["user_id"] = {"$in": list(user_ids)}
+        projection = {f: 1 for f in (fields or self.SUMMARY_FIELDS)}
+        projection.update({"user_id": 1, "_id": 0})
+        return {doc["user_id"]: doc async for doc in self.collection.find(query, projection)}
+
+
+# =====================================================
+# 9. Growth Opportunity Repository
+# =====================================================
+
+class AsyncGrowthOpportunityRepository(AsyncBaseRepository):
+    """成长路径分析结果仓库（异步，文档结构见 GrowthOpportunityRepository）"""
+
+    make_key = staticmethod(GrowthOpportunityRepository.make_key)
+
+    def __init__(self):
+        super().__init__("growth_opportunities")
+
+    async def get_result(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """获取已保存的分析结果（make_key 生成的键）"""
+        return await self.collection.find_one(key, {"_id": 0})
+
+    async def save_result(
+        self,
+        key: Dict[str, Any],
+        result: Dict[str, Any],
+        source_versions: Dict[str, Any]
+    ) -> bool:
+        """保存分析结果（source_versions: {user_id: creator_stats.updated_at}）"""
+        now = datetime.now()
+        update = await self.collection.update_one(
+            key,
+            {
+                "$set": {"result": result, "source_versions": source_versions, "computed_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True
+        )
+        return update.upserted_id is not None or update.modified_count > 0
+
+    async def get_computed_pairs(self, my_user_id: str, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
+        """获取某创作者已保存的全部分析结果的键、来源版本和计算时间（不含结果正文）"""
+        cursor = self.collection.find({"my_user_id": my_user_id, "platform": platform}, {"result": 0, "_id": 0})
+        return await cursor.to_list(length=None)
+
+
+# =====================================================
+# 10. Note Repository
+# =====================================================
+
+class AsyncNoteRepository(AsyncBaseRepository):
+    """单条笔记仓库（异步，只读；notes 由 UserSnapshotRepository 写快照时同步写入）"""
+
+    SORT_FIELDS = NoteRepository.SORT_FIELDS
+    parse_cursor = staticmethod(NoteRepository.parse_cursor)
+
+    def __init__(self):
+        super().__init__("notes")
+
+    async def get_notes(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        sort: str = "latest",
+        limit: int = 0,
+        skip: int = 0,
+        since: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """分页获取创作者的笔记（参数见 NoteRepository.get_notes）"""
+        field = self.SORT_FIELDS.get(sort, "create_time")
+        cursor = self.collection.find(
+            NoteRepository._query(user_id, platform, since), NoteRepository._projection(fields)
+        ).sort([(field, -1), ("note_id", -1)])
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        notes = await cursor.to_list(length=None)
+        if notes or skip or await self.has_notes(user_id, platform):
+            return notes
+
+        notes = await self._snapshot_notes(user_id, platform, fields, since, field)
+        return notes[skip:skip + limit] if limit else notes[skip:]
+
+    async def get_recent_notes_map(
+        self,
+        user_ids: List[str],
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        limit: int = 20,
+        since: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量获取多个创作者最新的 limit 条笔记（一次聚合查询，未回填的创作者再批量读快照）
+
+        Returns:
+            {user_id: 与 get_notes(user_id, sort="latest", limit=limit) 相同的笔记列表}
+        """
+        user_ids = list(user_ids)
+        query = NoteRepository._query(user_id=None, platform=platform, since=since)
+        query["user_id"] = {"$in": user_ids}
+        projection = NoteRepository._projection(fields)
+        if fields:
+            projection["user_id"] = 1
+        pipeline = [
+            {"$match": query},
+            {"$sort": {"create_time": -1, "note_id": -1}},
+            {"$project": projection},
+            {"$group": {"_id": "$user_id", "notes": {"$push": "$$ROOT"}}},
+        ]
+        if limit:
+            pipeline.append({"$project": {"notes": {"$slice": ["$notes", limit]}}})
+        result = {doc["_id"]: doc["notes"] async for doc in self.collection.aggregate(pipeline)}
+        if fields and "user_id" not in fields:
+            for notes in result.values():
+                for note in notes:
+                    note.pop("user_id", None)
+
+        missing = [u for u in user_ids if u not in result]
+        if missing:
+            # 时间窗口内没有笔记的创作者：已回填的返回空列表，未回填的从 user_snapshots 读取
+            backfilled = set(await self.collection.distinct(
+                "user_id", {"user_id": {"$in": missing}, "platform": platform}
+            ))
+            pending = [u for u in missing if u not in backfilled]
+            if pending:
+                snapshot_projection = NoteRepository._snapshot_projection(fields)
+                snapshot_projection["user_id"] = 1
+                async for snapshot in self.db.user_snapshots.find(
+                    {"user_id": {"$in": pending}, "platform": platform}, snapshot_projection
+                ):
+                    notes = NoteRepository._notes_from_snapshot(snapshot, since, "create_time")
+                    result[snapshot["user_id"]] = notes[:limit] if limit else notes
+        return {u: result.get(u, []) for u in user_ids}
+
+    async def get_notes_page(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        sort: str = "latest",
+        limit: int = 20,
+        after: Optional[str] = None,
+        since: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        分页获取创作者的笔记（keyset 分页，参数见 NoteRepository.get_notes_page）
+
+        Returns:
+            {notes, next_cursor}
+
+        Raises:
+            ValueError: cursor 格式错误
+        """
+        field = self.SORT_FIELDS.get(sort, "create_time")
+        position = self.parse_cursor(after) if after else None
+        query, projection = NoteRepository._page_query(user_id, platform, fields, since, field, position)
+        cursor = self.collection.find(query, projection).sort([(field, -1), ("note_id", -1)]).limit(limit)
+        page = await cursor.to_list(length=None)
+        if not page and not await self.has_notes(user_id, platform):
+            page = await self._snapshot_notes(user_id, platform, fields, since, field)
+            page = NoteRepository._page_after(page, field, position)[:limit]
+        return {"notes": page, "next_cursor": NoteRepository._next_cursor(page, limit, field)}
+
+    async def count_notes(self, user_id: str, platform: str = "xiaohongshu", since: Optional[int] = None) -> int:
+        """统计创作者的笔记数（since 同 get_notes）"""
+        count = await self.collection.count_documents(NoteRepository._query(user_id, platform, since))
+        if count or await self.has_notes(user_id, platform):
+            return count
+        return len(await self._snapshot_notes(user_id, platform, ["id"], since))
+
+    async def has_notes(self, user_id: str, platform: str = "xiaohongshu") -> bool:
+        """该创作者的笔记是否已写入 notes 集合"""
+        doc = await self.collection.find_one({"user_id": user_id, "platform": platform}, {"_id": 1})
+        return doc is not None
+
+    async def _snapshot_notes(
+        self,
+        user_id: str,
+        platform: str,
+        fields: Optional[List[str]],
+        since: Optional[int],
+        field: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """未回填时从 user_snapshots 读取"""
+        snapshot = await self.db.user_snapshots.find_one(
+            {"user_id": user_id, "platform": platform}, NoteRepository._snapshot_projection(fields)
+        )
+        return NoteRepository._notes_from_snapshot(snapshot, since, field)
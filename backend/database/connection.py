@@ -2,57 +2,203 @@
 MongoDB Connection Management
 """
 
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import MongoClient, ReadPreference
 from pymongo.database import Database
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 # 使用集中化配置管理
 from core.config import settings
+from .pool_metrics import get_pool_listener
 
 # MongoDB连接配置（从settings获取）
 MONGO_URI = settings.MONGO_URI
 DATABASE_NAME = settings.DATABASE_NAME
 
-_client: Optional[MongoClient] = None
-_database: Optional[Database] = None
+# 客户端配置：api 供在线接口使用（短超时），batch 供离线脚本使用（长超时、小连接池）
+CLIENT_PROFILES = ("api", "batch")
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
 
+_default_profile = "api"
+_clients: Dict[str, MongoClient] = {}
+_databases: Dict[str, Database] = {}
+_async_clients: Dict[str, AsyncIOMotorClient] = {}
+_async_databases: Dict[str, AsyncIOMotorDatabase] = {}
+_analytics_database: Optional[Database] = None
+_db_executor: Optional[ThreadPoolExecutor] = None
 
-def get_database() -> Database:
+
+def get_client_options(profile: str) -> Dict[str, Any]:
     """
-    获取MongoDB数据库实例（单例模式）
-    
+    获取某个客户端配置的连接参数（同步与Motor客户端共用）
+
+    Args:
+        profile: 客户端配置名（api / batch）
+
+    Returns:
+        MongoClient 关键字参数
+    """
+    if profile not in CLIENT_PROFILES:
+        raise ValueError(f"profile must be one of {list(CLIENT_PROFILES)}")
+    prefix = f"MONGO_{profile.upper()}_"
+    socket_timeout = getattr(settings, prefix + "SOCKET_TIMEOUT_MS")
+    return dict(
+        serverSelectionTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,  # 服务器选择超时
+        connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,          # 连接超时
+        socketTimeoutMS=socket_timeout or None,                      # socket超时（0 表示不超时）
+        maxPoolSize=getattr(settings, prefix + "MAX_POOL_SIZE"),     # 最大连接池大小
+        minPoolSize=getattr(settings, prefix + "MIN_POOL_SIZE"),     # 最小连接池大小
+        readPreference=getattr(settings, prefix + "READ_PREFERENCE"),
+        retryWrites=True,                                            # 启用重试写入
+        retryReads=True                                              # 启用重试读取
+    )
+
+
+def use_client_profile(profile: str):
+    """
+    设置本进程默认的客户端配置（离线脚本启动时调用 use_client_profile("batch")）
+
+    Args:
+        profile: 客户端配置名（api / batch）
+    """
+    global _default_profile
+
+    if profile not in CLIENT_PROFILES:
+        raise ValueError(f"profile must be one of {list(CLIENT_PROFILES)}")
+    _default_profile = profile
+
+
+def _get_client(profile: Optional[str]) -> MongoClient:
+    profile = profile or _default_profile
+    if profile not in _clients:
+        options = get_client_options(profile)
+        listener = get_pool_listener(profile, options["maxPoolSize"])
+        _clients[profile] = MongoClient(MONGO_URI, event_listeners=[listener], **options)
+    return _clients[profile]
+
+
+def get_database(profile: Optional[str] = None) -> Database:
+    """
+    获取MongoDB数据库实例（每个客户端配置一个单例）
+
+    Args:
+        profile: 客户端配置名（api / batch），默认使用 use_client_profile 设置的配置
+
     Returns:
         Database: MongoDB数据库实例
     """
-    global _client, _database
-    
-    if _database is None:
-        # 添加超时设置以避免长时间hang
-        _client = MongoClient(
-            MONGO_URI,
-            serverSelectionTimeoutMS=5000,  # 服务器选择超时5秒
-            connectTimeoutMS=5000,          # 连接超时5秒
-            socketTimeoutMS=5000,           # socket超时5秒
-            maxPoolSize=10,                 # 最大连接池大小
-            minPoolSize=1,                  # 最小连接池大小
-            retryWrites=True,               # 启用重试写入
-            retryReads=True                 # 启用重试读取
+    profile = profile or _default_profile
+    if profile not in _databases:
+        _databases[profile] = _get_client(profile)[DATABASE_NAME]
+        print(f"✅ MongoDB连接成功: {DATABASE_NAME} ({profile})")
+    return _databases[profile]
+
+
+def get_analytics_database() -> Database:
+    """
+    获取只读分析扫描使用的数据库实例
+
+    使用 batch 客户端的连接池和超时，读偏好为 MONGO_ANALYTICS_READ_PREFERENCE（默认 secondaryPreferred），
+    全集合扫描不占用主节点；副本集同步有延迟，读取刚写入的数据时请使用 get_database。
+
+    Returns:
+        Database: MongoDB数据库实例
+    """
+    global _analytics_database
+
+    if _analytics_database is None:
+        _analytics_database = _get_client("batch").get_database(
+            DATABASE_NAME, read_preference=READ_PREFERENCES[settings.MONGO_ANALYTICS_READ_PREFERENCE]
         )
-        _database = _client[DATABASE_NAME]
-        print(f"✅ MongoDB连接成功: {DATABASE_NAME}")
-    
-    return _database
+    return _analytics_database
+
+
+def get_async_database(profile: Optional[str] = None) -> AsyncIOMotorDatabase:
+    """
+    获取Motor异步数据库实例（每个客户端配置一个单例，供 async 接口使用）
+
+    Motor 在事件循环内完成网络IO，不占用 run_in_db_executor 的线程池；
+    同步的 get_database 仍供脚本和 CPU 密集的后台任务使用。
+
+    Args:
+        profile: 客户端配置名（api / batch），默认使用 use_client_profile 设置的配置
+
+    Returns:
+        AsyncIOMotorDatabase: MongoDB异步数据库实例
+    """
+    profile = profile or _default_profile
+    if profile not in _async_databases:
+        options = get_client_options(profile)
+        listener = get_pool_listener(f"{profile}:async", options["maxPoolSize"])
+        _async_clients[profile] = AsyncIOMotorClient(MONGO_URI, event_listeners=[listener], **options)
+        _async_databases[profile] = _async_clients[profile][DATABASE_NAME]
+    return _async_databases[profile]
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """
+    获取执行同步数据库操作的线程池（单例，有界）
+
+    PyMongo 是同步驱动，在 async 接口里直接调用会阻塞整个事件循环；
+    线程数不超过 api 连接池大小，避免线程排队等连接。
+
+    Returns:
+        ThreadPoolExecutor: 数据库线程池
+    """
+    global _db_executor
+
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=max(1, settings.MONGO_EXECUTOR_WORKERS),
+            thread_name_prefix="mongo"
+        )
+    return _db_executor
+
+
+async def run_in_db_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    在数据库线程池中执行同步函数，不阻塞事件循环
+
+    Args:
+        func: 同步函数（通常是 PyMongo 操作或 Repository 方法）
+        *args, **kwargs: 传给 func 的参数
+
+    Returns:
+        func 的返回值
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), functools.partial(func, *args, **kwargs))
 
 
 def close_connection():
-    """关闭MongoDB连接"""
-    global _client, _database
-    
-    if _client is not None:
-        _client.close()
-        _client = None
-        _database = None
+    """关闭所有MongoDB连接"""
+    global _db_executor, _analytics_database
+
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
+
+    for client in _async_clients.values():
+        client.close()
+    _async_clients.clear()
+    _async_databases.clear()
+
+    if _clients:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+        _databases.clear()
+        _analytics_database = None
         print("✅ MongoDB连接已关闭")
 
 
@@ -72,3 +218,18 @@ def test_connection() -> bool:
     except Exception as e:
         print(f"❌ MongoDB连接测试失败: {e}")
         return False
+
+
+async def test_async_connection() -> bool:
+    """
+    测试Motor异步连接（供 async 接口使用，不阻塞事件循环）
+
+    Returns:
+        bool: 连接是否成功
+    """
+    try:
+        await get_async_database().command('ping')
+        return True
+    except Exception as e:
+        print(f"❌ MongoDB异步连接测试失败: {e}")
+        return False
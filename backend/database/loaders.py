@@ -0,0 +1,225 @@
+"""
+Request-scoped Data Loaders - 请求级批量加载与去重
+同一请求内、同一事件循环轮次里发起的按键查询（如多个 get_by_user_id）合并为一次 $in 查询，
+结果在请求结束前缓存，重复查询直接复用。
+
+使用方法：
+    # api/server.py 已注册 RequestLoaderMiddleware，每个请求一组新的 loader
+    profile = await load_profile(user_id)
+    profiles = await load_profiles([user_a, user_b])  # 一次查询
+
+    # 请求之外（脚本、后台任务）用 request_scope 划定作用域，作用域内同样合并查询并缓存结果
+    with request_scope():
+        my_profile, other_profile = await asyncio.gather(load_profile(user_a), load_profile(user_b))
+
+不在任何作用域内时，每次 load_* 调用都使用一个新的 loader：既不合并其他调用的查询，也不缓存，
+等同于直接查询（load_profiles 在同一个 loader 上登记全部键，仍然是一次查询）。
+"""
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional
+
+from .async_repositories import (
+    AsyncCreatorNetworkRepository,
+    AsyncNoteRepository,
+    AsyncUserEmbeddingRepository,
+    AsyncUserProfileRepository,
+    AsyncUserSnapshotRepository,
+)
+
+
+class BatchLoader:
+    """
+    按键批量加载器（DataLoader 模式）
+
+    load(key) 只登记键并返回 Future；当前事件循环轮次结束后，
+    所有登记的键通过一次 batch_fn(keys) 查询，结果按键分发并缓存。
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]):
+        """
+        Args:
+            batch_fn: 批量查询函数，参数为去重后的键列表，返回 {key: value}（缺失的键视为 None）
+        """
+        self._batch_fn = batch_fn
+        self._cache: Dict[Hashable, asyncio.Future] = {}
+        self._queue: List[Hashable] = []
+        self._tasks: set = set()
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        """加载单个键（同一键只查询一次）"""
+        future = self._cache.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._cache[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(self._schedule_dispatch)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Any]:
+        """加载多个键（一次批量查询），返回与 keys 顺序一致的结果"""
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def clear(self, key: Optional[Hashable] = None):
+        """清除缓存（写入后需要重新读取时调用），key 为 None 时清除全部"""
+        if key is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(key, None)
+
+    def _schedule_dispatch(self):
+        keys, self._queue = self._queue, []
+        task = asyncio.ensure_future(self._dispatch(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, keys: List[Hashable]):
+        futures = [self._cache[key] for key in keys]
+        try:
+            results = await self._batch_fn(keys)
+        except Exception as e:
+            # 失败的键不缓存，后续调用重新查询
+            for key, future in zip(keys, futures):
+                if self._cache.get(key) is future:
+                    del self._cache[key]
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in zip(keys, futures):
+            if not future.done():
+                future.set_result(results.get(key))
+
+
+class RequestLoaders:
+    """单个请求内共享的 loader 集合（按名称和查询参数区分）"""
+
+    def __init__(self):
+        self._loaders: Dict[Hashable, BatchLoader] = {}
+
+    def get(self, name: Hashable, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]) -> BatchLoader:
+        """
+        获取（或创建）loader
+
+        Args:
+            name: loader 名称，包含键以外的查询参数，如 ("profile", platform)
+            batch_fn: 首次创建时使用的批量查询函数
+        """
+        loader = self._loaders.get(name)
+        if loader is None:
+            loader = self._loaders[name] = BatchLoader(batch_fn)
+        return loader
+
+
+_request_loaders: ContextVar[Optional[RequestLoaders]] = ContextVar("request_loaders", default=None)
+
+
+@contextmanager
+def request_scope():
+    """
+    在 with 块内（含其中创建的子任务）共享一组新的 loader
+
+    HTTP 请求由 RequestLoaderMiddleware 自动进入；脚本和后台任务在每个工作单元外手动使用，
+    退出作用域后缓存随之释放，长时间运行的任务不会一直读到旧数据。
+    """
+    token = _request_loaders.set(RequestLoaders())
+    try:
+        yield
+    finally:
+        _request_loaders.reset(token)
+
+
+def get_request_loaders() -> RequestLoaders:
+    """当前作用域的 loader 集合；不在 request_scope 内时返回一组新的 loader（只供本次调用使用）"""
+    return _request_loaders.get() or RequestLoaders()
+
+
+class RequestLoaderMiddleware:
+    """ASGI 中间件：每个 HTTP 请求一组新的 loader（流式响应在同一作用域内完成）"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope():
+            await self.app(scope, receive, send)
+
+
+# =====================================================
+# 常用查询
+# =====================================================
+
+def _fields_key(fields: Optional[List[str]]) -> Optional[tuple]:
+    return tuple(sorted(fields)) if fields else None
+
+
+def _profile_loader(platform: str) -> BatchLoader:
+    return get_request_loaders().get(
+        ("profile", platform),
+        lambda keys: AsyncUserProfileRepository().get_by_user_ids(keys, platform)
+    )
+
+
+def load_profile(user_id: str, platform: str = "xiaohongshu") -> Awaitable[Optional[Dict[str, Any]]]:
+    """用户档案（AsyncUserProfileRepository.get_by_user_id）"""
+    return _profile_loader(platform).load(user_id)
+
+
+async def load_profiles(user_ids: List[str], platform: str = "xiaohongshu") -> List[Optional[Dict[str, Any]]]:
+    """多个用户档案（一次查询，不在作用域内时也是），顺序与 user_ids 一致"""
+    return await _profile_loader(platform).load_many(user_ids)
+
+
+def load_snapshot(
+    user_id: str,
+    platform: str = "xiaohongshu",
+    fields: Optional[List[str]] = None
+) -> Awaitable[Optional[Dict[str, Any]]]:
+    """笔记快照（AsyncUserSnapshotRepository.get_by_user_id）"""
+    return get_request_loaders().get(
+        ("snapshot", platform, _fields_key(fields)),
+        lambda keys: AsyncUserSnapshotRepository().get_by_user_ids(keys, platform, fields)
+    ).load(user_id)
+
+
+def load_embedding(
+    user_id: str,
+    platform: str = "xiaohongshu",
+    dimension: Optional[int] = None
+) -> Awaitable[Optional[Dict[str, Any]]]:
+    """用户 embedding（embedding 字段已解码为 np.ndarray）"""
+    return get_request_loaders().get(
+        ("embedding", platform, dimension),
+        lambda keys: AsyncUserEmbeddingRepository().get_by_user_ids(keys, platform, dimension)
+    ).load(user_id)
+
+
+def load_network_node_by_name(
+    name: str,
+    platform: str = "xiaohongshu",
+    fields: Optional[List[str]] = None
+) -> Awaitable[Optional[Dict[str, Any]]]:
+    """最新网络版本中的创作者节点（AsyncCreatorNetworkRepository.get_node_by_name）"""
+    return get_request_loaders().get(
+        ("network_node_by_name", platform, _fields_key(fields)),
+        lambda keys: AsyncCreatorNetworkRepository().get_nodes_by_names(keys, platform, fields)
+    ).load(name)
+
+
+def load_recent_notes(
+    user_id: str,
+    platform: str = "xiaohongshu",
+    fields: Optional[List[str]] = None,
+    limit: int = 20,
+    since: Optional[int] = None
+) -> Awaitable[List[Dict[str, Any]]]:
+    """创作者最新的 limit 条笔记（AsyncNoteRepository.get_notes(sort="latest")）"""
+    return get_request_loaders().get(
+        ("recent_notes", platform, _fields_key(fields), limit, since),
+        lambda keys: AsyncNoteRepository().get_recent_notes_map(keys, platform, fields, limit, since)
+    ).load(user_id)
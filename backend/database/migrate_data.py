@@ -215,23 +215,20 @@ class DataMigration:
                 network_data = json.load(f)
             
             # 检查是否已存在最新网络
-            existing = self.network_repo.get_latest_network()
+            existing = self.network_repo.count({"platform": "xiaohongshu"})
             if existing:
                 print("⚠️  已存在网络数据，是否覆盖？(y/n)")
                 # 为了自动化，这里默认跳过
                 print("⚠️  跳过迁移（已存在）")
                 return
             
-            # 准备数据
-            mongo_data = {
-                "platform": "xiaohongshu",
-                "network_data": network_data,
-                "created_at": datetime.now()
-            }
-            
-            # 插入数据库
-            doc_id = self.network_repo.create_network(mongo_data)
-            print(f"✅ 创作者网络迁移成功 (ID: {doc_id})")
+            # 插入数据库（按节点/边规范化存储）
+            version = self.network_repo.create_network_version(
+                "xiaohongshu",
+                network_data.get("creators", []),
+                network_data.get("edges", network_data.get("creatorEdges", []))
+            )
+            print(f"✅ 创作者网络迁移成功 (版本: {version})")
             print(f"   - 创作者数: {len(network_data.get('creators', []))}")
             print(f"   - 关系数: {len(network_data.get('edges', []))}")
             
@@ -0,0 +1,166 @@
+"""
+连接池监控 - 基于 PyMongo 的 CMAP 事件统计连接取用等待时间
+每个客户端（api / batch，同步 / Motor）注册一个监听器，
+通过 get_pool_stats() 读取：取用次数、等待时间分位数、等待中的请求数、占用中的连接数和失败原因，
+用于按真实并发调整 MONGO_*_MAX_POOL_SIZE 和 MONGO_EXECUTOR_WORKERS。
+"""
+
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict
+
+from pymongo import monitoring
+
+
+# 计算分位数时保留的最近等待样本数
+RECENT_SAMPLES = 1000
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    单个客户端的连接池统计
+
+    取用连接在调用线程内同步完成（Motor 在其工作线程内完成），
+    因此用线程局部变量记录开始时间，在 checked_out / check_out_failed 时计算等待时长。
+    """
+
+    def __init__(self, name: str, max_pool_size: int):
+        self.name = name
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recent = deque(maxlen=RECENT_SAMPLES)
+        self.checkouts = 0
+        self.failures: Counter = Counter()
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.open_connections = 0
+        self.pool_clears = 0
+
+    def _end_wait(self) -> float:
+        start = getattr(self._local, "start", None)
+        self._local.start = None
+        return time.perf_counter() - start if start is not None else 0.0
+
+    # ------------------------------------------------------------------
+    # 连接取用
+    # ------------------------------------------------------------------
+
+    def connection_check_out_started(self, event):
+        self._local.start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_checked_out(self, event):
+        wait = self._end_wait()
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent.append(wait)
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def connection_check_out_failed(self, event):
+        self._end_wait()
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            self.failures[str(event.reason)] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    # ------------------------------------------------------------------
+    # 连接与连接池生命周期
+    # ------------------------------------------------------------------
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计
+
+        Returns:
+            {max_pool_size, open_connections, in_use, max_in_use, waiting, max_waiting,
+             checkouts, avg_wait_ms, p50_wait_ms, p95_wait_ms, p99_wait_ms, max_wait_ms, failures, pool_clears}
+        """
+        with self._lock:
+            recent = sorted(self._recent)
+            checkouts = self.checkouts
+
+            def percentile(q: float) -> float:
+                if not recent:
+                    return 0.0
+                return round(recent[min(len(recent) - 1, int(q * len(recent)))] * 1000, 2)
+
+            return {
+                "max_pool_size": self.max_pool_size,
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "waiting": self.waiting,
+                "max_waiting": self.max_waiting,
+                "checkouts": checkouts,
+                "avg_wait_ms": round(self.total_wait / checkouts * 1000, 2) if checkouts else 0.0,
+                "p50_wait_ms": percentile(0.50),
+                "p95_wait_ms": percentile(0.95),
+                "p99_wait_ms": percentile(0.99),
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "failures": dict(self.failures),
+                "pool_clears": self.pool_clears,
+            }
+
+
+_listeners: Dict[str, PoolMetrics] = {}
+_listeners_lock = threading.Lock()
+
+
+def get_pool_listener(name: str, max_pool_size: int) -> PoolMetrics:
+    """获取（或创建）某个客户端的连接池监听器，name 如 api、api:async、batch"""
+    with _listeners_lock:
+        listener = _listeners.get(name)
+        if listener is None:
+            listener = _listeners[name] = PoolMetrics(name, max_pool_size)
+        return listener
+
+
+def get_pool_stats() -> Dict[str, Dict[str, Any]]:
+    """
+    获取本进程所有客户端的连接池统计
+
+    Returns:
+        {client_name: PoolMetrics.get_stats()}
+    """
+    with _listeners_lock:
+        listeners = list(_listeners.values())
+    return {listener.name: listener.get_stats() for listener in listeners}
@@ -3,12 +3,13 @@ Repository Pattern - 数据访问层
 统一封装MongoDB的CRUD操作
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from pymongo.database import Database
 from pymongo.collection import Collection
 
 from .connection import get_database
+from .vector_codec import encode_vector, decode_embedding_field
 from .models import (
     PlatformType,
     UserProfile,
@@ -160,6 +161,10 @@ class UserProfileRepository(BaseRepository):
 # 2. User Snapshot Repository
 # =====================================================
 
+# 增量采集时需要同步更新的笔记互动计数字段
+NOTE_COUNTER_FIELDS = ("likes", "collected_count", "comments_count", "share_count")
+
+
 class UserSnapshotRepository(BaseRepository):
     """用户笔记快照仓库"""
     
@@ -198,7 +203,7 @@ class UserSnapshotRepository(BaseRepository):
     
     def create_snapshot(self, snapshot_data: Dict[str, Any]) -> str:
         """
-        创建笔记快照
+        创建笔记快照（同时写入 notes 并刷新 creator_stats）
         
         Args:
             snapshot_data: 快照数据
@@ -207,11 +212,16 @@ class UserSnapshotRepository(BaseRepository):
             插入的文档ID
         """
         snapshot_data['created_at'] = datetime.now()
-        return self.insert_one(snapshot_data)
+        doc_id = self.insert_one(snapshot_data)
+        if 'notes' in snapshot_data:
+            platform = snapshot_data.get('platform', 'xiaohongshu')
+            NoteRepository().replace_user_notes(snapshot_data['user_id'], platform, snapshot_data['notes'])
+            CreatorStatsRepository().refresh_from_notes(snapshot_data['user_id'], platform, snapshot_data['notes'])
+        return doc_id
     
     def update_snapshot(self, user_id: str, platform: str, notes: List[Dict[str, Any]]) -> bool:
         """
-        更新笔记快照
+        更新笔记快照（同时写入 notes 并刷新 creator_stats）
         
         Args:
             user_id: 用户ID
@@ -221,10 +231,100 @@ class UserSnapshotRepository(BaseRepository):
         Returns:
             是否更新成功
         """
-        return self.update_one(
+        updated = self.update_one(
             {"user_id": user_id, "platform": platform},
             {"notes": notes, "total_notes": len(notes), "updated_at": datetime.now()}
         )
+        NoteRepository().replace_user_notes(user_id, platform, notes)
+        CreatorStatsRepository().refresh_from_notes(user_id, platform, notes)
+        return updated
+    
+    def get_known_note_ids(self, user_id: str, platform: str = "xiaohongshu") -> set:
+        """
+        获取已保存的笔记ID（增量采集时用于判断何时停止翻页）
+        
+        Returns:
+            笔记ID集合；没有快照时为空集合
+        """
+        snapshot = self.collection.find_one(
+            {"user_id": user_id, "platform": platform},
+            {"notes.id": 1, "_id": 0}
+        )
+        return {n["id"] for n in (snapshot or {}).get("notes", []) if n.get("id")}
+    
+    def merge_notes(self, user_id: str, platform: str, fetched_notes: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        增量合并笔记（同时写入 notes 并刷新 creator_stats）
+        
+        只把新笔记插入到 notes 数组开头，已有笔记只更新变化了的互动计数，
+        不再整体覆盖 notes 数组。没有快照时直接创建。
+        
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            fetched_notes: 本次采集到的笔记（按发布时间倒序）
+            
+        Returns:
+            {new, updated, total}
+        """
+        from pymongo import UpdateOne
+        
+        snapshot = self.collection.find_one({"user_id": user_id, "platform": platform}, {"notes": 1})
+        if not snapshot:
+            self.create_snapshot({
+                "platform": platform,
+                "user_id": user_id,
+                "notes": fetched_notes,
+                "total_notes": len(fetched_notes)
+            })
+            return {"new": len(fetched_notes), "updated": 0, "total": len(fetched_notes)}
+        
+        notes = snapshot.get("notes", [])
+        existing = {n.get("id"): n for n in notes if n.get("id")}
+        new_notes = []
+        changed = {}
+        changed_notes = []
+        for note in fetched_notes:
+            note_id = note.get("id")
+            if not note_id:
+                continue
+            old = existing.get(note_id)
+            if old is None:
+                new_notes.append(note)
+                existing[note_id] = note
+                continue
+            diff = {f: note[f] for f in NOTE_COUNTER_FIELDS if f in note and note[f] != old.get(f)}
+            if diff:
+                changed[note_id] = diff
+                changed_notes.append(note)
+                old.update(diff)
+        
+        notes = new_notes + notes
+        now = datetime.now()
+        query = {"user_id": user_id, "platform": platform}
+        operations = [
+            UpdateOne(
+                {**query, "notes.id": note_id},
+                {"$set": {f"notes.$.{field}": value for field, value in diff.items()}}
+            )
+            for note_id, diff in changed.items()
+        ]
+        # 逐条插入到开头（从最早的一条开始），已存在的笔记跳过：
+        # 同一创作者的两次刷新（如 refresh_creator_data 与 refresh_all_users）重叠时不会重复插入
+        operations.extend(
+            UpdateOne(
+                {**query, "notes.id": {"$ne": note["id"]}},
+                {"$push": {"notes": {"$each": [note], "$position": 0}}}
+            )
+            for note in reversed(new_notes)
+        )
+        operations.append(UpdateOne(query, [{"$set": {"total_notes": {"$size": "$notes"}, "updated_at": now}}]))
+        self.collection.bulk_write(operations, ordered=True)
+        
+        if new_notes or changed:
+            NoteRepository().upsert_notes(user_id, platform, new_notes + changed_notes)
+            CreatorStatsRepository().refresh_from_notes(user_id, platform, notes)
+        return {"new": len(new_notes), "updated": len(changed), "total": len(notes)}
 
 
 # =====================================================
@@ -246,9 +346,9 @@ class UserEmbeddingRepository(BaseRepository):
             platform: 平台类型
             
         Returns:
-            embedding数据 or None
+            embedding数据 or None（embedding 字段已解码为 np.ndarray）
         """
-        return self.find_one({"user_id": user_id, "platform": platform})
+        return decode_embedding_field(self.find_one({"user_id": user_id, "platform": platform}))
     
     def get_all_embeddings(self, platform: Optional[str] = None) -> List[Dict[str, Any]]:
         """
@@ -261,7 +361,7 @@ class UserEmbeddingRepository(BaseRepository):
             embedding列表
         """
         query = {"platform": platform} if platform else {}
-        return self.find_many(query)
+        return [decode_embedding_field(doc) for doc in self.find_many(query)]
     
     def create_embedding(self, embedding_data: Dict[str, Any]) -> str:
         """
@@ -274,6 +374,8 @@ class UserEmbeddingRepository(BaseRepository):
             插入的文档ID
         """
         embedding_data['created_at'] = datetime.now()
+        if embedding_data.get('embedding') is not None:
+            embedding_data['embedding'] = encode_vector(embedding_data['embedding'])
         return self.insert_one(embedding_data)
     
     def update_embedding(self, user_id: str, platform: str, embedding: List[float]) -> bool:
@@ -290,7 +392,7 @@ class UserEmbeddingRepository(BaseRepository):
         """
         return self.update_one(
             {"user_id": user_id, "platform": platform},
-            {"embedding": embedding, "updated_at": datetime.now()}
+            {"embedding": encode_vector(embedding), "updated_at": datetime.now()}
         )
 
 
@@ -299,45 +401,451 @@ class UserEmbeddingRepository(BaseRepository):
 # =====================================================
 
 class CreatorNetworkRepository(BaseRepository):
-    """创作者网络仓库"""
-    
+    """
+    创作者网络仓库
+
+    网络按版本（network_version，毫秒时间戳）规范化存储：
+    - creator_networks:        每个版本一条清单文档（状态、节点数、边数、构建参数）
+    - creator_network_nodes:   每个创作者一条节点文档
+    - creator_network_edges:   每条连边一条文档
+    读取单个节点 / 自我中心网络 / 分页节点时无需加载整张图。
+    旧的单文档格式（network_data.creators / edges）仍可读取，作为兼容回退。
+    """
+
+    # 节点文档中的内部字段，返回给调用方前去掉
+    _NODE_INTERNAL = {"_id": 0, "network_version": 0, "platform": 0}
+    _EDGE_INTERNAL = {"_id": 0, "network_version": 0, "platform": 0}
+    # 保留的历史版本数量（当前版本 + 上一个版本，保证读取中的请求不受重建影响）
+    KEEP_VERSIONS = 2
+    _BATCH_SIZE = 1000
+
     def __init__(self):
         super().__init__("creator_networks")
-    
-    def get_latest_network(self, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
+        self.nodes: Collection = self.db["creator_network_nodes"]
+        self.edges: Collection = self.db["creator_network_edges"]
+
+    # ------------------------------------------------------------------
+    # 版本管理
+    # ------------------------------------------------------------------
+
+    def get_latest_version(self, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
         """
-        获取最新的创作者网络
-        
+        获取最新的已完成版本清单
+
         Args:
             platform: 平台类型
-            
+
         Returns:
-            网络数据 or None
+            {network_version, node_count, edge_count, similarity_threshold, top_k, created_at, updated_at} or None
         """
-        # 优化：只投影需要的字段，避免读取整个大文档
-        result = self.collection.find_one(
-            {"platform": platform},
+        return self.collection.find_one(
+            {"platform": platform, "network_version": {"$exists": True}, "status": "ready"},
+            {"network_data": 0},
+            sort=[("network_version", -1)]
+        )
+
+    def _resolve_version(self, platform: str, version: Optional[int]) -> Optional[int]:
+        if version is not None:
+            return version
+        manifest = self.get_latest_version(platform)
+        return manifest["network_version"] if manifest else None
+
+    def create_network_version(
+        self,
+        platform: str,
+        creators: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> int:
+        """
+        写入一个新的网络版本：先写节点和边，全部写完后再把清单标记为 ready，
+        读取方在切换之前一直读到上一个完整版本
+
+        Args:
+            platform: 平台类型
+            creators: 节点列表
+            edges: 连边列表
+            meta: 额外写入清单的构建参数（如 similarity_threshold, top_k）
+
+        Returns:
+            新版本号
+        """
+        latest = self.collection.find_one(
+            {"platform": platform, "network_version": {"$exists": True}},
+            {"network_version": 1},
+            sort=[("network_version", -1)]
+        )
+        version = int(datetime.now().timestamp() * 1000)
+        if latest and latest["network_version"] >= version:
+            version = latest["network_version"] + 1
+
+        now = datetime.now()
+        self.collection.insert_one({
+            "platform": platform,
+            "network_version": version,
+            "status": "building",
+            "node_count": len(creators),
+            "edge_count": len(edges),
+            **(meta or {}),
+            "created_at": now,
+            "updated_at": now,
+        })
+
+        stamp = {"network_version": version, "platform": platform}
+        for i in range(0, len(creators), self._BATCH_SIZE):
+            self.nodes.insert_many([{**c, **stamp} for c in creators[i:i + self._BATCH_SIZE]], ordered=False)
+        for i in range(0, len(edges), self._BATCH_SIZE):
+            self.edges.insert_many([{**e, **stamp} for e in edges[i:i + self._BATCH_SIZE]], ordered=False)
+
+        self.collection.update_one(
+            {"platform": platform, "network_version": version},
+            {"$set": {"status": "ready", "updated_at": datetime.now()}}
+        )
+        self.prune_versions(platform)
+        return version
+
+    def prune_versions(self, platform: str, keep: Optional[int] = None) -> int:
+        """
+        删除过旧的版本（以及旧的单文档格式网络）
+
+        Args:
+            platform: 平台类型
+            keep: 保留的最新版本数，默认 KEEP_VERSIONS
+
+        Returns:
+            删除的版本数
+        """
+        keep = keep or self.KEEP_VERSIONS
+        versions = [
+            doc["network_version"] for doc in self.collection.find(
+                {"platform": platform, "network_version": {"$exists": True}, "status": "ready"},
+                {"network_version": 1}
+            ).sort("network_version", -1)
+        ]
+        if not versions:
+            return 0
+
+        stale = versions[keep:]
+        # 比最旧的保留版本还早、且没完成的构建（中途失败）一并清理
+        oldest_kept = versions[:keep][-1]
+        stale_query = {"platform": platform, "$or": [
+            {"network_version": {"$in": stale}},
+            {"network_version": {"$lt": oldest_kept}, "status": {"$ne": "ready"}},
+            {"network_version": {"$exists": False}},
+        ]}
+        stale_versions = [
+            doc["network_version"] for doc in self.collection.find(stale_query, {"network_version": 1})
+            if "network_version" in doc
+        ]
+        if stale_versions:
+            self.nodes.delete_many({"network_version": {"$in": stale_versions}})
+            self.edges.delete_many({"network_version": {"$in": stale_versions}})
+        result = self.collection.delete_many(stale_query)
+        return result.deleted_count
+
+    def touch_version(self, platform: str, version: int, node_delta: int = 0, edge_delta: int = 0):
+        """增量修改后更新清单的 updated_at 和计数"""
+        self.collection.update_one(
+            {"platform": platform, "network_version": version},
             {
-                "network_data": 1,
-                "created_at": 1,
-                "platform": 1
-            },
+                "$set": {"updated_at": datetime.now()},
+                "$inc": {"node_count": node_delta, "edge_count": edge_delta}
+            }
+        )
+
+    # ------------------------------------------------------------------
+    # 节点 / 边查询
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _node_projection(cls, fields: Optional[List[str]] = None) -> Dict[str, Any]:
+        if fields:
+            projection = {f: 1 for f in fields}
+            projection.update({"id": 1, "_id": 0})
+            return projection
+        return dict(cls._NODE_INTERNAL)
+
+    def get_node(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取单个创作者节点
+
+        Args:
+            user_id: 创作者用户ID（节点 id）
+            platform: 平台类型
+            fields: 只返回指定字段（如不需要 indexSeries 时可省去大字段）
+            version: 网络版本，默认最新版本
+
+        Returns:
+            节点数据 or None
+        """
+        version = self._resolve_version(platform, version)
+        if version is None:
+            return self._legacy_find_node(platform, "id", user_id)
+        return self.nodes.find_one({"network_version": version, "id": user_id}, self._node_projection(fields))
+
+    def get_node_by_name(
+        self,
+        name: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        根据创作者昵称获取节点
+
+        Args:
+            name: 创作者昵称
+            platform: 平台类型
+            fields: 只返回指定字段
+            version: 网络版本，默认最新版本
+
+        Returns:
+            节点数据 or None
+        """
+        version = self._resolve_version(platform, version)
+        if version is None:
+            return self._legacy_find_node(platform, "name", name)
+        return self.nodes.find_one({"network_version": version, "name": name}, self._node_projection(fields))
+
+    def get_nodes(
+        self,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """获取某版本的全部节点（建议通过 fields 排除 indexSeries 等大字段）"""
+        version = self._resolve_version(platform, version)
+        if version is None:
+            legacy = self._legacy_network(platform)
+            return legacy.get("creators", []) if legacy else []
+        return list(self.nodes.find({"network_version": version}, self._node_projection(fields)))
+
+    def get_nodes_page(
+        self,
+        platform: str = "xiaohongshu",
+        limit: int = 100,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        version: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        按节点 id 分页获取节点（keyset 分页，不使用 skip）
+
+        Args:
+            platform: 平台类型
+            limit: 每页数量
+            after: 上一页最后一个节点的 id
+            fields: 只返回指定字段
+            version: 网络版本，默认最新版本
+
+        Returns:
+            {nodes, next_cursor, network_version}
+        """
+        version = self._resolve_version(platform, version)
+        if version is None:
+            page = self._legacy_page(self._legacy_network(platform), limit, after)
+        else:
+            query: Dict[str, Any] = {"network_version": version}
+            if after:
+                query["id"] = {"$gt": after}
+            page = list(
+                self.nodes.find(query, self._node_projection(fields)).sort("id", 1).limit(limit)
+            )
+        next_cursor = page[-1]["id"] if len(page) == limit else None
+        return {"nodes": page, "next_cursor": next_cursor, "network_version": version}
+
+    def get_ego_network(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        limit: int = 0,
+        version: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        获取某创作者的自我中心网络（该节点、相邻节点和相连的边）
+
+        Args:
+            user_id: 创作者用户ID
+            platform: 平台类型
+            fields: 相邻节点只返回指定字段
+            limit: 最多返回的相邻边数（按权重降序），0 表示全部
+            version: 网络版本，默认最新版本
+
+        Returns:
+            {node, neighbors, edges} or None（节点不存在）
+        """
+        version = self._resolve_version(platform, version)
+        if version is None:
+            return self._legacy_ego(self._legacy_network(platform), user_id, limit)
+
+        node = self.nodes.find_one({"network_version": version, "id": user_id}, self._node_projection(fields))
+        if not node:
+            return None
+
+        cursor = self.edges.find(
+            {"network_version": version, "$or": [{"source": user_id}, {"target": user_id}]},
+            self._EDGE_INTERNAL
+        ).sort("weight", -1)
+        if limit > 0:
+            cursor = cursor.limit(limit)
+        edges = list(cursor)
+
+        neighbor_ids = [e["target"] if e["source"] == user_id else e["source"] for e in edges]
+        neighbors = list(self.nodes.find(
+            {"network_version": version, "id": {"$in": neighbor_ids}},
+            self._node_projection(fields)
+        )) if neighbor_ids else []
+        return {"node": node, "neighbors": neighbors, "edges": edges}
+
+    def get_full_network(self, platform: str = "xiaohongshu", version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        获取完整网络（前端绘制全图时使用）
+
+        Returns:
+            {creators, edges, network_version, created_at} or None
+        """
+        manifest = None
+        if version is None:
+            manifest = self.get_latest_version(platform)
+            version = manifest["network_version"] if manifest else None
+        if version is None:
+            legacy = self._legacy_network(platform)
+            if not legacy:
+                return None
+            return {**legacy, "network_version": None}
+
+        return {
+            "creators": list(self.nodes.find({"network_version": version}, self._NODE_INTERNAL)),
+            "edges": list(self.edges.find({"network_version": version}, self._EDGE_INTERNAL)),
+            "network_version": version,
+            "created_at": manifest.get("created_at") if manifest else None,
+        }
+
+    def get_network_creator_ids(self, version: int) -> List[str]:
+        """获取某版本所有创作者节点的ID"""
+        return [doc["id"] for doc in self.nodes.find({"network_version": version}, {"id": 1, "_id": 0})]
+
+    # ------------------------------------------------------------------
+    # 增量修改
+    # ------------------------------------------------------------------
+
+    def append_creator(self, platform: str, version: int, node: Dict[str, Any], edges: List[Dict[str, Any]]) -> bool:
+        """
+        向某版本追加一个创作者节点及其连边
+
+        Args:
+            platform: 平台类型
+            version: 网络版本
+            node: 创作者节点
+            edges: 该节点的连边
+
+        Returns:
+            是否写入成功
+        """
+        stamp = {"network_version": version, "platform": platform}
+        self.nodes.insert_one({**node, **stamp})
+        if edges:
+            self.edges.insert_many([{**e, **stamp} for e in edges], ordered=False)
+        self.touch_version(platform, version, node_delta=1, edge_delta=len(edges))
+        return True
+
+    def remove_creator(self, platform: str, version: int, user_id: str) -> bool:
+        """从某版本中移除一个创作者节点及其所有连边"""
+        removed = self.nodes.delete_many({"network_version": version, "id": user_id}).deleted_count
+        removed_edges = self.edges.delete_many({
+            "network_version": version,
+            "$or": [{"source": user_id}, {"target": user_id}]
+        }).deleted_count
+        self.touch_version(platform, version, node_delta=-removed, edge_delta=-removed_edges)
+        return removed > 0
+
+    # ------------------------------------------------------------------
+    # 兼容旧格式
+    # ------------------------------------------------------------------
+
+    def _legacy_network(self, platform: str) -> Optional[Dict[str, Any]]:
+        """读取旧的单文档格式网络（尚未执行 normalize_creator_networks.py 时）"""
+        doc = self.collection.find_one(
+            {"platform": platform, "network_data": {"$exists": True}},
+            {"network_data": 1, "created_at": 1},
             sort=[("created_at", -1)]
         )
-        return result
-    
-    def create_network(self, network_data: Dict[str, Any]) -> str:
+        return self._legacy_from_doc(doc)
+
+    def _legacy_find_node(self, platform: str, key: str, value: str) -> Optional[Dict[str, Any]]:
+        return self._legacy_node(self._legacy_network(platform), key, value)
+
+    # 以下纯函数与 AsyncCreatorNetworkRepository 共用
+
+    @staticmethod
+    def _legacy_from_doc(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not doc:
+            return None
+        network_data = doc.get("network_data", {})
+        return {
+            "creators": network_data.get("creators", []),
+            "edges": network_data.get("creatorEdges", network_data.get("edges", [])),
+            "created_at": doc.get("created_at"),
+        }
+
+    @staticmethod
+    def _legacy_node(legacy: Optional[Dict[str, Any]], key: str, value: str) -> Optional[Dict[str, Any]]:
+        if not legacy:
+            return None
+        return next((c for c in legacy["creators"] if c.get(key) == value), None)
+
+    @staticmethod
+    def _legacy_page(legacy: Optional[Dict[str, Any]], limit: int, after: Optional[str]) -> List[Dict[str, Any]]:
+        nodes = sorted(legacy.get("creators", []) if legacy else [], key=lambda c: c.get("id", ""))
+        if after:
+            nodes = [c for c in nodes if c.get("id", "") > after]
+        return nodes[:limit]
+
+    @staticmethod
+    def _legacy_ego(legacy: Optional[Dict[str, Any]], user_id: str, limit: int) -> Optional[Dict[str, Any]]:
+        if not legacy:
+            return None
+        node = next((c for c in legacy.get("creators", []) if c.get("id") == user_id), None)
+        if not node:
+            return None
+        edges = [
+            e for e in legacy.get("edges", [])
+            if e.get("source") == user_id or e.get("target") == user_id
+        ]
+        edges.sort(key=lambda e: e.get("weight", 0), reverse=True)
+        edges = edges[:limit] if limit > 0 else edges
+        neighbor_ids = {e["target"] if e["source"] == user_id else e["source"] for e in edges}
+        neighbors = [c for c in legacy.get("creators", []) if c.get("id") in neighbor_ids]
+        return {"node": node, "neighbors": neighbors, "edges": edges}
+
+    def get_latest_network(self, platform: str = "xiaohongshu") -> Optional[Dict[str, Any]]:
         """
-        创建创作者网络
-        
+        获取最新的创作者网络（兼容旧调用方的单文档结构）
+
+        注意：会加载整张图，只需要单个节点时请使用 get_node / get_node_by_name / get_ego_network
+
         Args:
-            network_data: 网络数据
-            
+            platform: 平台类型
+
         Returns:
-            插入的文档ID
+            {platform, network_data: {creators, edges}, created_at} or None
         """
-        network_data['created_at'] = datetime.now()
-        return self.insert_one(network_data)
+        network = self.get_full_network(platform)
+        if not network:
+            return None
+        return {
+            "platform": platform,
+            "network_data": {"creators": network["creators"], "edges": network["edges"]},
+            "network_version": network.get("network_version"),
+            "created_at": network.get("created_at"),
+        }
 
 
 # =====================================================
@@ -421,11 +929,11 @@ class NoteEmbeddingRepository(BaseRepository):
 
     def get_by_note_id(self, note_id: str) -> Optional[Dict[str, Any]]:
         """根据笔记ID获取embedding"""
-        return self.find_one({"note_id": note_id})
+        return decode_embedding_field(self.find_one({"note_id": note_id}))
 
     def get_by_user_id(self, user_id: str) -> List[Dict[str, Any]]:
         """获取某用户所有笔记的embedding"""
-        return self.find_many({"user_id": user_id})
+        return [decode_embedding_field(doc) for doc in self.find_many({"user_id": user_id})]
 
     def get_all_embeddings(self, limit: int = 0) -> List[Dict[str, Any]]:
         """获取所有笔记embedding（用于搜索时的批量加载）"""
@@ -434,21 +942,72 @@ class NoteEmbeddingRepository(BaseRepository):
             "embedding": 1, "likes": 1, "collected_count": 1,
             "comments_count": 1, "share_count": 1, "engagement_score": 1,
             "nickname": 1, "avatar": 1, "note_create_time": 1,
+            "created_at": 1, "updated_at": 1,
             "_id": 0
         }
         cursor = self.collection.find({}, projection)
         if limit > 0:
             cursor = cursor.limit(limit)
-        return list(cursor)
+        return [decode_embedding_field(doc) for doc in cursor]
+
+    def get_embeddings_since(self, since: datetime) -> List[Dict[str, Any]]:
+        """
+        获取某时间点之后新增或修改的笔记embedding（用于增量刷新内存缓存）
+
+        Args:
+            since: 高水位时间，返回 updated_at >= since 的文档
+
+        Returns:
+            笔记embedding列表（字段与 get_all_embeddings 一致）
+        """
+        projection = {
+            "note_id": 1, "user_id": 1, "title": 1, "desc": 1,
+            "embedding": 1, "likes": 1, "collected_count": 1,
+            "comments_count": 1, "share_count": 1, "engagement_score": 1,
+            "nickname": 1, "avatar": 1, "note_create_time": 1,
+            "created_at": 1, "updated_at": 1,
+            "_id": 0
+        }
+        cursor = self.collection.find({"updated_at": {"$gte": since}}, projection)
+        return [decode_embedding_field(doc) for doc in cursor]
+
+    def get_vectors(
+        self,
+        user_id: Optional[str] = None,
+        note_ids: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        一次查询批量获取向量：某用户的全部笔记 + 指定的笔记（两个条件取并集）
+
+        Args:
+            user_id: 用户ID，返回该用户全部笔记的向量
+            note_ids: 笔记ID列表，返回这些笔记的向量
+
+        Returns:
+            [{note_id, user_id, embedding(np.ndarray)}]
+        """
+        conditions = []
+        if user_id:
+            conditions.append({"user_id": user_id})
+        if note_ids:
+            conditions.append({"note_id": {"$in": list(note_ids)}})
+        if not conditions:
+            return []
+        query = conditions[0] if len(conditions) == 1 else {"$or": conditions}
+        projection = {"note_id": 1, "user_id": 1, "embedding": 1, "_id": 0}
+        return [decode_embedding_field(doc) for doc in self.collection.find(query, projection)]
 
     def get_all_embeddings_only(self) -> List[Dict[str, Any]]:
         """仅获取note_id和embedding向量（轻量查询，用于内存搜索）"""
         projection = {"note_id": 1, "embedding": 1, "_id": 0}
-        return list(self.collection.find({}, projection))
+        return [decode_embedding_field(doc) for doc in self.collection.find({}, projection)]
 
     def upsert_note_embedding(self, note_data: Dict[str, Any]) -> bool:
         """插入或更新笔记embedding"""
         note_data["created_at"] = datetime.now()
+        note_data["updated_at"] = note_data["created_at"]
+        if note_data.get("embedding") is not None:
+            note_data["embedding"] = encode_vector(note_data["embedding"])
         result = self.collection.update_one(
             {"note_id": note_data["note_id"]},
             {"$set": note_data},
@@ -461,10 +1020,14 @@ class NoteEmbeddingRepository(BaseRepository):
         from pymongo import UpdateOne
         if not notes:
             return 0
+        now = datetime.now()
+        for n in notes:
+            if n.get("embedding") is not None:
+                n["embedding"] = encode_vector(n["embedding"])
         operations = [
             UpdateOne(
                 {"note_id": n["note_id"]},
-                {"$set": {**n, "created_at": datetime.now()}},
+                {"$set": {**n, "created_at": now, "updated_at": now}},
                 upsert=True
             )
             for n in notes
@@ -548,3 +1111,438 @@ class PlatformConfigRepository(BaseRepository):
             {"platform": platform},
             update_data
         )
+
+
+# =====================================================
+# 8. Creator Stats Repository
+# =====================================================
+
+class CreatorStatsRepository(BaseRepository):
+    """
+    创作者统计物化视图仓库（creator_stats）
+
+    每个创作者一条小文档：笔记数、总互动、最近30天互动和互动指数序列。
+    在写入笔记（UserSnapshotRepository.create_snapshot / update_snapshot）时同步刷新，
+    列表类接口只需读取 O(创作者数) 的小文档，而不是遍历所有笔记。
+    """
+
+    # 列表接口常用字段（不含 index_series）
+    SUMMARY_FIELDS = [
+        "user_id", "note_count", "total_engagement", "total_likes", "total_collects",
+        "total_comments", "total_shares", "recent", "last_note_time", "updated_at"
+    ]
+
+    def __init__(self):
+        super().__init__("creator_stats")
+
+    def refresh_from_notes(self, user_id: str, platform: str, notes: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        根据创作者当前的全部笔记重新计算并写入统计
+
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            notes: 该创作者的全部笔记
+
+        Returns:
+            写入的统计数据
+        """
+        from core.note_stats import build_creator_stats
+
+        stats = build_creator_stats(notes)
+        stats["updated_at"] = datetime.now()
+        self.collection.update_one(
+            {"user_id": user_id, "platform": platform},
+            {"$set": stats, "$setOnInsert": {"created_at": stats["updated_at"]}},
+            upsert=True
+        )
+        return stats
+
+    def get_by_user_id(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """获取单个创作者的统计"""
+        projection = {f: 1 for f in fields} if fields else {}
+        projection["_id"] = 0
+        return self.collection.find_one({"user_id": user_id, "platform": platform}, projection)
+
+    def get_stats_map(
+        self,
+        platform: str = "xiaohongshu",
+        user_ids: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        批量获取创作者统计
+
+        Args:
+            platform: 平台类型
+            user_ids: 只获取指定创作者，None 表示全部
+            fields: 返回字段，默认 SUMMARY_FIELDS（不含 index_series）
+
+        Returns:
+            {user_id: stats}
+        """
+        query: Dict[str, Any] = {"platform": platform}
+        if user_ids is not None:
+            query["user_id"] = {"$in": list(user_ids)}
+        projection = {f: 1 for f in (fields or self.SUMMARY_FIELDS)}
+        projection.update({"user_id": 1, "_id": 0})
+        return {doc["user_id"]: doc for doc in self.collection.find(query, projection)}
+
+
+# =====================================================
+# 9. Growth Opportunity Repository
+# =====================================================
+
+class GrowthOpportunityRepository(BaseRepository):
+    """
+    成长路径分析结果仓库（growth_opportunities）
+
+    每个 (我, 竞品, 分析参数) 一条文档，保存排序后的机会列表、LLM 建议和总结。
+    source_versions 记录生成时双方 creator_stats.updated_at（笔记快照写入时刷新），
+    任意一方的快照变化后该结果即视为过期。
+    """
+
+    def __init__(self):
+        super().__init__("growth_opportunities")
+
+    @staticmethod
+    def make_key(
+        my_user_id: str,
+        competitor_user_id: str,
+        top_n: int,
+        min_engagement_index: float,
+        days: Optional[int],
+        platform: str = "xiaohongshu"
+    ) -> Dict[str, Any]:
+        """分析结果的唯一键"""
+        return {
+            "my_user_id": my_user_id,
+            "competitor_user_id": competitor_user_id,
+            "platform": platform,
+            "top_n": top_n,
+            "min_engagement_index": float(min_engagement_index),
+            "days": days,
+        }
+
+    def get_result(self, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """获取已保存的分析结果（make_key 生成的键）"""
+        return self.collection.find_one(key, {"_id": 0})
+
+    def save_result(
+        self,
+        key: Dict[str, Any],
+        result: Dict[str, Any],
+        source_versions: Dict[str, Any]
+    ) -> bool:
+        """
+        保存分析结果
+
+        Args:
+            key: make_key 生成的键
+            result: analyze_growth_opportunities 的返回值
+            source_versions: {user_id: creator_stats.updated_at}
+
+        Returns:
+            是否写入成功
+        """
+        now = datetime.now()
+        update = self.collection.update_one(
+            key,
+            {
+                "$set": {"result": result, "source_versions": source_versions, "computed_at": now},
+                "$setOnInsert": {"created_at": now},
+            },
+            upsert=True
+        )
+        return update.upserted_id is not None or update.modified_count > 0
+
+    def get_computed_pairs(self, my_user_id: str, platform: str = "xiaohongshu") -> List[Dict[str, Any]]:
+        """获取某创作者已保存的全部分析结果的键、来源版本和计算时间（不含结果正文）"""
+        return list(self.collection.find(
+            {"my_user_id": my_user_id, "platform": platform},
+            {"result": 0, "_id": 0}
+        ))
+
+
+# =====================================================
+# 10. Note Repository
+# =====================================================
+
+class NoteRepository(BaseRepository):
+    """
+    单条笔记仓库（notes）
+
+    每条笔记一个文档（原始笔记字段 + user_id / platform / note_id / engagement），
+    由 UserSnapshotRepository 写快照时同步写入。读取方按需分页、投影和排序，
+    不再需要把 user_snapshots 的整个 notes 数组取回来。
+    尚未回填（scripts/backfill_notes.py）的创作者回退到快照读取。
+    """
+
+    # 排序方式 → 排序字段（均倒序，note_id 作为并列时的次序；都有对应的复合索引）
+    SORT_FIELDS = {
+        "latest": "create_time",
+        "engagement": "engagement",
+    }
+
+    def __init__(self):
+        super().__init__("notes")
+
+    @staticmethod
+    def to_document(user_id: str, platform: str, note: Dict[str, Any]) -> Dict[str, Any]:
+        """把采集到的笔记转换为 notes 文档（engagement 为加权互动分，用于排序）"""
+        from core.note_stats import weighted_engagement
+
+        doc = {k: v for k, v in note.items() if k != "_id"}
+        doc.update({
+            "user_id": user_id,
+            "platform": platform,
+            "note_id": note.get("id") or note.get("note_id"),
+            "create_time": note.get("create_time") or 0,
+            "engagement": weighted_engagement(note),
+        })
+        return doc
+
+    def upsert_notes(self, user_id: str, platform: str, notes: List[Dict[str, Any]]) -> int:
+        """
+        批量写入笔记（已存在的按 note_id 覆盖）
+
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            notes: 采集到的笔记
+
+        Returns:
+            新增或修改的笔记数
+        """
+        from pymongo import UpdateOne
+
+        now = datetime.now()
+        operations = []
+        for note in notes:
+            doc = self.to_document(user_id, platform, note)
+            if not doc["note_id"]:
+                continue
+            doc["updated_at"] = now
+            operations.append(UpdateOne(
+                {"platform": platform, "note_id": doc["note_id"]},
+                {"$set": doc, "$setOnInsert": {"created_at": now}},
+                upsert=True
+            ))
+        if not operations:
+            return 0
+        result = self.collection.bulk_write(operations, ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def replace_user_notes(self, user_id: str, platform: str, notes: List[Dict[str, Any]]) -> int:
+        """
+        用完整的笔记列表替换该创作者的笔记（删除列表中已不存在的笔记）
+
+        Returns:
+            新增或修改的笔记数
+        """
+        changed = self.upsert_notes(user_id, platform, notes)
+        note_ids = [n.get("id") or n.get("note_id") for n in notes]
+        self.collection.delete_many({
+            "user_id": user_id,
+            "platform": platform,
+            "note_id": {"$nin": [i for i in note_ids if i]}
+        })
+        return changed
+
+    def get_notes(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        sort: str = "latest",
+        limit: int = 0,
+        skip: int = 0,
+        since: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        分页获取创作者的笔记
+
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            fields: 返回字段，None 表示全部
+            sort: 排序方式 latest（发布时间倒序）/ engagement（加权互动分倒序）
+            limit: 返回条数，0 表示不限
+            skip: 跳过条数
+            since: 只返回该时间戳（秒）之后发布的笔记
+
+        Returns:
+            笔记列表
+        """
+        field = self.SORT_FIELDS.get(sort, "create_time")
+        cursor = self.collection.find(
+            self._query(user_id, platform, since), self._projection(fields)
+        ).sort([(field, -1), ("note_id", -1)])
+        if skip:
+            cursor = cursor.skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        notes = list(cursor)
+        if notes or skip or self.has_notes(user_id, platform):
+            return notes
+
+        notes = self._snapshot_notes(user_id, platform, fields, since, field)
+        return notes[skip:skip + limit] if limit else notes[skip:]
+
+    def get_notes_page(
+        self,
+        user_id: str,
+        platform: str = "xiaohongshu",
+        fields: Optional[List[str]] = None,
+        sort: str = "latest",
+        limit: int = 20,
+        after: Optional[str] = None,
+        since: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        分页获取创作者的笔记（keyset 分页，不使用 skip，翻到任意深度代价相同）
+
+        Args:
+            user_id: 用户ID
+            platform: 平台类型
+            fields: 返回字段，None 表示全部
+            sort: 排序方式 latest / engagement
+            limit: 每页数量
+            after: 上一页返回的 next_cursor
+            since: 只返回该时间戳（秒）之后发布的笔记
+
+        Returns:
+            {notes, next_cursor}；没有下一页时 next_cursor 为 None
+
+        Raises:
+            ValueError: cursor 格式错误
+        """
+        field = self.SORT_FIELDS.get(sort, "create_time")
+        position = self.parse_cursor(after) if after else None
+        query, projection = self._page_query(user_id, platform, fields, since, field, position)
+        page = list(
+            self.collection.find(query, projection).sort([(field, -1), ("note_id", -1)]).limit(limit)
+        )
+        if not page and not self.has_notes(user_id, platform):
+            page = self._snapshot_notes(user_id, platform, fields, since, field)
+            page = self._page_after(page, field, position)[:limit]
+        return {"notes": page, "next_cursor": self._next_cursor(page, limit, field)}
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[int, str]:
+        """解析 get_notes_page 返回的 next_cursor（排序字段值:note_id）"""
+        value, sep, note_id = cursor.partition(":")
+        if not sep or not note_id:
+            raise ValueError(f"无效的分页游标: {cursor}")
+        try:
+            return int(value), note_id
+        except ValueError:
+            raise ValueError(f"无效的分页游标: {cursor}")
+
+    def count_notes(self, user_id: str, platform: str = "xiaohongshu", since: Optional[int] = None) -> int:
+        """统计创作者的笔记数（since 同 get_notes）"""
+        count = self.collection.count_documents(self._query(user_id, platform, since))
+        if count or self.has_notes(user_id, platform):
+            return count
+        return len(self._snapshot_notes(user_id, platform, ["id"], since))
+
+    def has_notes(self, user_id: str, platform: str = "xiaohongshu") -> bool:
+        """该创作者的笔记是否已写入 notes 集合"""
+        return self.collection.find_one({"user_id": user_id, "platform": platform}, {"_id": 1}) is not None
+
+    def _snapshot_notes(
+        self,
+        user_id: str,
+        platform: str,
+        fields: Optional[List[str]],
+        since: Optional[int],
+        field: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """未回填时从 user_snapshots 读取（只投影需要的笔记字段，见 _notes_from_snapshot）"""
+        snapshot = self.db.user_snapshots.find_one(
+            {"user_id": user_id, "platform": platform}, self._snapshot_projection(fields)
+        )
+        return self._notes_from_snapshot(snapshot, since, field)
+
+    # 以下纯函数与 AsyncNoteRepository 共用
+
+    @staticmethod
+    def _query(user_id: str, platform: str, since: Optional[int]) -> Dict[str, Any]:
+        query: Dict[str, Any] = {"user_id": user_id, "platform": platform}
+        if since is not None:
+            query["create_time"] = {"$gte": since}
+        return query
+
+    @staticmethod
+    def _projection(fields: Optional[List[str]]) -> Dict[str, Any]:
+        projection = {f: 1 for f in fields} if fields else {}
+        projection["_id"] = 0
+        return projection
+
+    @classmethod
+    def _page_query(
+        cls,
+        user_id: str,
+        platform: str,
+        fields: Optional[List[str]],
+        since: Optional[int],
+        field: str,
+        position: Optional[Tuple[int, str]]
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """keyset 分页的查询条件和投影（排在 position 之后的笔记）"""
+        query = cls._query(user_id, platform, since)
+        if position:
+            value, note_id = position
+            query["$or"] = [{field: {"$lt": value}}, {field: value, "note_id": {"$lt": note_id}}]
+        projection = cls._projection(fields)
+        if fields:
+            projection.update({field: 1, "note_id": 1})
+        return query, projection
+
+    @staticmethod
+    def _page_after(
+        notes: List[Dict[str, Any]],
+        field: str,
+        position: Optional[Tuple[int, str]]
+    ) -> List[Dict[str, Any]]:
+        if not position:
+            return notes
+        return [n for n in notes if (n.get(field) or 0, n["note_id"]) < position]
+
+    @staticmethod
+    def _next_cursor(page: List[Dict[str, Any]], limit: int, field: str) -> Optional[str]:
+        if len(page) < limit or not page:
+            return None
+        last = page[-1]
+        return f"{last.get(field) or 0}:{last['note_id']}"
+
+    @staticmethod
+    def _snapshot_projection(fields: Optional[List[str]]) -> Dict[str, Any]:
+        base_fields = ["id", "create_time", "likes", "collected_count", "comments_count", "share_count"]
+        projection = {f"notes.{f}": 1 for f in (fields + base_fields)} if fields else {"notes": 1}
+        projection["_id"] = 0
+        return projection
+
+    @staticmethod
+    def _notes_from_snapshot(
+        snapshot: Optional[Dict[str, Any]],
+        since: Optional[int],
+        field: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """快照中的笔记转换为 notes 文档格式；指定 field 时按与 notes 集合相同的次序排序"""
+        from core.note_stats import weighted_engagement
+
+        notes = []
+        for note in (snapshot or {}).get("notes", []):
+            if since is not None and (note.get("create_time") or 0) < since:
+                continue
+            notes.append({**note, "note_id": note.get("id"), "engagement": weighted_engagement(note)})
+        if field:
+            notes = [n for n in notes if n.get("note_id")]
+            notes.sort(key=lambda n: (n.get(field) or 0, n["note_id"]), reverse=True)
+        return notes
@@ -0,0 +1,81 @@
+"""
+向量编解码 - Embedding 的紧凑二进制存储
+把向量存为 BSON Binary（小端 float32 / float16），代替 BSON 的 double 数组：
+- 512维向量从约 6KB（带类型标记和键名的 double 数组）降到 2KB（float32）/ 1KB（float16）
+- 读取时通过 np.frombuffer 直接解码，无需逐元素转换
+旧数据（list 格式）仍可被透明解码，迁移见 scripts/migrate_embeddings_binary.py
+"""
+
+from typing import Any, List, Optional, Union
+
+import numpy as np
+from bson.binary import Binary
+
+from core.config import settings
+
+
+# BSON Binary 的用户自定义 subtype（0x80-0xFF），用来区分存储精度
+FLOAT32_SUBTYPE = 0x80
+FLOAT16_SUBTYPE = 0x81
+
+_ENCODINGS = {
+    "float32": ("<f4", FLOAT32_SUBTYPE),
+    "float16": ("<f2", FLOAT16_SUBTYPE),
+}
+_SUBTYPE_DTYPES = {subtype: dtype for dtype, subtype in _ENCODINGS.values()}
+
+
+def encode_vector(vector: Any, dtype: Optional[str] = None) -> Union[Binary, List[float]]:
+    """
+    把向量编码为存储格式
+
+    Args:
+        vector: list / np.ndarray / 已编码的 Binary
+        dtype: float32, float16 或 list（保持旧格式），默认取 settings.EMBEDDING_STORAGE_DTYPE
+
+    Returns:
+        BSON Binary（或 dtype=list 时的 float 列表）
+    """
+    dtype = dtype or settings.EMBEDDING_STORAGE_DTYPE
+    if dtype == "list":
+        return decode_vector(vector).astype(np.float64).tolist()
+    if dtype not in _ENCODINGS:
+        raise ValueError(f"不支持的向量存储类型: {dtype}，可选: float32, float16, list")
+
+    np_dtype, subtype = _ENCODINGS[dtype]
+    if isinstance(vector, Binary) and vector.subtype == subtype:
+        return vector
+    return Binary(decode_vector(vector).astype(np_dtype).tobytes(), subtype)
+
+
+def decode_vector(value: Any) -> Optional[np.ndarray]:
+    """
+    把存储格式解码为 float32 向量
+
+    Args:
+        value: BSON Binary / bytes / list / np.ndarray
+
+    Returns:
+        一维 np.ndarray(float32)；value 为 None 时返回 None
+        注意：float32 二进制通过 np.frombuffer 零拷贝解码，返回的数组是只读的
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        subtype = getattr(value, "subtype", FLOAT32_SUBTYPE)
+        np_dtype = _SUBTYPE_DTYPES.get(subtype, "<f4")
+        vec = np.frombuffer(value, dtype=np_dtype)
+        return vec if np_dtype == "<f4" else vec.astype(np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def is_binary_vector(value: Any) -> bool:
+    """判断字段是否已经是二进制向量格式"""
+    return isinstance(value, Binary) and value.subtype in _SUBTYPE_DTYPES
+
+
+def decode_embedding_field(doc: Optional[dict], field: str = "embedding") -> Optional[dict]:
+    """原地解码文档中的向量字段（文档或字段不存在时原样返回）"""
+    if doc and doc.get(field) is not None:
+        doc[field] = decode_vector(doc[field])
+    return doc
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+把 user_snapshots 中的笔记回填到 notes 集合（每条笔记一个文档）
+
+新写入的快照会通过 UserSnapshotRepository 同步写入 notes，本脚本用于迁移已有数据。
+回填按创作者用快照中的完整笔记列表替换 notes 中的数据，可以重复执行。
+回填前读取方会回退到 user_snapshots（见 NoteRepository.get_notes）。
+
+运行方式：
+    python backend/scripts/create_indexes.py
+    python backend/scripts/backfill_notes.py
+    python backend/scripts/backfill_notes.py --user-id 5ff0e6410000000001008400
+    python backend/scripts/backfill_notes.py --only-missing
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加backend到路径
+project_root = Path(__file__).resolve().parent.parent.parent
+backend_path = project_root / "backend"
+sys.path.insert(0, str(backend_path))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / '.env')
+
+from database import UserSnapshotRepository, NoteRepository, use_client_profile
+
+
+def backfill(platform: str, user_id: str = None, only_missing: bool = False) -> dict:
+    """
+    逐个创作者回填笔记
+
+    Args:
+        platform: 平台
+        user_id: 只回填该创作者
+        only_missing: 跳过 notes 中已有笔记的创作者
+
+    Returns:
+        回填统计
+    """
+    snapshot_repo = UserSnapshotRepository()
+    note_repo = NoteRepository()
+
+    query = {"platform": platform}
+    if user_id:
+        query["user_id"] = user_id
+    user_ids = [doc["user_id"] for doc in snapshot_repo.collection.find(query, {"user_id": 1, "_id": 0})]
+    print(f"\n📦 共 {len(user_ids)} 个创作者快照")
+
+    stats = {"creators": 0, "skipped": 0, "notes": 0}
+    for i, uid in enumerate(user_ids, 1):
+        if only_missing and note_repo.has_notes(uid, platform):
+            stats["skipped"] += 1
+            continue
+        # 一次只读取一个创作者的 notes 数组，避免把所有快照同时加载到内存
+        snapshot = snapshot_repo.collection.find_one({"user_id": uid, "platform": platform}, {"notes": 1})
+        notes = (snapshot or {}).get("notes") or []
+        note_repo.replace_user_notes(uid, platform, notes)
+        stats["creators"] += 1
+        stats["notes"] += len(notes)
+        print(f"[{i}/{len(user_ids)}] ✅ {uid[:12]}: {len(notes)} 条笔记")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 user_snapshots 的笔记回填到 notes 集合")
+    parser.add_argument("--platform", default="xiaohongshu", help="平台")
+    parser.add_argument("--user-id", help="只回填该创作者")
+    parser.add_argument("--only-missing", action="store_true", help="跳过已回填的创作者")
+    args = parser.parse_args()
+    use_client_profile("batch")
+
+    print("=" * 60)
+    print("🔄 回填 notes 集合")
+    print("=" * 60)
+
+    t0 = time.time()
+    stats = backfill(args.platform, args.user_id, args.only_missing)
+
+    print("\n" + "=" * 60)
+    print(f"✅ 完成，耗时 {time.time() - t0:.1f}s")
+    print(f"   回填创作者: {stats['creators']}（笔记 {stats['notes']} 条）")
+    print(f"   已存在跳过: {stats['skipped']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
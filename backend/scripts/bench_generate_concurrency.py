@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+并发压测 /api/style/generate：验证多个生成请求在同一个 worker 内是并行执行的
+
+同时发出 N 个生成请求（每个主题带随机后缀，避免命中 LLM 缓存），
+并在生成期间持续探测 /api/health：
+- 并行：总耗时 ≈ 单个请求最长耗时，health 探测始终快速返回
+- 串行（事件循环被阻塞）：总耗时 ≈ 所有请求耗时之和，health 探测被卡住
+
+运行方式（先启动后端服务）：
+    python backend/scripts/bench_generate_concurrency.py --creator 某博主昵称
+    python backend/scripts/bench_generate_concurrency.py --creator 某博主昵称 -n 8 --base-url http://localhost:5001
+"""
+
+import time
+import uuid
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def generate_once(base_url: str, creator: str, topic: str, timeout: float) -> dict:
+    """
+    发送一次生成请求
+
+    Returns:
+        {start, end, ok, error}（时间为 perf_counter 秒）
+    """
+    start = time.perf_counter()
+    try:
+        resp = requests.post(
+            f"{base_url}/api/style/generate",
+            json={"creator_name": creator, "user_input": topic},
+            timeout=timeout
+        )
+        data = resp.json()
+        ok, error = bool(data.get("success")), data.get("error", "")
+    except Exception as e:
+        ok, error = False, str(e)
+    return {"start": start, "end": time.perf_counter(), "ok": ok, "error": error}
+
+
+def probe_health(base_url: str, stop: threading.Event, interval: float = 0.5) -> list:
+    """生成期间持续请求 /api/health，返回每次的延迟（秒）"""
+    latencies = []
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            requests.get(f"{base_url}/api/health", timeout=60)
+            latencies.append(time.perf_counter() - t0)
+        except Exception:
+            latencies.append(float("inf"))
+        stop.wait(interval)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发压测 /api/style/generate")
+    parser.add_argument("--base-url", default="http://localhost:5001", help="后端服务地址")
+    parser.add_argument("--creator", required=True, help="被模仿的创作者昵称")
+    parser.add_argument("--topic", default="周末在家做一顿简单的早午餐", help="生成主题")
+    parser.add_argument("-n", "--concurrency", type=int, default=5, help="并发请求数")
+    parser.add_argument("--timeout", type=float, default=120, help="单个请求超时（秒）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚀 并发生成压测: {args.concurrency} 个请求 → {args.base_url}")
+    print("=" * 60)
+
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=args.concurrency + 1) as pool:
+        health_future = pool.submit(probe_health, args.base_url, stop)
+
+        wall_start = time.perf_counter()
+        futures = [
+            pool.submit(
+                generate_once, args.base_url, args.creator,
+                f"{args.topic}（{uuid.uuid4().hex[:6]}）", args.timeout
+            )
+            for _ in range(args.concurrency)
+        ]
+        results = [f.result() for f in futures]
+        wall = time.perf_counter() - wall_start
+
+        stop.set()
+        health = health_future.result()
+
+    durations = [r["end"] - r["start"] for r in results]
+    for i, (r, d) in enumerate(zip(results, durations), 1):
+        status = "✅" if r["ok"] else f"❌ {r['error'][:60]}"
+        print(f"   #{i}: {r['start'] - wall_start:6.2f}s → {r['end'] - wall_start:6.2f}s  ({d:.2f}s) {status}")
+
+    # 重叠度：各请求耗时之和 / 总耗时，完全串行时约为 1，完全并行时约为 N
+    overlap = sum(durations) / wall if wall > 0 else 0
+    print("\n📊 结果")
+    print(f"   总耗时:       {wall:.2f}s")
+    print(f"   单请求最长:   {max(durations):.2f}s")
+    print(f"   单请求耗时和: {sum(durations):.2f}s")
+    print(f"   并发重叠度:   {overlap:.2f}x（理想值 {args.concurrency}x）")
+    if health:
+        print(f"   health 探测:  {len(health)} 次, 最大延迟 {max(health) * 1000:.0f}ms")
+
+    if overlap >= max(1.5, args.concurrency * 0.5):
+        print("\n✅ 请求并行执行，事件循环未被阻塞")
+    else:
+        print("\n⚠️  请求基本是串行执行的，检查是否有同步调用阻塞了事件循环")
+
+
+if __name__ == "__main__":
+    main()
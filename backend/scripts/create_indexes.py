@@ -9,6 +9,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from core.config import settings
 from database.connection import get_database
 
 
@@ -42,6 +43,21 @@ def create_indexes():
             "indexes": [
                 ("platform_version", [("platform", 1), ("version", -1)], {}),
                 ("created_at", [("created_at", -1)], {}),
+                ("platform_network_version", [("platform", 1), ("network_version", -1)], {}),
+            ]
+        },
+        {
+            "collection": "creator_network_nodes",
+            "indexes": [
+                ("version_id", [("network_version", 1), ("id", 1)], {"unique": True}),
+                ("version_name", [("network_version", 1), ("name", 1)], {}),
+            ]
+        },
+        {
+            "collection": "creator_network_edges",
+            "indexes": [
+                ("version_source_weight", [("network_version", 1), ("source", 1), ("weight", -1)], {}),
+                ("version_target_weight", [("network_version", 1), ("target", 1), ("weight", -1)], {}),
             ]
         },
         {
@@ -74,6 +90,50 @@ def create_indexes():
                 ("user_id", [("user_id", 1)], {}),
                 ("engagement_score", [("engagement_score", -1)], {}),
                 ("note_create_time", [("note_create_time", -1)], {}),
+                ("updated_at", [("updated_at", -1)], {}),
+            ]
+        },
+        {
+            "collection": "llm_cache",
+            "indexes": [
+                ("key", [("key", 1)], {"unique": True}),
+                # 由MongoDB自动删除过期的缓存（created_at 为UTC时间）
+                ("created_at_ttl", [("created_at", 1)], {"expireAfterSeconds": settings.LLM_CACHE_TTL_SECONDS}),
+            ]
+        },
+        {
+            "collection": "llm_semantic_cache",
+            "indexes": [
+                ("scope_namespace_created", [("scope", 1), ("namespace", 1), ("created_at", -1)], {}),
+                ("created_at_ttl", [("created_at", 1)], {"expireAfterSeconds": settings.LLM_CACHE_TTL_SECONDS}),
+            ]
+        },
+        {
+            "collection": "creator_stats",
+            "indexes": [
+                ("user_platform", [("user_id", 1), ("platform", 1)], {"unique": True}),
+                ("platform_engagement", [("platform", 1), ("total_engagement", -1)], {}),
+            ]
+        },
+        {
+            "collection": "growth_opportunities",
+            "indexes": [
+                ("pair_params", [
+                    ("my_user_id", 1), ("competitor_user_id", 1), ("platform", 1),
+                    ("top_n", 1), ("min_engagement_index", 1), ("days", 1)
+                ], {"unique": True}),
+                ("computed_at", [("computed_at", -1)], {}),
+            ]
+        },
+        {
+            "collection": "notes",
+            "indexes": [
+                ("platform_note_id", [("platform", 1), ("note_id", 1)], {"unique": True}),
+                # note_id 作为并列时的次序，支持 keyset 分页
+                ("user_create_time", [("user_id", 1), ("platform", 1), ("create_time", -1), ("note_id", -1)], {}),
+                ("user_engagement", [("user_id", 1), ("platform", 1), ("engagement", -1), ("note_id", -1)], {}),
+                # 网络构建时按时间窗口聚合所有创作者的近期互动
+                ("platform_create_time", [("platform", 1), ("create_time", -1)], {}),
             ]
         },
     ]
@@ -24,8 +24,9 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 import numpy as np
-from database.connection import get_database
+from database.connection import get_database, get_analytics_database, use_client_profile
 from core.config import settings
+from database.vector_codec import encode_vector
 
 
 def load_embedding_model():
@@ -156,8 +157,10 @@ def save_to_mongodb(db, notes: list, embeddings: list, force: bool = False):
         print(f"   已存在 {len(existing_ids)} 条，跳过")
 
     from pymongo import UpdateOne
+    from datetime import datetime
     operations = []
     skipped = 0
+    now = datetime.now()
 
     for note, emb in zip(notes, embeddings):
         if not force and note["note_id"] in existing_ids:
@@ -170,7 +173,8 @@ def save_to_mongodb(db, notes: list, embeddings: list, force: bool = False):
             "platform": "xiaohongshu",
             "title": note["title"],
             "desc": note["desc"],
-            "embedding": emb,
+            # 以 BSON Binary（float32 小端）存储，体积约为 double 数组的 1/3
+            "embedding": encode_vector(emb),
             "model": settings.EMBEDDING_MODEL,
             "dimension": settings.EMBEDDING_DIMENSION,
             "likes": note["likes"],
@@ -181,11 +185,13 @@ def save_to_mongodb(db, notes: list, embeddings: list, force: bool = False):
             "nickname": note["nickname"],
             "avatar": note["avatar"],
             "note_create_time": note["note_create_time"],
+            # 搜索服务按 updated_at 高水位做增量刷新
+            "updated_at": now,
         }
 
         operations.append(UpdateOne(
             {"note_id": note["note_id"]},
-            {"$set": doc, "$setOnInsert": {"created_at": __import__("datetime").datetime.now()}},
+            {"$set": doc, "$setOnInsert": {"created_at": now}},
             upsert=True
         ))
 
@@ -216,6 +222,7 @@ def create_note_indexes(db):
         ("user_id", [("user_id", 1)], {}),
         ("engagement_score_desc", [("engagement_score", -1)], {}),
         ("note_create_time_desc", [("note_create_time", -1)], {}),
+        ("updated_at_desc", [("updated_at", -1)], {}),
     ]
 
     for name, keys, opts in indexes:
@@ -245,11 +252,12 @@ def main():
 
     t_total = time.time()
 
-    # 1. 连接数据库
+    # 1. 连接数据库（离线脚本使用 batch 客户端配置）
+    use_client_profile("batch")
     db = get_database()
 
-    # 2. 提取笔记
-    notes = extract_notes_from_snapshots(db)
+    # 2. 提取笔记（只读全量扫描，走分析读偏好）
+    notes = extract_notes_from_snapshots(get_analytics_database())
     if not notes:
         print("\n⚠️  没有找到任何笔记，请先运行数据采集")
         return
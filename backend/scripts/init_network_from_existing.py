@@ -42,11 +42,9 @@ def check_and_init_network():
         print(f"  • {nickname:30} - 粉丝: {fans:>10,} - ID: {user_id[:16]}...")
     
     # 2. 检查网络数据
-    network = network_repo.collection.find_one({'platform': 'xiaohongshu'})
+    creators = network_repo.get_nodes('xiaohongshu', fields=['id'])
     
-    if network:
-        network_data = network.get('network_data', {})
-        creators = network_data.get('creators', [])
+    if creators:
         print(f"\n🌐 creator_networks: {len(creators)} 个创作者")
         
         # 检查是否匹配
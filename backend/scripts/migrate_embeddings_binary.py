@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+把已有的 embedding 从 BSON double 数组迁移为紧凑二进制格式（BSON Binary）
+
+note_embeddings / user_embeddings 的 embedding 字段原来是 list 存储，
+每个 512 维向量是 512 个带类型标记的 double，体积约为 float32 二进制的 3 倍。
+迁移后读取方通过 database.vector_codec.decode_vector 透明解码，无需改动。
+
+运行方式：
+    python backend/scripts/migrate_embeddings_binary.py --dry-run
+    python backend/scripts/migrate_embeddings_binary.py --dtype float32
+    python backend/scripts/migrate_embeddings_binary.py --collections note_embeddings --batch-size 1000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# 添加backend到路径
+project_root = Path(__file__).resolve().parent.parent.parent
+backend_path = project_root / "backend"
+sys.path.insert(0, str(backend_path))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / '.env')
+
+from pymongo import UpdateOne
+from database.connection import get_database, use_client_profile
+from database.vector_codec import encode_vector, is_binary_vector
+
+
+DEFAULT_COLLECTIONS = ["note_embeddings", "user_embeddings"]
+
+
+def migrate_collection(db, name: str, dtype: str, batch_size: int, dry_run: bool) -> dict:
+    """
+    迁移单个集合
+
+    Args:
+        db: 数据库实例
+        name: 集合名称
+        dtype: 目标存储格式（float32 / float16）
+        batch_size: 每批 bulk_write 的文档数
+        dry_run: 只统计不写入
+
+    Returns:
+        迁移统计
+    """
+    collection = db[name]
+    # 只处理仍是数组格式的文档，脚本可以重复执行
+    query = {"embedding": {"$type": "array"}}
+    pending = collection.count_documents(query)
+    print(f"\n📦 {name}: 待迁移 {pending} 条")
+
+    stats = {"pending": pending, "migrated": 0, "skipped": 0, "bytes_before": 0, "bytes_after": 0}
+    if pending == 0 or dry_run:
+        return stats
+
+    operations = []
+    t0 = time.time()
+    for doc in collection.find(query, {"_id": 1, "embedding": 1}).batch_size(batch_size):
+        vector = doc.get("embedding")
+        if not vector:
+            stats["skipped"] += 1
+            continue
+
+        encoded = encode_vector(vector, dtype)
+        if not is_binary_vector(encoded):
+            stats["skipped"] += 1
+            continue
+
+        # BSON double 数组：每个元素 1 字节类型 + 键名（"0".."511"）+ 结束符 + 8 字节值
+        stats["bytes_before"] += sum(len(str(i)) + 10 for i in range(len(vector)))
+        stats["bytes_after"] += len(encoded)
+        operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encoded}}))
+
+        if len(operations) >= batch_size:
+            stats["migrated"] += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+            print(f"   已迁移 {stats['migrated']}/{pending}")
+
+    if operations:
+        stats["migrated"] += collection.bulk_write(operations, ordered=False).modified_count
+
+    print(f"   ✅ 完成: 迁移 {stats['migrated']} 条, 跳过 {stats['skipped']} 条, "
+          f"耗时 {time.time() - t0:.1f}s")
+    if stats["bytes_before"]:
+        print(f"   💾 向量体积: {stats['bytes_before'] / 1024 / 1024:.1f}MB → "
+              f"{stats['bytes_after'] / 1024 / 1024:.1f}MB")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 embedding 迁移为 BSON Binary 存储")
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32",
+                        help="目标存储精度（默认 float32）")
+    parser.add_argument("--collections", nargs="+", default=DEFAULT_COLLECTIONS,
+                        help="需要迁移的集合")
+    parser.add_argument("--batch-size", type=int, default=500, help="每批写入数量")
+    parser.add_argument("--dry-run", action="store_true", help="只统计待迁移数量，不写入")
+    args = parser.parse_args()
+    use_client_profile("batch")
+
+    print("=" * 60)
+    print("🔄 Embedding 二进制存储迁移")
+    print("=" * 60)
+    print(f"   目标格式: {args.dtype}")
+    if args.dry_run:
+        print("   ⚠️  dry-run 模式，不会写入数据库")
+
+    db = get_database()
+    total = 0
+    for name in args.collections:
+        stats = migrate_collection(db, name, args.dtype, args.batch_size, args.dry_run)
+        total += stats["migrated"]
+
+    print("\n" + "=" * 60)
+    print(f"✅ 迁移结束，共更新 {total} 条文档")
+    print("   提示: 迁移后搜索服务会在下次全量刷新时加载新格式（或调用 /api/notes/cache/invalidate）")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+把旧的单文档创作者网络（creator_networks.network_data）拆分为规范化存储
+
+旧格式把所有节点（含 indexSeries）和连边放在一个文档里，会逼近 16MB 的 BSON 上限，
+且每次读取都要传输整张图。迁移后：
+- creator_networks:        版本清单（network_version）
+- creator_network_nodes:   每个创作者一个文档
+- creator_network_edges:   每条连边一个文档
+
+运行方式：
+    python backend/scripts/normalize_creator_networks.py
+    python backend/scripts/normalize_creator_networks.py --platform xiaohongshu --keep-legacy
+"""
+
+import sys
+import argparse
+from pathlib import Path
+
+# 添加backend到路径
+project_root = Path(__file__).resolve().parent.parent.parent
+backend_path = project_root / "backend"
+sys.path.insert(0, str(backend_path))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / '.env')
+
+from database import CreatorNetworkRepository
+
+
+def normalize_network(platform: str, keep_legacy: bool = False):
+    """把某平台最新的旧格式网络写成一个新版本"""
+    network_repo = CreatorNetworkRepository()
+
+    manifest = network_repo.get_latest_version(platform)
+    if manifest:
+        print(f"ℹ️  {platform} 已有规范化网络（版本 {manifest['network_version']}，"
+              f"{manifest.get('node_count', 0)} 个节点），跳过")
+        return
+
+    legacy = network_repo.collection.find_one(
+        {"platform": platform, "network_data": {"$exists": True}},
+        sort=[("created_at", -1)]
+    )
+    if not legacy:
+        print(f"⚠️  {platform} 没有旧格式的网络数据")
+        return
+
+    network_data = legacy.get("network_data", {})
+    creators = network_data.get("creators", [])
+    edges = network_data.get("creatorEdges", network_data.get("edges", []))
+    print(f"📦 旧网络: {len(creators)} 个创作者, {len(edges)} 条连接")
+
+    meta = {k: legacy[k] for k in ("similarity_threshold", "top_k") if k in legacy}
+    if keep_legacy:
+        # 写入前先把旧文档改名，避免新版本写入后被自动清理
+        network_repo.collection.update_one(
+            {"_id": legacy["_id"]},
+            {"$set": {"platform": f"{platform}__legacy"}}
+        )
+    version = network_repo.create_network_version(platform, creators, edges, meta=meta)
+    print(f"✅ 已写入版本 {version}")
+    if keep_legacy:
+        print(f"   旧文档保留为 platform={platform}__legacy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="创作者网络规范化迁移")
+    parser.add_argument("--platform", default="xiaohongshu", help="平台类型")
+    parser.add_argument("--keep-legacy", action="store_true", help="保留旧的单文档网络（改名备份）")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔄 创作者网络规范化迁移")
+    print("=" * 60)
+    normalize_network(args.platform, args.keep_legacy)
+
+
+if __name__ == "__main__":
+    main()
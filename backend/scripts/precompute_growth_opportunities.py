@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+预计算成长路径分析结果
+
+对网络中的每个创作者，取权重最高的前K个相邻创作者作为竞品，
+计算排序后的机会列表和LLM建议，写入 growth_opportunities 集合。
+接口直接读取这些结果；任意一方的笔记快照变化后结果会被判定为过期，
+由接口在后台刷新，也可以重新运行本脚本（只重算缺失或过期的结果）。
+
+运行方式：
+    python backend/scripts/precompute_growth_opportunities.py
+    python backend/scripts/precompute_growth_opportunities.py --neighbors 3 --concurrency 4
+    python backend/scripts/precompute_growth_opportunities.py --user-id 5ff0e6410000000001008400 --force
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# 添加backend到路径
+project_root = Path(__file__).resolve().parent.parent.parent
+backend_path = project_root / "backend"
+sys.path.insert(0, str(backend_path))
+
+from dotenv import load_dotenv
+load_dotenv(project_root / '.env')
+
+from core.config import settings
+from core.llm_gateway import shutdown_llm_gateway
+from database import CreatorNetworkRepository, request_scope, use_client_profile
+from api.services.growth_path_service import GrowthPathService
+
+
+def collect_pairs(platform: str, neighbors: int, user_id: str = None) -> list:
+    """
+    从创作者网络中收集 (我, 竞品) 对
+
+    Returns:
+        [(my_user_id, competitor_user_id)]
+    """
+    network_repo = CreatorNetworkRepository()
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = [node['id'] for node in network_repo.get_nodes(platform, fields=['id'])]
+
+    pairs = []
+    for uid in user_ids:
+        ego = network_repo.get_ego_network(uid, platform, fields=['id'], limit=neighbors)
+        if not ego:
+            continue
+        for neighbor in ego['neighbors']:
+            pairs.append((uid, neighbor['id']))
+    return pairs
+
+
+async def precompute(pairs: list, top_n: int, min_engagement: float, concurrency: int, force: bool) -> dict:
+    """并发计算缺失或过期的结果（LLM调用以批量优先级排队，不影响在线请求）"""
+    service = GrowthPathService()
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"computed": 0, "fresh": 0, "failed": 0}
+
+    async def run_one(i: int, my_user_id: str, competitor_user_id: str):
+        key = service.result_repo.make_key(my_user_id, competitor_user_id, top_n, min_engagement, None)
+        if not force:
+            doc = await service.result_repo.get_result(key)
+            if doc and not service.is_stale(doc, await service.get_source_versions([my_user_id, competitor_user_id])):
+                counts["fresh"] += 1
+                return
+
+        async with semaphore:
+            try:
+                # 每对创作者一个 loader 作用域：双方的档案和 embedding 各合并为一次查询
+                with request_scope():
+                    result = await service.compute_and_store(my_user_id, competitor_user_id, top_n, min_engagement)
+                counts["computed"] += 1
+                print(f"[{i}/{len(pairs)}] ✅ {my_user_id[:12]} → {competitor_user_id[:12]}: "
+                      f"{len(result.get('opportunities', []))} 个机会")
+            except Exception as e:
+                counts["failed"] += 1
+                print(f"[{i}/{len(pairs)}] ❌ {my_user_id[:12]} → {competitor_user_id[:12]}: {e}")
+
+    await asyncio.gather(*(run_one(i, my, comp) for i, (my, comp) in enumerate(pairs, 1)))
+    # 写入缓冲中的LLM使用统计
+    await shutdown_llm_gateway()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预计算成长路径分析结果")
+    parser.add_argument("--platform", default="xiaohongshu", help="平台")
+    parser.add_argument("--neighbors", type=int, default=settings.GROWTH_PRECOMPUTE_NEIGHBORS,
+                        help="每个创作者取前K个相邻创作者作为竞品")
+    parser.add_argument("--top-n", type=int, default=5, help="每对保存的机会数（与接口默认值一致才能命中）")
+    parser.add_argument("--min-engagement", type=float, default=1.0, help="爆款阈值（与接口默认值一致才能命中）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时分析的创作者对数")
+    parser.add_argument("--user-id", help="只计算该创作者")
+    parser.add_argument("--force", action="store_true", help="忽略未过期的结果，全部重新计算")
+    args = parser.parse_args()
+    use_client_profile("batch")
+
+    print("=" * 60)
+    print("📈 预计算成长路径分析结果")
+    print("=" * 60)
+
+    pairs = collect_pairs(args.platform, args.neighbors, args.user_id)
+    print(f"\n📥 共 {len(pairs)} 个创作者对（每个创作者最多 {args.neighbors} 个竞品）")
+    if not pairs:
+        print("⚠️  网络数据为空，请先生成创作者网络")
+        return
+
+    t0 = time.time()
+    counts = asyncio.run(precompute(pairs, args.top_n, args.min_engagement, args.concurrency, args.force))
+
+    print("\n" + "=" * 60)
+    print(f"✅ 完成，耗时 {time.time() - t0:.1f}s")
+    print(f"   重新计算: {counts['computed']}")
+    print(f"   未过期跳过: {counts['fresh']}")
+    print(f"   失败: {counts['failed']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
 """
-批量刷新用户数据 - 只刷新最近30天没笔记的账号
+批量刷新用户数据 - 默认只刷新最近30天没笔记的账号
+
+使用异步采集引擎：多个用户并发采集，所有请求共享连接池和全局限速。
+默认增量采集：翻页到已保存的笔记为止，只合并新笔记和变化的互动计数；--full 重新采集全部历史。
+
+运行方式：
+    python backend/scripts/refresh_all_users.py
+    python backend/scripts/refresh_all_users.py --all --concurrency 50 --rps 20
+    python backend/scripts/refresh_all_users.py --all --full
 """
 import sys
+import time
+import asyncio
+import argparse
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -10,22 +21,28 @@ sys.path.insert(0, str(project_root))
 collectors_path = project_root.parent / 'collectors' / 'xiaohongshu'
 sys.path.insert(0, str(collectors_path))
 
-from database.connection import get_database
-from collector import fetch_user_notes, fetch_user_info, save_to_mongodb
+from database.connection import get_database, use_client_profile
+from async_collector import AsyncTikHubCollector, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND
 
 
-def refresh_all_users():
-    """只刷新最近30天0笔记的账号"""
-    print("=" * 60)
-    print("🔄 刷新最近30天无笔记的账号")
-    print("=" * 60)
-    
+def select_users(refresh_all: bool = False) -> list:
+    """
+    选出需要刷新的账号
+
+    Args:
+        refresh_all: True 时返回全部账号，否则只返回最近30天0笔记的账号
+
+    Returns:
+        [(user_id, nickname)]
+    """
     db = get_database()
     snapshots = db['user_snapshots']
     profiles = db['user_profiles']
     
     # 获取所有用户
     all_profiles = list(profiles.find({}, {'user_id': 1, 'basic_info.nickname': 1}))
+    if refresh_all:
+        return [(p['user_id'], p.get('basic_info', {}).get('nickname', 'Unknown')) for p in all_profiles]
     
     # 计算30天前的时间戳
     cutoff_time = datetime.now() - timedelta(days=30)
@@ -37,7 +54,7 @@ def refresh_all_users():
         user_id = p.get('user_id')
         nickname = p.get('basic_info', {}).get('nickname', 'Unknown')
         
-        snapshot = snapshots.find_one({'user_id': user_id})
+        snapshot = snapshots.find_one({'user_id': user_id}, {'notes.create_time': 1})
         if snapshot:
             notes = snapshot.get('notes', [])
             recent_notes = [n for n in notes if n.get('create_time', 0) >= cutoff_ts]
@@ -45,39 +62,61 @@ def refresh_all_users():
                 to_refresh.append((user_id, nickname))
         else:
             to_refresh.append((user_id, nickname))
+    return to_refresh
+
+
+async def refresh_users(to_refresh: list, concurrency: int, rps: float, incremental: bool = True) -> list:
+    """并发采集并保存"""
+    nicknames = dict(to_refresh)
     
-    total = len(to_refresh)
-    print(f"\n✅ 需要刷新 {total} 个账号\n")
+    def on_done(i: int, total: int, result: dict):
+        nickname = nicknames.get(result['user_id'], 'Unknown')
+        if result['success']:
+            fans = (result.get('user_info') or {}).get('stats', {}).get('fans', 0)
+            print(f"[{i}/{total}] ✅ {nickname}: {len(result['notes'])}篇笔记, {fans:,}粉丝 ({result['seconds']:.1f}s)")
+        else:
+            print(f"[{i}/{total}] ❌ {nickname}: {result.get('error')}")
     
-    success = 0
-    fail = 0
+    async with AsyncTikHubCollector(requests_per_second=rps, max_connections=concurrency) as collector:
+        results = await collector.collect_users(
+            [user_id for user_id, _ in to_refresh], concurrency=concurrency,
+            incremental=incremental, on_done=on_done
+        )
+        print(f"\n📡 请求 {collector.stats['requests']} 次, 重试 {collector.stats['retries']} 次")
+    return results
+
+
+def refresh_all_users(refresh_all: bool = False, concurrency: int = DEFAULT_CONCURRENCY,
+                      rps: float = DEFAULT_REQUESTS_PER_SECOND, incremental: bool = True):
+    """刷新账号数据（默认只刷新最近30天0笔记的账号）"""
+    print("=" * 60)
+    print("🔄 刷新全部账号" if refresh_all else "🔄 刷新最近30天无笔记的账号")
+    print("=" * 60)
     
-    for i, (user_id, nickname) in enumerate(to_refresh, 1):
-        print(f"[{i}/{total}] 🔄 {nickname} ({user_id[:12]}...)")
-        
-        try:
-            # 获取最新数据
-            notes_result = fetch_user_notes(user_id)
-            notes = notes_result.get('notes', [])
-            
-            user_info = fetch_user_info(user_id)
-            fans = user_info.get('fans', 0)
-            
-            # 保存
-            save_to_mongodb(user_id, {'notes': notes, 'user_info': user_info})
-            
-            print(f"  ✅ {len(notes)}篇笔记, {fans:,}粉丝")
-            success += 1
-            
-        except Exception as e:
-            print(f"  ❌ {str(e)}")
-            fail += 1
+    to_refresh = select_users(refresh_all)
+    total = len(to_refresh)
+    mode = "增量" if incremental else "全量"
+    print(f"\n✅ 需要刷新 {total} 个账号（{mode}采集, 并发 {concurrency}, 限速 {rps} 请求/秒）\n")
+    if not to_refresh:
+        return
+    
+    t0 = time.time()
+    results = asyncio.run(refresh_users(to_refresh, concurrency, rps, incremental))
+    success = sum(1 for r in results if r['success'])
     
     print("\n" + "=" * 60)
     print(f"✅ 成功: {success}/{total}")
-    print(f"❌ 失败: {fail}/{total}")
+    print(f"❌ 失败: {total - success}/{total}")
+    print(f"⏱️  耗时: {time.time() - t0:.1f}s")
     print("=" * 60)
 
 
 if __name__ == "__main__":
-    refresh_all_users()
+    parser = argparse.ArgumentParser(description="批量刷新用户数据")
+    parser.add_argument("--all", action="store_true", help="刷新全部账号（默认只刷新最近30天无笔记的账号）")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时采集的用户数")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="TikHub 全局限速（请求/秒）")
+    parser.add_argument("--full", action="store_true", help="全量采集全部历史笔记并覆盖快照（默认增量）")
+    args = parser.parse_args()
+    use_client_profile("batch")
+    refresh_all_users(args.all, args.concurrency, args.rps, incremental=not args.full)
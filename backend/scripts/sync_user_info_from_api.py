@@ -6,78 +6,118 @@
 
 import os
 import sys
+import asyncio
+import argparse
 from pathlib import Path
 from datetime import datetime
-import time
-import random
 
 project_root = Path(__file__).resolve().parent.parent.parent
 backend_path = project_root / "backend"
 sys.path.insert(0, str(backend_path))
+sys.path.insert(0, str(project_root / "collectors" / "xiaohongshu"))
 
 from dotenv import load_dotenv
 load_dotenv(project_root / '.env')
 
-import requests
 from database import UserSnapshotRepository, UserProfileRepository
+from database.connection import run_in_db_executor
+from async_collector import AsyncTikHubCollector, DEFAULT_CONCURRENCY, DEFAULT_REQUESTS_PER_SECOND
 
-TIKHUB_API_URL = 'https://api.tikhub.io/api/v1/xiaohongshu/web_v2/fetch_user_info_app'
 TIKHUB_TOKEN = os.getenv('TIKHUB_TOKEN')
 
-headers = {
-    'accept': 'application/json',
-    'Authorization': f'Bearer {TIKHUB_TOKEN}',
-}
 
-
-def fetch_user_info(user_id: str) -> dict:
+def save_user_info(profile_repo: UserProfileRepository, user_id: str, user_info: dict) -> int:
     """
-    调用TikHub API获取用户详细信息
+    更新或创建profile（更新时保存历史stats用于计算增长）
     
     Returns:
-        包含basic_info, stats, tags的字典
+        更新后的历史记录条数（新建profile时为0）
     """
-    params = {'user_id': user_id}
+    existing_profile = profile_repo.get_by_user_id(user_id)
     
-    try:
-        response = requests.get(TIKHUB_API_URL, params=params, headers=headers)
-        response_data = response.json()
-        
-        if response.status_code != 200 or response_data.get('code') != 200:
-            print(f"  ❌ API错误: {response_data.get('message', '未知错误')}")
-            return None
+    if existing_profile:
+        # 更新现有profile，并保存历史stats用于计算增长
+        old_stats = existing_profile.get('stats', {})
         
-        data = response_data.get('data', {})
+        # 添加到历史记录（保留最近30条）
+        stats_history = existing_profile.get('stats_history', [])
+        if old_stats:
+            stats_history.append({
+                'timestamp': datetime.now(),
+                'fans': old_stats.get('fans', 0),
+                'follows': old_stats.get('follows', 0),
+                'total_liked': old_stats.get('total_liked', 0),
+                'total_collected': old_stats.get('total_collected', 0),
+                'note_count': old_stats.get('note_count', 0)
+            })
         
-        # 提取需要的数据
-        user_info = {
-            'basic_info': {
-                'nickname': data.get('nickname', ''),
-                'red_id': data.get('red_id', ''),
-                'desc': data.get('desc', ''),
-                'avatar': data.get('images', ''),
-                'gender': data.get('gender', 0),
-                'ip_location': data.get('ip_location', '')
-            },
-            'stats': {
-                'fans': data.get('fans', 0),
-                'follows': data.get('follows', 0),
-                'total_liked': data.get('liked', 0),
-                'total_collected': data.get('collected', 0),
-                'note_count': data.get('collected_notes_num', 0)
-            },
-            'tags': [tag.get('name') if isinstance(tag, dict) else str(tag) 
-                    for tag in data.get('tags', [])]
-        }
+        # 只保留最近30条历史记录
+        if len(stats_history) > 30:
+            stats_history = stats_history[-30:]
         
-        return user_info
+        profile_repo.collection.update_one(
+            {'user_id': user_id, 'platform': 'xiaohongshu'},
+            {
+                '$set': {
+                    'basic_info': user_info['basic_info'],
+                    'stats': user_info['stats'],
+                    'stats_history': stats_history,
+                    'tags': user_info['tags'],
+                    'synced_from_api_at': datetime.now(),
+                    'updated_at': datetime.now()
+                }
+            }
+        )
+        return len(stats_history)
+    
+    # 创建新profile
+    profile_repo.collection.insert_one({
+        'platform': 'xiaohongshu',
+        'user_id': user_id,
+        'basic_info': user_info['basic_info'],
+        'stats': user_info['stats'],
+        'tags': user_info['tags'],
+        'profile_data': {},  # 等待AI分析
+        'synced_from_api_at': datetime.now(),
+        'created_at': datetime.now(),
+        'updated_at': datetime.now()
+    })
+    return 0
+
+
+async def sync_profiles(user_ids: list, profile_repo: UserProfileRepository, concurrency: int, rps: float) -> int:
+    """并发获取用户信息并写入（请求共享连接池和全局限速）"""
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+    success = 0
+    
+    async with AsyncTikHubCollector(
+        requests_per_second=rps,
+        max_connections=concurrency,
+        token=f'Bearer {TIKHUB_TOKEN}'
+    ) as collector:
+        async def run_one(user_id: str):
+            nonlocal done, success
+            async with semaphore:
+                user_info = await collector.fetch_user_info(user_id)
+                history = None
+                if user_info:
+                    history = await run_in_db_executor(save_user_info, profile_repo, user_id, user_info)
+            done += 1
+            if user_info:
+                success += 1
+                nickname = user_info['basic_info']['nickname']
+                fans = user_info['stats']['fans']
+                action = f"已更新（历史记录: {history}条）" if history else "已创建"
+                print(f"[{done}/{len(user_ids)}] ✅ {nickname} - 粉丝数: {fans:,}, {action}")
+            else:
+                print(f"[{done}/{len(user_ids)}] ❌ {user_id[:16]}")
         
-    except Exception as e:
-        print(f"  ❌ 请求失败: {e}")
-        return None
+        await asyncio.gather(*(run_one(user_id) for user_id in user_ids))
+    return success
 
 
-def update_all_profiles():
+def update_all_profiles(concurrency: int = DEFAULT_CONCURRENCY, rps: float = DEFAULT_REQUESTS_PER_SECOND):
     """批量更新所有用户的profile信息"""
     
     print("="*60)
@@ -88,88 +128,11 @@ def update_all_profiles():
     profile_repo = UserProfileRepository()
     
     # 获取所有user_id
-    snapshots = list(snapshot_repo.collection.find({'platform': 'xiaohongshu'}))
-    print(f"\n📥 找到 {len(snapshots)} 个用户")
+    user_ids = [doc['user_id'] for doc in snapshot_repo.collection.find({'platform': 'xiaohongshu'}, {'user_id': 1})]
+    print(f"\n📥 找到 {len(user_ids)} 个用户（并发 {concurrency}, 限速 {rps} 请求/秒）")
     
-    success_count = 0
-    fail_count = 0
-    
-    for i, snapshot in enumerate(snapshots, 1):
-        user_id = snapshot['user_id']
-        
-        print(f"\n[{i}/{len(snapshots)}] 处理: {user_id[:16]}...")
-        
-        # 获取用户信息
-        user_info = fetch_user_info(user_id)
-        
-        if not user_info:
-            fail_count += 1
-            continue
-        
-        nickname = user_info['basic_info']['nickname']
-        fans = user_info['stats']['fans']
-        
-        print(f"  ✅ {nickname}")
-        print(f"  ✅ 粉丝数: {fans:,}")
-        
-        # 更新或创建profile
-        existing_profile = profile_repo.get_by_user_id(user_id)
-        
-        if existing_profile:
-            # 更新现有profile，并保存历史stats用于计算增长
-            old_stats = existing_profile.get('stats', {})
-            
-            # 添加到历史记录（保留最近30条）
-            stats_history = existing_profile.get('stats_history', [])
-            if old_stats:
-                stats_history.append({
-                    'timestamp': datetime.now(),
-                    'fans': old_stats.get('fans', 0),
-                    'follows': old_stats.get('follows', 0),
-                    'total_liked': old_stats.get('total_liked', 0),
-                    'total_collected': old_stats.get('total_collected', 0),
-                    'note_count': old_stats.get('note_count', 0)
-                })
-            
-            # 只保留最近30条历史记录
-            if len(stats_history) > 30:
-                stats_history = stats_history[-30:]
-            
-            profile_repo.collection.update_one(
-                {'user_id': user_id, 'platform': 'xiaohongshu'},
-                {
-                    '$set': {
-                        'basic_info': user_info['basic_info'],
-                        'stats': user_info['stats'],
-                        'stats_history': stats_history,
-                        'tags': user_info['tags'],
-                        'synced_from_api_at': datetime.now(),
-                        'updated_at': datetime.now()
-                    }
-                }
-            )
-            print(f"  ✅ 已更新profile（历史记录: {len(stats_history)}条）")
-        else:
-            # 创建新profile
-            profile_repo.collection.insert_one({
-                'platform': 'xiaohongshu',
-                'user_id': user_id,
-                'basic_info': user_info['basic_info'],
-                'stats': user_info['stats'],
-                'tags': user_info['tags'],
-                'profile_data': {},  # 等待AI分析
-                'synced_from_api_at': datetime.now(),
-                'created_at': datetime.now(),
-                'updated_at': datetime.now()
-            })
-            print(f"  ✅ 已创建profile")
-        
-        success_count += 1
-        
-        # 避免API限流
-        if i < len(snapshots):
-            delay = random.uniform(1.5, 3)
-            time.sleep(delay)
+    success_count = asyncio.run(sync_profiles(user_ids, profile_repo, concurrency, rps))
+    fail_count = len(user_ids) - success_count
     
     print(f"\n{'='*60}")
     print(f"✅ 完成！成功: {success_count}, 失败: {fail_count}")
@@ -185,4 +148,8 @@ def update_all_profiles():
 
 
 if __name__ == "__main__":
-    update_all_profiles()
+    parser = argparse.ArgumentParser(description="批量获取用户详细信息并更新user_profiles")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="同时请求的用户数")
+    parser.add_argument("--rps", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="TikHub 全局限速（请求/秒）")
+    args = parser.parse_args()
+    update_all_profiles(args.concurrency, args.rps)
@@ -2,11 +2,13 @@
 """
 计算并更新用户的互动统计数据到profile中
 这样刷新网络时就可以直接使用，不需要每次都从snapshots读取
+
+同时回填 creator_stats 物化视图（新写入的笔记会自动维护，这里用于补齐历史数据）
 """
 
 import sys
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # 添加backend到路径
 project_root = Path(__file__).resolve().parent.parent.parent
@@ -17,76 +19,7 @@ from dotenv import load_dotenv
 load_dotenv(project_root / '.env')
 
 from database.connection import get_database
-
-
-def calculate_note_stats(notes: list, days: int = 30) -> dict:
-    """
-    计算最近N天的笔记互动数据
-    """
-    if not notes:
-        return {
-            'total_engagement': 0,
-            'total_likes': 0,
-            'total_collects': 0,
-            'total_comments': 0,
-            'total_shares': 0,
-            'note_count': 0,
-            'index_series': []
-        }
-    
-    cutoff_time = datetime.now() - timedelta(days=days)
-    cutoff_timestamp = int(cutoff_time.timestamp())
-    recent_notes = [n for n in notes if n.get('create_time', 0) >= cutoff_timestamp]
-    
-    if not recent_notes:
-        return {
-            'total_engagement': 0,
-            'total_likes': 0,
-            'total_collects': 0,
-            'total_comments': 0,
-            'total_shares': 0,
-            'note_count': 0,
-            'index_series': []
-        }
-    
-    # 统计总互动数
-    total_likes = sum(n.get('likes', 0) for n in recent_notes)
-    total_collects = sum(n.get('collected_count', 0) for n in recent_notes)
-    total_comments = sum(n.get('comments_count', 0) for n in recent_notes)
-    total_shares = sum(n.get('share_count', 0) for n in recent_notes)
-    total_engagement = total_likes + total_collects + total_comments + total_shares
-    
-    # 生成index时间序列
-    sorted_notes = sorted(recent_notes, key=lambda x: x.get('create_time', 0))
-    index_series = []
-    
-    for note in sorted_notes:
-        create_time = note.get('create_time', 0)
-        if create_time > 0:
-            note_engagement = (
-                note.get('likes', 0) + 
-                note.get('collected_count', 0) + 
-                note.get('comments_count', 0) + 
-                note.get('share_count', 0)
-            )
-            # 转换为互动指数
-            index_value = note_engagement / 1000.0
-            index_series.append({
-                'ts': create_time * 1000,  # 毫秒时间戳
-                'value': round(index_value, 2),
-                'note_id': note.get('note_id', ''),
-                'title': note.get('title', '')[:30]  # 保存标题用于成长路径功能
-            })
-    
-    return {
-        'total_engagement': total_engagement,
-        'total_likes': total_likes,
-        'total_collects': total_collects,
-        'total_comments': total_comments,
-        'total_shares': total_shares,
-        'note_count': len(recent_notes),
-        'index_series': index_series
-    }
+from database import CreatorStatsRepository
 
 
 def update_profile_stats():
@@ -99,6 +32,7 @@ def update_profile_stats():
     print("=" * 60)
     
     db = get_database()
+    stats_repo = CreatorStatsRepository()
     
     # 获取所有用户profile
     print("\n📥 读取用户profile...")
@@ -136,8 +70,9 @@ def update_profile_stats():
             skipped += 1
             continue
         
-        # 计算统计数据
-        note_stats = calculate_note_stats(notes, days=30)
+        # 计算统计数据并回填 creator_stats
+        creator_stats = stats_repo.refresh_from_notes(user_id, 'xiaohongshu', notes)
+        note_stats = {**creator_stats['recent'], 'index_series': creator_stats['index_series']}
         
         # 更新profile.stats
         update_result = db.user_profiles.update_one(
@@ -17,8 +17,8 @@ collectors_path = project_root / "collectors" / "xiaohongshu"
 sys.path.insert(0, str(collectors_path))
 sys.path.insert(0, str(project_root / "backend"))
 
-from database import UserSnapshotRepository, UserProfileRepository
-from database.connection import get_database
+from database import AsyncUserSnapshotRepository, AsyncUserProfileRepository
+from database.connection import get_async_database
 
 
 class CollectorTask:
@@ -27,7 +27,7 @@ class CollectorTask:
     def __init__(self, user_id: str, task_id: str):
         self.user_id = user_id
         self.task_id = task_id
-        self.db = get_database()
+        self.db = get_async_database()
         self.task_logs = self.db.task_logs
         
     async def run(self) -> Dict[str, Any]:
@@ -43,8 +43,8 @@ class CollectorTask:
             
             # 2. 检查创作者是否已存在
             await self._update_progress("checking", 10, "检查创作者是否存在...")
-            profile_repo = UserProfileRepository()
-            existing = profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
+            profile_repo = AsyncUserProfileRepository()
+            existing = await profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
             
             if existing:
                 nickname = existing.get('basic_info', {}).get('nickname') or existing.get('nickname', self.user_id)
@@ -142,7 +142,7 @@ class CollectorTask:
             if not user_info:
                 return {"success": False, "error": "无法获取用户详细信息"}
             
-            # 3. 保存到MongoDB（新版collector需要这个格式）
+            # 3. 保存到MongoDB（新版collector需要这个格式；同步写入 notes / creator_stats，仍在线程池执行）
             data = {
                 'notes': notes,
                 'user_info': user_info
@@ -176,8 +176,8 @@ class CollectorTask:
             from collections import Counter
             
             # 获取snapshot
-            snapshot_repo = UserSnapshotRepository()
-            snapshot = snapshot_repo.get_by_user_id(self.user_id, "xiaohongshu")
+            snapshot_repo = AsyncUserSnapshotRepository()
+            snapshot = await snapshot_repo.get_by_user_id(self.user_id, "xiaohongshu")
             
             if not snapshot:
                 return {"success": False, "error": "未找到笔记数据"}
@@ -209,8 +209,8 @@ class CollectorTask:
             total_shares = sum(note.get('share_count', 0) for note in notes)
             
             # 创建或更新完整的profile
-            profile_repo = UserProfileRepository()
-            existing_profile = profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
+            profile_repo = AsyncUserProfileRepository()
+            existing_profile = await profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
             
             # 从snapshot获取user_info（第一个笔记的user字段）
             user_info = notes[0].get('user', {}) if notes else {}
@@ -249,7 +249,7 @@ class CollectorTask:
             
             if existing_profile:
                 # 更新现有profile
-                profile_repo.collection.update_one(
+                await profile_repo.collection.update_one(
                     {"user_id": self.user_id, "platform": "xiaohongshu"},
                     {"$set": {
                         "profile_data": profile_data,
@@ -271,14 +271,14 @@ class CollectorTask:
                     'created_at': datetime.now(),
                     'updated_at': datetime.now()
                 }
-                profile_repo.create_profile(profile_doc)
+                await profile_repo.create_profile(profile_doc)
                 print(f"✅ 创建profile: {nickname} - {', '.join(topics)}")
             
             # 生成embedding（基于话题的简单向量）
             await self._generate_embedding(topics)
             
             # 获取最终的profile
-            creator_data = profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
+            creator_data = await profile_repo.get_by_user_id(self.user_id, "xiaohongshu")
             
             return {
                 "success": True,
@@ -296,12 +296,12 @@ class CollectorTask:
     async def _generate_embedding(self, topics: list):
         """生成embedding向量（基于话题的简单向量）"""
         try:
-            from database import UserEmbeddingRepository
+            from database import AsyncUserEmbeddingRepository
             
-            embedding_repo = UserEmbeddingRepository()
+            embedding_repo = AsyncUserEmbeddingRepository()
             
             # 检查是否已存在
-            existing = embedding_repo.collection.find_one({
+            existing = await embedding_repo.collection.find_one({
                 'platform': 'xiaohongshu',
                 'user_id': self.user_id
             })
@@ -338,7 +338,7 @@ class CollectorTask:
                 'created_at': datetime.now()
             }
             
-            embedding_repo.create_embedding(embedding_doc)
+            await embedding_repo.create_embedding(embedding_doc)
             print(f"  ✅ 生成embedding向量 (384维)")
             
         except Exception as e:
@@ -359,7 +359,7 @@ class CollectorTask:
         if status in ["completed", "failed"]:
             update_data["finished_at"] = datetime.now()
         
-        self.task_logs.update_one(
+        await self.task_logs.update_one(
             {"task_id": self.task_id},
             {"$set": update_data},
             upsert=True
@@ -381,7 +381,7 @@ async def create_collector_task(user_id: str) -> Dict[str, Any]:
     import uuid
     
     task_id = f"add_creator_{uuid.uuid4().hex[:8]}"
-    db = get_database()
+    db = get_async_database()
     
     # 创建任务记录
     task_doc = {
@@ -397,7 +397,7 @@ async def create_collector_task(user_id: str) -> Dict[str, Any]:
         "updated_at": datetime.now()
     }
     
-    db.task_logs.insert_one(task_doc)
+    await db.task_logs.insert_one(task_doc)
     
     return {
         "task_id": task_id,
@@ -415,8 +415,8 @@ async def get_task_status(task_id: str) -> Optional[Dict[str, Any]]:
     Returns:
         任务状态字典
     """
-    db = get_database()
-    task = db.task_logs.find_one({"task_id": task_id}, {"_id": 0})
+    db = get_async_database()
+    task = await db.task_logs.find_one({"task_id": task_id}, {"_id": 0})
     
     if task:
         # 转换datetime为字符串
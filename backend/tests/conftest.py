@@ -0,0 +1,41 @@
+"""
+pytest 公共配置：把 backend 加入导入路径，并为必填配置项提供占位值
+（测试不连接真实的 MongoDB / DeepSeek，涉及外部服务的部分在用例内替换）
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """
+    用 mongomock / mongomock-motor 替换所有客户端配置的数据库（同步与 Motor 共享同一份数据）
+
+    Returns:
+        (同步 Database, Motor Database)
+    """
+    import mongomock
+    import mongomock_motor
+    from database import connection
+
+    client = mongomock.MongoClient()
+    async_client = mongomock_motor.AsyncMongoMockClient(mock_mongo_client=client)
+    db, async_db = client["test"], async_client["test"]
+    for profile in connection.CLIENT_PROFILES:
+        monkeypatch.setitem(connection._clients, profile, client)
+        monkeypatch.setitem(connection._databases, profile, db)
+        monkeypatch.setitem(connection._async_clients, profile, async_client)
+        monkeypatch.setitem(connection._async_databases, profile, async_db)
+    monkeypatch.setattr(connection, "_analytics_database", db)
+    return db, async_db
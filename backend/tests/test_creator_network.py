@@ -0,0 +1,83 @@
+"""
+CreatorNetworkBuilder 测试：网络节点的近期互动按构建时的 30 天窗口重新计算
+"""
+
+import time
+
+import mongomock
+import numpy as np
+import pytest
+
+from api.services.creator_network_service import CreatorNetworkBuilder
+from core.config import settings
+from database.vector_codec import encode_vector
+
+
+PLATFORM = "xiaohongshu"
+DAY = 86400
+
+
+def seed_creator(db, user_id: str, vector: np.ndarray, notes: list, stale_recent: dict):
+    db.user_profiles.insert_one({
+        "user_id": user_id, "platform": PLATFORM,
+        "basic_info": {"nickname": user_id}, "stats": {"fans": 100},
+    })
+    db.user_embeddings.insert_one({"user_id": user_id, "platform": PLATFORM, "embedding": encode_vector(vector)})
+    for note in notes:
+        db.notes.insert_one({**note, "user_id": user_id, "platform": PLATFORM, "note_id": note["id"]})
+    # 最后一次写入笔记时的 creator_stats（此后没有刷新）
+    db.creator_stats.insert_one({
+        "user_id": user_id, "platform": PLATFORM,
+        "recent": stale_recent, "index_series": [{"ts": 0, "value": 9.9}],
+        "last_note_time": max(n["create_time"] for n in notes),
+    })
+
+
+@pytest.fixture
+def builder(mongo_db):
+    db, _ = mongo_db
+    now = int(time.time())
+    rng = np.random.default_rng(0)
+    base = rng.standard_normal(settings.EMBEDDING_DIMENSION).astype(np.float32)
+    stale = {"days": 30, "total_engagement": 500, "total_likes": 500, "total_collects": 0,
+             "total_comments": 0, "total_shares": 0, "note_count": 5}
+
+    # 活跃：一条在窗口内，一条在窗口外
+    seed_creator(db, "active", base, [
+        {"id": "a1", "title": "新", "create_time": now - 2 * DAY, "likes": 10, "collected_count": 2,
+         "comments_count": 1, "share_count": 0},
+        {"id": "a0", "title": "旧", "create_time": now - 60 * DAY, "likes": 1000, "collected_count": 0,
+         "comments_count": 0, "share_count": 0},
+    ], stale)
+    # 停更：所有笔记早于窗口，但 creator_stats 仍是停更前的“最近30天”
+    seed_creator(db, "dormant", base + 0.01, [
+        {"id": "d0", "title": "旧", "create_time": now - 45 * DAY, "likes": 300, "collected_count": 0,
+         "comments_count": 0, "share_count": 0},
+    ], stale)
+    return CreatorNetworkBuilder(PLATFORM)
+
+
+def test_build_full_recomputes_recent_engagement(builder):
+    result = builder.build_full(similarity_threshold=0.5)
+    nodes = {c["id"]: c for c in result["creators"]}
+
+    active = nodes["active"]
+    assert (active["totalEngagement"], active["totalLikes"], active["noteCount"]) == (13, 10, 1)
+    assert [p["note_id"] for p in active["indexSeries"]] == ["a1"]
+
+    dormant = nodes["dormant"]
+    assert (dormant["totalEngagement"], dormant["noteCount"], dormant["indexSeries"]) == (0, 0, [])
+
+    assert len(result["edges"]) == 1
+
+
+def test_add_creator_rebuild_reads_primary(builder):
+    # 模拟同步延迟的从节点：还没有任何创作者
+    builder.analytics_db = mongomock.MongoClient()["lagging"]
+
+    result = builder.add_creator("active")
+
+    assert result["rebuilt"]
+    assert {c["id"] for c in result["creators"]} == {"active", "dormant"}
+    # 脚本和 /network/refresh 的全量构建仍走分析读偏好
+    assert builder.build_full()["creators"] == []
@@ -0,0 +1,99 @@
+"""
+LLMGateway 并发测试：上游调用期间不阻塞事件循环，多个请求并行执行
+
+用每次 sleep 固定时长的假 AsyncOpenAI 客户端代替 DeepSeek：
+并行时 N 个调用的总耗时约等于一次调用，串行时约为 N 倍。
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.llm_gateway import LLMGateway
+
+
+API_LATENCY = 0.3
+CONCURRENCY = 6
+
+
+class FakeCompletions:
+    """假的 chat.completions：每次调用 sleep API_LATENCY 秒后返回"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.max_concurrent = 0
+        self._running = 0
+
+    async def create(self, model, messages, max_tokens, temperature, **kwargs):
+        self.calls += 1
+        self._running += 1
+        self.max_concurrent = max(self.max_concurrent, self._running)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self._running -= 1
+        content = "回复: " + messages[0]["content"]
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+        )
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    gateway = LLMGateway()
+    completions = FakeCompletions(API_LATENCY)
+    gateway.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    # 使用统计只记录在内存里，不写 MongoDB
+    records = []
+    monkeypatch.setattr(gateway.usage_writer, "add", records.append)
+    gateway.usage_records = records
+    return gateway
+
+
+def test_concurrent_chat_calls_run_in_parallel(gateway):
+    prompts = [f"写一段关于第{i}个主题的文案" for i in range(CONCURRENCY)]
+
+    async def run():
+        start = time.perf_counter()
+        results = await asyncio.gather(*(gateway.chat(p, use_cache=False) for p in prompts))
+        return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+
+    completions = gateway.client.chat.completions
+    assert results == ["回复: " + p for p in prompts]
+    assert completions.calls == CONCURRENCY
+    assert completions.max_concurrent == CONCURRENCY
+    # 并行：约等于一次调用的延迟；串行时会接近 CONCURRENCY * API_LATENCY
+    assert elapsed < API_LATENCY * 2, f"{CONCURRENCY} 个调用耗时 {elapsed:.2f}s，没有并行执行"
+    assert len(gateway.usage_records) == CONCURRENCY
+
+
+def test_event_loop_responsive_during_chat(gateway):
+    async def run():
+        # 调用期间每 20ms 醒来一次的探测协程，记录最大间隔
+        gaps = []
+        stop = asyncio.Event()
+
+        async def probe():
+            last = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(0.02)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        probe_task = asyncio.ensure_future(probe())
+        await asyncio.gather(*(gateway.chat(f"主题{i}", use_cache=False) for i in range(CONCURRENCY)))
+        stop.set()
+        await probe_task
+        return gaps
+
+    gaps = asyncio.run(run())
+
+    assert gaps
+    assert max(gaps) < API_LATENCY / 2, f"事件循环被阻塞 {max(gaps):.2f}s"
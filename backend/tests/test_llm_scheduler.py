@@ -0,0 +1,48 @@
+"""
+LLMScheduler 配置测试：限速为0时在配置加载或调用时报错，而不是在调度定时器里除零、让排队请求永远等待
+"""
+
+import asyncio
+
+import pytest
+from pydantic import ValidationError
+
+from core.config import Settings
+from core.llm_scheduler import LLMScheduler
+
+
+@pytest.mark.parametrize("overrides", [
+    {"LLM_REQUESTS_PER_SECOND": 0},
+    {"LLM_TOKENS_PER_MINUTE": 0},
+    {"LLM_MODEL_LIMITS": {"deepseek-reasoner": {"requests_per_second": 0}}},
+    {"LLM_MODEL_LIMITS": {"deepseek-reasoner": {"tokens_per_minute": 0}}},
+])
+def test_settings_reject_zero_rates(overrides):
+    with pytest.raises(ValidationError):
+        Settings(**overrides)
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"requests_per_second": 0},
+    {"tokens_per_minute": 0},
+    {"model_limits": {"deepseek-chat": {"requests_per_second": 0}}},
+])
+def test_scheduler_rejects_zero_rates(kwargs):
+    scheduler = LLMScheduler(**kwargs)
+
+    async def run():
+        async with scheduler.slot("deepseek-chat", 100):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+
+def test_scheduler_grants_with_positive_rates():
+    scheduler = LLMScheduler(requests_per_second=1, tokens_per_minute=60)
+
+    async def run():
+        async with scheduler.slot("deepseek-chat", 10):
+            pass
+
+    asyncio.run(asyncio.wait_for(run(), timeout=5))
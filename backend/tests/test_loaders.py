@@ -0,0 +1,74 @@
+"""
+request_scope / BatchLoader 测试：作用域内同一轮次的查询合并为一次，作用域外不缓存
+"""
+
+import asyncio
+
+import pytest
+
+from database import loaders
+from database.loaders import load_profile, load_profiles, load_snapshot, request_scope
+
+
+@pytest.fixture
+def profile_queries(monkeypatch):
+    """把 AsyncUserProfileRepository.get_by_user_ids 换成记录调用的假实现"""
+    queries = []
+
+    async def get_by_user_ids(self, user_ids, platform="xiaohongshu"):
+        queries.append(list(user_ids))
+        return {user_id: {"user_id": user_id} for user_id in user_ids}
+
+    monkeypatch.setattr(loaders.AsyncUserProfileRepository, "__init__", lambda self: None)
+    monkeypatch.setattr(loaders.AsyncUserProfileRepository, "get_by_user_ids", get_by_user_ids)
+    return queries
+
+
+def test_scope_merges_and_caches(profile_queries):
+    async def run():
+        with request_scope():
+            a, b = await asyncio.gather(load_profile("u1"), load_profile("u2"))
+            again = await load_profile("u1")
+        return a, b, again
+
+    a, b, again = asyncio.run(run())
+
+    assert (a["user_id"], b["user_id"], again["user_id"]) == ("u1", "u2", "u1")
+    assert profile_queries == [["u1", "u2"]]
+
+
+def test_without_scope_no_merging_or_caching(profile_queries):
+    async def run():
+        await asyncio.gather(load_profile("u1"), load_profile("u2"))
+        await load_profile("u1")
+
+    asyncio.run(run())
+
+    assert profile_queries == [["u1"], ["u2"], ["u1"]]
+
+
+def test_load_profiles_single_query_without_scope(profile_queries):
+    profiles = asyncio.run(load_profiles(["u1", "u2", "u1"]))
+
+    assert [p["user_id"] for p in profiles] == ["u1", "u2", "u1"]
+    assert profile_queries == [["u1", "u2"]]
+
+
+def test_load_snapshot_returns_full_document(mongo_db):
+    db, _ = mongo_db
+    db.user_snapshots.insert_many([
+        {"user_id": "u1", "platform": "xiaohongshu", "nickname": "nick", "notes": [{"id": "n1"}]},
+        {"user_id": "u2", "platform": "xiaohongshu", "nickname": "bob", "notes": []},
+    ])
+
+    async def run():
+        with request_scope():
+            return await asyncio.gather(
+                load_snapshot("u1"), load_snapshot("u2"), load_snapshot("u1", fields=["nickname"])
+            )
+
+    full, other, partial = asyncio.run(run())
+
+    assert full["nickname"] == "nick" and full["notes"] == [{"id": "n1"}]
+    assert other["nickname"] == "bob"
+    assert partial["nickname"] == "nick" and "notes" not in partial
@@ -0,0 +1,77 @@
+"""
+UserSnapshotRepository.merge_notes 测试：增量合并只插入新笔记、只更新变化的互动计数，重叠刷新不产生重复
+"""
+
+import copy
+
+import pytest
+
+from database.repositories import UserSnapshotRepository
+
+
+USER_ID = "u1aaaaaaaaaa"
+PLATFORM = "xiaohongshu"
+
+
+def make_note(note_id: str, create_time: int, likes: int = 10, **extra) -> dict:
+    return {
+        "id": note_id, "title": f"笔记{note_id}", "desc": "", "create_time": create_time,
+        "likes": likes, "collected_count": 1, "comments_count": 2, "share_count": 0, **extra
+    }
+
+
+@pytest.fixture
+def repo(mongo_db):
+    repo = UserSnapshotRepository()
+    repo.create_snapshot({
+        "platform": PLATFORM,
+        "user_id": USER_ID,
+        "nickname": "nick",
+        "notes": [make_note("n2", 2000, title_extra="旧标题"), make_note("n1", 1000)],
+        "total_notes": 2,
+    })
+    return repo
+
+
+def stored_notes(repo) -> list:
+    return repo.collection.find_one({"user_id": USER_ID, "platform": PLATFORM})["notes"]
+
+
+def test_merge_inserts_new_and_patches_changed_counters(repo):
+    fetched = [
+        make_note("n4", 4000),
+        make_note("n3", 3000),
+        # 互动计数变化，其他字段（标题）不应被覆盖
+        make_note("n2", 2000, likes=99, title="新标题"),
+        make_note("n1", 1000),
+    ]
+
+    result = repo.merge_notes(USER_ID, PLATFORM, fetched)
+
+    assert result == {"new": 2, "updated": 1, "total": 4}
+    notes = stored_notes(repo)
+    assert [n["id"] for n in notes] == ["n4", "n3", "n2", "n1"]
+    assert notes[2]["likes"] == 99
+    assert notes[2]["title"] == "笔记n2" and notes[2]["title_extra"] == "旧标题"
+    assert notes[3] == make_note("n1", 1000)
+    snapshot = repo.collection.find_one({"user_id": USER_ID})
+    assert snapshot["total_notes"] == 4 and snapshot["nickname"] == "nick"
+    # notes 集合同步写入新笔记和变化的计数
+    docs = {d["note_id"]: d for d in repo.db.notes.find({"user_id": USER_ID})}
+    assert set(docs) == {"n1", "n2", "n3", "n4"}
+    assert docs["n2"]["likes"] == 99
+
+
+def test_overlapping_merges_do_not_duplicate_notes(repo, monkeypatch):
+    fetched = [make_note("n4", 4000), make_note("n3", 3000), make_note("n2", 2000), make_note("n1", 1000)]
+    # 两次刷新都在对方写入之前读取了快照
+    stale = copy.deepcopy(repo.collection.find_one({"user_id": USER_ID, "platform": PLATFORM}, {"notes": 1}))
+
+    repo.merge_notes(USER_ID, PLATFORM, fetched)
+    with monkeypatch.context() as m:
+        m.setattr(repo.collection, "find_one", lambda *args, **kwargs: copy.deepcopy(stale))
+        repo.merge_notes(USER_ID, PLATFORM, fetched)
+
+    notes = stored_notes(repo)
+    assert [n["id"] for n in notes] == ["n4", "n3", "n2", "n1"]
+    assert repo.collection.find_one({"user_id": USER_ID})["total_notes"] == 4
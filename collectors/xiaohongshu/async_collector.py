@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+小红书异步采集引擎 - 多用户并发采集
+
+与 collector.py 的区别：
+- 所有请求共用一个 httpx.AsyncClient 连接池（keep-alive 复用连接，不再每次新建连接）
+- 所有用户共享一个全局令牌桶，按 requests_per_second 限速，代替每页之后固定 sleep 1.5~3 秒
+- 同一用户的笔记分页依赖 cursor，仍按顺序获取；不同用户之间并发执行
+- 增量模式：遇到整页都已保存的笔记即停止翻页，只合并新笔记和变化的互动计数
+
+使用方法：
+    import asyncio
+    from async_collector import AsyncTikHubCollector
+
+    async def main():
+        async with AsyncTikHubCollector(requests_per_second=10) as collector:
+            results = await collector.collect_users(user_ids, concurrency=20)
+
+    asyncio.run(main())
+
+本地测试（不消耗 TikHub 额度）：先运行 fake_tikhub_server.py，
+再设置 TIKHUB_BASE_URL=http://127.0.0.1:8765 运行采集脚本。
+"""
+
+import sys
+import time
+import random
+import asyncio
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from collector import (
+    TIKHUB_BASE_URL,
+    TIKHUB_NOTES_PATH,
+    TIKHUB_USER_INFO_PATH,
+    TIKHUB_TOKEN,
+    NOTES_PAGE_SIZE_THRESHOLD,
+    is_known_page,
+    parse_user_info,
+    save_to_mongodb,
+)
+from database import UserSnapshotRepository
+from database.connection import run_in_db_executor
+
+
+# 默认参数
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+DEFAULT_CONCURRENCY = 20
+DEFAULT_MAX_RETRIES = 3
+# 单个用户最多翻页数（防止接口异常时无限翻页）
+MAX_PAGES_PER_USER = 200
+
+
+class AsyncRateLimiter:
+    """全局令牌桶：所有协程共享，按到达顺序放行"""
+
+    def __init__(self, requests_per_second: float, burst: Optional[float] = None):
+        """
+        Args:
+            requests_per_second: 每秒请求数
+            burst: 桶容量（允许的瞬时突发请求数），默认等于每秒请求数
+        """
+        self.rate = requests_per_second
+        self.capacity = burst or max(1.0, requests_per_second)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """等待一个令牌（等待时间按补充速率计算，不轮询）"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncTikHubCollector:
+    """基于 httpx 连接池的 TikHub 异步采集器"""
+
+    def __init__(
+        self,
+        requests_per_second: float = DEFAULT_REQUESTS_PER_SECOND,
+        max_connections: int = DEFAULT_CONCURRENCY,
+        base_url: str = TIKHUB_BASE_URL,
+        token: Optional[str] = TIKHUB_TOKEN,
+        timeout: float = 30.0,
+        max_retries: int = DEFAULT_MAX_RETRIES
+    ):
+        """
+        Args:
+            requests_per_second: 全局限速（所有用户合计）
+            max_connections: 连接池大小
+            base_url: TikHub 地址（测试时指向 fake_tikhub_server.py）
+            token: TikHub API Token
+            timeout: 单次请求超时（秒）
+            max_retries: 429 / 5xx / 网络错误的最大重试次数
+        """
+        self.limiter = AsyncRateLimiter(requests_per_second)
+        self.max_retries = max_retries
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={'accept': 'application/json', 'Authorization': token or ''},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+        self.stats = {"requests": 0, "retries": 0, "failed_requests": 0}
+
+    async def __aenter__(self) -> "AsyncTikHubCollector":
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """关闭连接池"""
+        await self.client.aclose()
+
+    async def _get(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        限速后发送 GET 请求，429 / 5xx / 网络错误时指数退避重试
+
+        Returns:
+            响应 JSON
+
+        Raises:
+            httpx.HTTPError: 重试次数用完
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.acquire()
+            self.stats["requests"] += 1
+            try:
+                response = await self.client.get(path, params=params)
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                if attempt == self.max_retries:
+                    self.stats["failed_requests"] += 1
+                    raise
+                self.stats["retries"] += 1
+                delay = 2 ** attempt + random.uniform(0, 1)
+                if isinstance(e, httpx.HTTPStatusError):
+                    retry_after = e.response.headers.get('retry-after', '')
+                    if retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+                await asyncio.sleep(delay)
+
+    async def fetch_user_notes(self, user_id: str, known_note_ids: Optional[set] = None) -> Dict[str, Any]:
+        """
+        获取用户的所有笔记（分页依赖 cursor，按顺序获取）
+
+        Args:
+            user_id: 用户ID
+            known_note_ids: 已保存的笔记ID（增量模式），遇到整页都已保存时停止翻页
+
+        Returns:
+            {success, user, notes, error}，格式与 collector.fetch_user_notes 一致
+        """
+        all_notes = []
+        seen_note_ids = set()
+        last_cursor = None
+        user_info = None
+
+        for _ in range(MAX_PAGES_PER_USER):
+            params = {'user_id': user_id}
+            if last_cursor:
+                params['lastCursor'] = last_cursor
+
+            try:
+                response_data = await self._get(TIKHUB_NOTES_PATH, params)
+            except httpx.TimeoutException:
+                return {'error': '请求超时，请稍后重试', 'success': False, 'user': None, 'notes': []}
+            except Exception as e:
+                return {'error': f'请求失败: {str(e)}', 'success': False, 'user': None, 'notes': []}
+
+            if response_data.get('code') != 200:
+                error_msg = response_data.get('message_zh', response_data.get('message', '未知错误'))
+                return {'error': error_msg, 'success': False, 'user': None, 'notes': []}
+
+            current_notes = response_data.get('data', {}).get('data', {}).get('notes', [])
+            if not current_notes:
+                break
+
+            if not user_info and 'user' in current_notes[0]:
+                user_info = current_notes[0]['user']
+
+            new_count = 0
+            for note in current_notes:
+                note_id = note.get('id', '')
+                if note_id and note_id not in seen_note_ids:
+                    all_notes.append(note)
+                    seen_note_ids.add(note_id)
+                    new_count += 1
+
+            if len(current_notes) < NOTES_PAGE_SIZE_THRESHOLD or new_count == 0:
+                break
+            if is_known_page(current_notes, known_note_ids):
+                break
+
+            last_note = current_notes[-1]
+            last_cursor = last_note.get('cursor') or last_note.get('id')
+            if not last_cursor:
+                break
+
+        return {'success': True, 'user': user_info, 'notes': all_notes}
+
+    async def fetch_user_info(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取用户详细信息
+
+        Returns:
+            {basic_info, stats, tags}；失败返回 None
+        """
+        try:
+            response_data = await self._get(TIKHUB_USER_INFO_PATH, {'user_id': user_id})
+        except Exception as e:
+            print(f"⚠️  获取用户信息失败 {user_id[:12]}: {e}")
+            return None
+        if response_data.get('code') != 200:
+            print(f"⚠️  用户信息API错误 {user_id[:12]}: {response_data.get('message', '未知错误')}")
+            return None
+        return parse_user_info(response_data.get('data', {}))
+
+    async def collect_user(
+        self,
+        user_id: str,
+        save: bool = True,
+        include_info: bool = True,
+        incremental: bool = False
+    ) -> Dict[str, Any]:
+        """
+        采集单个用户：笔记和用户信息并发获取，完成后保存到MongoDB
+
+        Args:
+            user_id: 用户ID
+            save: 是否写入 user_snapshots / user_profiles
+            include_info: 是否获取用户详细信息
+            incremental: 增量模式，只翻到已保存的笔记为止，保存时合并而不是整体覆盖
+
+        Returns:
+            {user_id, success, notes, user_info, error, seconds}
+        """
+        start = time.perf_counter()
+        known_note_ids = None
+        if incremental:
+            known_note_ids = await run_in_db_executor(UserSnapshotRepository().get_known_note_ids, user_id)
+        if include_info:
+            notes_result, user_info = await asyncio.gather(
+                self.fetch_user_notes(user_id, known_note_ids), self.fetch_user_info(user_id)
+            )
+        else:
+            notes_result, user_info = await self.fetch_user_notes(user_id, known_note_ids), None
+
+        result = {
+            'user_id': user_id,
+            'success': notes_result['success'],
+            'notes': notes_result['notes'],
+            'user_info': user_info,
+            'error': notes_result.get('error'),
+        }
+        if save and result['success'] and result['notes']:
+            # 同步 PyMongo 写入放到数据库线程池，不阻塞其他用户的采集
+            await run_in_db_executor(
+                save_to_mongodb, user_id, {'notes': result['notes'], 'user_info': user_info}, incremental
+            )
+        result['seconds'] = time.perf_counter() - start
+        return result
+
+    async def collect_users(
+        self,
+        user_ids: List[str],
+        concurrency: int = DEFAULT_CONCURRENCY,
+        save: bool = True,
+        include_info: bool = True,
+        incremental: bool = False,
+        on_done: Optional[Callable[[int, int, Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        并发采集多个用户（同时进行的用户数不超过 concurrency，请求总速率受全局令牌桶限制）
+
+        Args:
+            user_ids: 用户ID列表
+            concurrency: 同时采集的用户数
+            save: 是否写入MongoDB
+            include_info: 是否获取用户详细信息
+            incremental: 增量模式（见 collect_user）
+            on_done: 每个用户完成时的回调 (序号, 总数, 结果)
+
+        Returns:
+            与 user_ids 顺序一致的结果列表
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        finished = 0
+
+        async def run_one(user_id: str) -> Dict[str, Any]:
+            nonlocal finished
+            async with semaphore:
+                try:
+                    result = await self.collect_user(
+                        user_id, save=save, include_info=include_info, incremental=incremental
+                    )
+                except Exception as e:
+                    result = {'user_id': user_id, 'success': False, 'notes': [], 'user_info': None,
+                              'error': str(e), 'seconds': 0.0}
+            finished += 1
+            if on_done:
+                on_done(finished, len(user_ids), result)
+            return result
+
+        return await asyncio.gather(*(run_one(user_id) for user_id in user_ids))
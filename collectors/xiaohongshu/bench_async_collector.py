@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+异步采集引擎压测 - 配合 fake_tikhub_server.py 使用，不写数据库、不消耗 TikHub 额度
+
+验证内容：
+- 全部用户采集成功，笔记数与模拟服务端的分页一致（cursor 翻页正确）
+- 总请求速率不超过 --rps（服务端设置了 --max-rps 时不应出现大量 429）
+- 按当前吞吐量估算刷新数千个创作者所需的时间
+- 再以第一轮的笔记ID作为"已保存"集合跑一轮增量采集，对比请求数
+
+运行方式：
+    python collectors/xiaohongshu/fake_tikhub_server.py --port 8765 --latency 0.3 --max-rps 25 &
+    TIKHUB_TOKEN=test python collectors/xiaohongshu/bench_async_collector.py \\
+        --base-url http://127.0.0.1:8765 --users 500 --concurrency 50 --rps 20
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+os.environ.setdefault('TIKHUB_TOKEN', 'test')
+
+from async_collector import AsyncTikHubCollector
+
+
+async def run(args) -> None:
+    user_ids = [f'benchuser{i:06d}' for i in range(args.users)]
+    async with AsyncTikHubCollector(
+        requests_per_second=args.rps,
+        max_connections=args.concurrency,
+        base_url=args.base_url
+    ) as collector:
+        t0 = time.perf_counter()
+        results = await collector.collect_users(user_ids, concurrency=args.concurrency, save=False)
+        elapsed = time.perf_counter() - t0
+        stats = dict(collector.stats)
+
+        # 增量：第一轮采集到的笔记视为已保存
+        known = {r['user_id']: {n['id'] for n in r['notes']} for r in results}
+        t1 = time.perf_counter()
+        incremental = await asyncio.gather(*(
+            collector.fetch_user_notes(user_id, known[user_id]) for user_id in user_ids
+        ))
+        incremental_elapsed = time.perf_counter() - t1
+        incremental_requests = collector.stats['requests'] - stats['requests']
+
+    ok = [r for r in results if r['success']]
+    notes = sum(len(r['notes']) for r in ok)
+    print("\n📊 结果")
+    print(f"   用户:       {len(ok)}/{len(results)} 成功")
+    print(f"   笔记:       {notes}")
+    print(f"   请求:       {stats['requests']} 次（重试 {stats['retries']} 次, 失败 {stats['failed_requests']} 次）")
+    print(f"   耗时:       {elapsed:.1f}s")
+    print(f"   实际速率:   {stats['requests'] / elapsed:.1f} 请求/秒（限速 {args.rps}）")
+    per_user = elapsed / max(1, len(results))
+    print(f"   估算 {args.project} 个创作者: {per_user * args.project / 60:.1f} 分钟")
+    print(f"   增量采集:   {incremental_requests} 次笔记请求（全量笔记请求 {stats['requests'] - len(results)} 次）, "
+          f"耗时 {incremental_elapsed:.1f}s, 成功 {sum(1 for r in incremental if r['success'])}/{len(results)}")
+    if len(ok) < len(results):
+        for r in results:
+            if not r['success']:
+                print(f"   ❌ {r['user_id']}: {r['error']}")
+                break
+
+
+def main():
+    parser = argparse.ArgumentParser(description="异步采集引擎压测（配合 fake_tikhub_server.py）")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8765", help="模拟服务地址")
+    parser.add_argument("--users", type=int, default=200, help="模拟用户数")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时采集的用户数")
+    parser.add_argument("--rps", type=float, default=20, help="全局限速（请求/秒）")
+    parser.add_argument("--project", type=int, default=3000, help="按实测吞吐量估算该数量创作者的耗时")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print(f"🚀 异步采集压测: {args.users} 个用户 → {args.base_url}")
+    print("=" * 60)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
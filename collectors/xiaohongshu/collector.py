@@ -34,8 +34,15 @@ from datetime import datetime
 # ============================================
 
 USER_ID = '5e6472940000000001008d4e'  # 修改为目标用户ID
-TIKHUB_NOTES_API = 'https://api.tikhub.io/api/v1/xiaohongshu/web/get_user_notes_v2'
-TIKHUB_USER_INFO_API = 'https://api.tikhub.io/api/v1/xiaohongshu/web_v2/fetch_user_info_app'
+# 可通过 TIKHUB_BASE_URL 指向本地的 fake_tikhub_server.py 做测试
+TIKHUB_BASE_URL = os.getenv('TIKHUB_BASE_URL', 'https://api.tikhub.io').rstrip('/')
+TIKHUB_NOTES_PATH = '/api/v1/xiaohongshu/web/get_user_notes_v2'
+TIKHUB_USER_INFO_PATH = '/api/v1/xiaohongshu/web_v2/fetch_user_info_app'
+TIKHUB_NOTES_API = TIKHUB_BASE_URL + TIKHUB_NOTES_PATH
+TIKHUB_USER_INFO_API = TIKHUB_BASE_URL + TIKHUB_USER_INFO_PATH
+
+# 每页笔记数少于该值时视为最后一页
+NOTES_PAGE_SIZE_THRESHOLD = 19
 
 # TikHub API Token（从环境变量读取）
 TIKHUB_TOKEN = os.getenv('TIKHUB_TOKEN')
@@ -53,12 +60,19 @@ headers = {
 # 主函数 - 数据采集
 # ============================================
 
-def fetch_user_notes(user_id: str) -> dict:
+def is_known_page(notes: list, known_note_ids: set) -> bool:
+    """增量采集：一页笔记全部已保存过，说明更早的笔记也都已采集，可以停止翻页"""
+    return bool(known_note_ids) and all(note.get('id') in known_note_ids for note in notes)
+
+
+def fetch_user_notes(user_id: str, known_note_ids: set = None) -> dict:
     """
     获取用户的所有笔记
     
     Args:
         user_id: 用户ID
+        known_note_ids: 已保存的笔记ID（增量模式）；遇到整页都已保存时停止翻页，
+                        该页仍会返回，用于更新最近笔记的互动计数
         
     Returns:
         包含user和notes的字典
@@ -125,7 +139,10 @@ def fetch_user_notes(user_id: str) -> dict:
             print(f" 新增 {new_count} 条")
             
             # 检查是否继续
-            if len(current_notes) < 19 or new_count == 0:
+            if len(current_notes) < NOTES_PAGE_SIZE_THRESHOLD or new_count == 0:
+                break
+            if is_known_page(current_notes, known_note_ids):
+                print(f"  整页笔记均已保存，停止翻页（增量模式）")
                 break
             
             # 获取下一页cursor
@@ -163,6 +180,37 @@ def fetch_user_notes(user_id: str) -> dict:
     }
 
 
+def parse_user_info(data: dict) -> dict:
+    """
+    把 fetch_user_info_app 的返回数据转换为 user_profiles 使用的格式
+    
+    Args:
+        data: 响应中的 data 字段
+        
+    Returns:
+        {basic_info, stats, tags}
+    """
+    return {
+        'basic_info': {
+            'nickname': data.get('nickname', ''),
+            'red_id': data.get('red_id', ''),
+            'desc': data.get('desc', ''),
+            'avatar': data.get('images', ''),
+            'gender': data.get('gender', 0),
+            'ip_location': data.get('ip_location', '')
+        },
+        'stats': {
+            'fans': data.get('fans', 0),
+            'follows': data.get('follows', 0),
+            'total_liked': data.get('liked', 0),
+            'total_collected': data.get('collected', 0),
+            'note_count': data.get('collected_notes_num', 0)
+        },
+        'tags': [tag.get('name') if isinstance(tag, dict) else str(tag) 
+                for tag in data.get('tags', [])]
+    }
+
+
 def fetch_user_info(user_id: str) -> dict:
     """
     获取用户详细信息
@@ -190,27 +238,7 @@ def fetch_user_info(user_id: str) -> dict:
             print(f"⚠️  用户信息API错误: {response_data.get('message', '未知错误')}")
             return None
         
-        data = response_data.get('data', {})
-        
-        user_info = {
-            'basic_info': {
-                'nickname': data.get('nickname', ''),
-                'red_id': data.get('red_id', ''),
-                'desc': data.get('desc', ''),
-                'avatar': data.get('images', ''),
-                'gender': data.get('gender', 0),
-                'ip_location': data.get('ip_location', '')
-            },
-            'stats': {
-                'fans': data.get('fans', 0),
-                'follows': data.get('follows', 0),
-                'total_liked': data.get('liked', 0),
-                'total_collected': data.get('collected', 0),
-                'note_count': data.get('collected_notes_num', 0)
-            },
-            'tags': [tag.get('name') if isinstance(tag, dict) else str(tag) 
-                    for tag in data.get('tags', [])]
-        }
+        user_info = parse_user_info(response_data.get('data', {}))
         
         nickname = user_info['basic_info']['nickname']
         fans = user_info['stats']['fans']
@@ -226,13 +254,14 @@ def fetch_user_info(user_id: str) -> dict:
         return None
 
 
-def save_to_mongodb(user_id: str, data: dict):
+def save_to_mongodb(user_id: str, data: dict, incremental: bool = False):
     """
     保存数据到MongoDB（包括snapshots和profiles）
     
     Args:
         user_id: 用户ID
         data: 包含notes和user_info的数据
+        incremental: 增量模式，只插入新笔记并更新变化的互动计数（不整体覆盖notes数组）
     """
     try:
         snapshot_repo = UserSnapshotRepository()
@@ -240,22 +269,26 @@ def save_to_mongodb(user_id: str, data: dict):
         
         # 1. 保存笔记快照到 user_snapshots
         print("\n💾 保存笔记数据到 user_snapshots...")
-        existing_snapshot = snapshot_repo.get_by_user_id(user_id)
-        
-        snapshot_data = {
-            'platform': 'xiaohongshu',
-            'user_id': user_id,
-            'notes': data['notes'],
-            'total_notes': len(data['notes']),
-            'created_at': datetime.now()
-        }
-        
-        if existing_snapshot:
-            snapshot_repo.update_snapshot(user_id, 'xiaohongshu', data['notes'])
-            print(f"✅ 已更新笔记快照: {len(data['notes'])} 条笔记")
+        if incremental:
+            merged = snapshot_repo.merge_notes(user_id, 'xiaohongshu', data['notes'])
+            print(f"✅ 增量合并笔记: 新增 {merged['new']} 条, 更新互动 {merged['updated']} 条, 共 {merged['total']} 条")
         else:
-            snapshot_repo.create_snapshot(snapshot_data)
-            print(f"✅ 已保存笔记快照: {len(data['notes'])} 条笔记")
+            existing_snapshot = snapshot_repo.get_by_user_id(user_id)
+            
+            snapshot_data = {
+                'platform': 'xiaohongshu',
+                'user_id': user_id,
+                'notes': data['notes'],
+                'total_notes': len(data['notes']),
+                'created_at': datetime.now()
+            }
+            
+            if existing_snapshot:
+                snapshot_repo.update_snapshot(user_id, 'xiaohongshu', data['notes'])
+                print(f"✅ 已更新笔记快照: {len(data['notes'])} 条笔记")
+            else:
+                snapshot_repo.create_snapshot(snapshot_data)
+                print(f"✅ 已保存笔记快照: {len(data['notes'])} 条笔记")
         
         # 2. 保存用户详细信息到 user_profiles
         if data.get('user_info'):
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+本地模拟 TikHub 接口 - 用于测试采集器的并发和限速，不消耗 TikHub 额度
+
+实现采集器用到的两个接口，数据按 user_id 确定性生成：
+- /api/v1/xiaohongshu/web/get_user_notes_v2      分页返回笔记（lastCursor 翻页）
+- /api/v1/xiaohongshu/web_v2/fetch_user_info_app  返回用户信息
+
+可模拟响应延迟、服务端限流（超过 --max-rps 返回 429）和随机 5xx 错误。
+tests/test_async_collector.py 在随机端口启动本服务，并用 faults 注入固定的 429 / 502 响应。
+退出时打印收到的请求数和观测到的最大每秒请求数。
+
+运行方式：
+    python collectors/xiaohongshu/fake_tikhub_server.py --port 8765 --latency 0.3 --pages 5 --max-rps 25
+    python collectors/xiaohongshu/bench_async_collector.py --base-url http://127.0.0.1:8765 --users 500 --rps 20
+
+采集脚本也可以设置 TIKHUB_BASE_URL=http://127.0.0.1:8765 指向本服务（注意会写入 MONGO_URI 指定的数据库）。
+"""
+
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+NOTES_PATH = '/api/v1/xiaohongshu/web/get_user_notes_v2'
+USER_INFO_PATH = '/api/v1/xiaohongshu/web_v2/fetch_user_info_app'
+PAGE_SIZE = 20
+
+
+class FakeTikHub:
+    """模拟数据与请求统计"""
+
+    def __init__(
+        self,
+        pages: int,
+        latency: float,
+        max_rps: float,
+        error_rate: float,
+        faults: Optional[Iterable[int]] = None
+    ):
+        """
+        Args:
+            pages: 每个用户最多的笔记页数
+            latency: 平均响应延迟（秒）
+            max_rps: 服务端限速，超过返回429（0=不限）
+            error_rate: 随机返回502的比例
+            faults: 依次作为前几次请求响应的错误状态码（如 [429, 502]，用于测试重试）
+        """
+        self.pages = pages
+        self.latency = latency
+        self.max_rps = max_rps
+        self.error_rate = error_rate
+        self.lock = threading.Lock()
+        self.requests_per_second = Counter()
+        self.request_times = []
+        self.faults = deque(faults or [])
+        self.total = 0
+        self.rejected = 0
+
+    def record(self) -> bool:
+        """记录一次请求，返回是否超过服务端限速"""
+        second = int(time.time())
+        with self.lock:
+            self.total += 1
+            self.requests_per_second[second] += 1
+            self.request_times.append(time.monotonic())
+            if self.max_rps and self.requests_per_second[second] > self.max_rps:
+                self.rejected += 1
+                return True
+        return False
+
+    def next_fault(self) -> Optional[int]:
+        """取出下一个预设的错误状态码，没有时返回 None"""
+        with self.lock:
+            return self.faults.popleft() if self.faults else None
+
+    def pages_for(self, user_id: str) -> int:
+        """每个用户的页数在 1 ~ pages 之间（按 user_id 确定）"""
+        digest = int(hashlib.md5(user_id.encode()).hexdigest(), 16)
+        return 1 + digest % self.pages
+
+    def notes_page(self, user_id: str, cursor: str) -> list:
+        page = int(cursor.rsplit('-', 1)[-1]) + 1 if cursor else 0
+        total_pages = self.pages_for(user_id)
+        if page >= total_pages:
+            return []
+        # 最后一页不满一页，采集器据此停止翻页
+        size = PAGE_SIZE if page < total_pages - 1 else PAGE_SIZE // 2
+        now = int(time.time())
+        return [
+            {
+                'id': f'{user_id}-{page}-{i}',
+                'cursor': f'{user_id}-{page}',
+                'title': f'测试笔记 {page}-{i}',
+                'desc': f'用户 {user_id} 的第 {page * PAGE_SIZE + i} 篇笔记',
+                'likes': random.randint(0, 5000),
+                'collected_count': random.randint(0, 1000),
+                'comments_count': random.randint(0, 300),
+                'share_count': random.randint(0, 100),
+                'create_time': now - (page * PAGE_SIZE + i) * 86400,
+                'user': {'userid': user_id, 'nickname': f'测试用户{user_id[-4:]}'},
+            }
+            for i in range(size)
+        ]
+
+    def user_info(self, user_id: str) -> dict:
+        return {
+            'nickname': f'测试用户{user_id[-4:]}',
+            'red_id': user_id[-8:],
+            'desc': '本地模拟数据',
+            'fans': self.pages_for(user_id) * 1000,
+            'follows': 10,
+            'liked': 5000,
+            'collected': 800,
+            'tags': [{'name': '测试'}],
+        }
+
+    def peak_rps(self) -> int:
+        return max(self.requests_per_second.values()) if self.requests_per_second else 0
+
+
+def make_handler(fake: FakeTikHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # 支持 keep-alive，便于验证连接复用
+
+        def _send(self, status: int, body: dict):
+            payload = json.dumps(body, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            if status == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if fake.record():
+                return self._send(429, {'code': 429, 'message': 'Too Many Requests'})
+            fault = fake.next_fault()
+            if fault:
+                return self._send(fault, {'code': fault, 'message': 'Injected fault'})
+            if fake.latency:
+                time.sleep(fake.latency * random.uniform(0.5, 1.5))
+            if fake.error_rate and random.random() < fake.error_rate:
+                return self._send(502, {'code': 502, 'message': 'Bad Gateway'})
+
+            user_id = params.get('user_id', '')
+            if url.path == NOTES_PATH:
+                notes = fake.notes_page(user_id, params.get('lastCursor', ''))
+                return self._send(200, {'code': 200, 'data': {'data': {'notes': notes}}})
+            if url.path == USER_INFO_PATH:
+                return self._send(200, {'code': 200, 'data': fake.user_info(user_id)})
+            return self._send(404, {'code': 404, 'message': 'Not Found'})
+
+        def log_message(self, format, *args):
+            pass  # 不打印每个请求
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟 TikHub 接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=5, help="每个用户最多的笔记页数")
+    parser.add_argument("--latency", type=float, default=0.3, help="平均响应延迟（秒）")
+    parser.add_argument("--max-rps", type=float, default=0, help="服务端限速，超过返回429（0=不限）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="随机返回502的比例")
+    args = parser.parse_args()
+
+    fake = FakeTikHub(args.pages, args.latency, args.max_rps, args.error_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    server.daemon_threads = True
+    print(f"🧪 Fake TikHub 运行在 http://{args.host}:{args.port}（Ctrl+C 停止）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n📊 收到请求 {fake.total} 次, 429拒绝 {fake.rejected} 次, 最大每秒请求数 {fake.peak_rps()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+"""
+pytest 公共配置：把采集器目录加入导入路径，并为必填配置项提供占位值
+（测试只访问本地的 fake_tikhub_server，不连接 TikHub 和 MongoDB）
+"""
+
+import os
+import sys
+from pathlib import Path
+
+COLLECTOR_DIR = Path(__file__).resolve().parent.parent
+if str(COLLECTOR_DIR) not in sys.path:
+    sys.path.insert(0, str(COLLECTOR_DIR))
+
+os.environ.setdefault("TIKHUB_TOKEN", "test-token")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("DEEPSEEK_API_KEY", "test-key")
@@ -0,0 +1,116 @@
+"""
+AsyncTikHubCollector 测试：在随机端口启动 fake_tikhub_server，
+验证笔记完整且按 cursor 顺序、429 / 502 会重试、请求速率不超过 requests_per_second，
+以及增量模式遇到整页已保存的笔记时停止翻页。
+
+运行方式：
+    python -m pytest collectors/xiaohongshu/tests
+"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from async_collector import AsyncTikHubCollector
+from fake_tikhub_server import PAGE_SIZE, FakeTikHub, make_handler
+from http.server import ThreadingHTTPServer
+
+
+REQUESTS_PER_SECOND = 20
+USER_IDS = [f"5e64729400000000010{i:05d}" for i in range(24)]
+
+
+@contextmanager
+def serve(fake: FakeTikHub):
+    """在随机端口后台运行 fake TikHub，返回其地址"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(fake))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(timeout=5)
+
+
+@pytest.fixture
+def fake_server():
+    """前两次请求分别返回 429 和 502 的 fake TikHub"""
+    fake = FakeTikHub(pages=3, latency=0.01, max_rps=0, error_rate=0.0, faults=[429, 502])
+    with serve(fake) as base_url:
+        yield fake, base_url
+
+
+def expected_note_ids(fake: FakeTikHub, user_id: str) -> list:
+    """按 cursor 顺序排列的全部笔记ID（最后一页只有半页）"""
+    pages = fake.pages_for(user_id)
+    ids = []
+    for page in range(pages):
+        size = PAGE_SIZE if page < pages - 1 else PAGE_SIZE // 2
+        ids.extend(f"{user_id}-{page}-{i}" for i in range(size))
+    return ids
+
+
+def collect(base_url: str):
+    async def run():
+        async with AsyncTikHubCollector(
+            requests_per_second=REQUESTS_PER_SECOND, base_url=base_url, max_retries=3
+        ) as collector:
+            results = await collector.collect_users(USER_IDS, concurrency=4, save=False)
+            return results, dict(collector.stats)
+
+    return asyncio.run(run())
+
+
+def test_collect_users_against_fake_tikhub(fake_server):
+    fake, base_url = fake_server
+    results, stats = collect(base_url)
+
+    # 笔记完整且按 cursor 顺序
+    assert [r["user_id"] for r in results] == USER_IDS
+    for result in results:
+        assert result["success"], result["error"]
+        assert [n["id"] for n in result["notes"]] == expected_note_ids(fake, result["user_id"])
+        assert result["user_info"] is not None
+
+    # 429 和 502 各重试一次后成功
+    assert not fake.faults
+    assert stats["retries"] == 2
+    assert stats["failed_requests"] == 0
+    assert stats["requests"] == fake.total
+
+    # 令牌桶：任意时间段内的请求数不超过 桶容量 + 速率 × 时长
+    times = fake.request_times
+    for i in range(len(times)):
+        for j in range(i + 1, len(times)):
+            allowed = REQUESTS_PER_SECOND + (times[j] - times[i]) * REQUESTS_PER_SECOND
+            # 服务端记录时间与客户端放行时间有少量抖动，多留一个请求的余量
+            assert j - i + 1 <= allowed + 1
+
+
+def test_incremental_fetch_stops_at_known_page():
+    fake = FakeTikHub(pages=3, latency=0.0, max_rps=0, error_rate=0.0)
+    user_id = next(u for u in USER_IDS if fake.pages_for(u) == 3)
+    all_ids = expected_note_ids(fake, user_id)
+
+    async def fetch(base_url, known_note_ids):
+        async with AsyncTikHubCollector(requests_per_second=100, base_url=base_url) as collector:
+            return await collector.fetch_user_notes(user_id, known_note_ids)
+
+    with serve(fake) as base_url:
+        # 第一页有新笔记，第二页全部已保存：翻到第二页为止，不再请求第三页
+        before = fake.total
+        result = asyncio.run(fetch(base_url, set(all_ids[PAGE_SIZE:])))
+        assert result["success"]
+        assert [n["id"] for n in result["notes"]] == all_ids[:2 * PAGE_SIZE]
+        assert fake.total - before == 2
+
+        # 没有已保存的笔记：翻完全部三页
+        before = fake.total
+        result = asyncio.run(fetch(base_url, set()))
+        assert [n["id"] for n in result["notes"]] == all_ids
+        assert fake.total - before == 3